@@ -5,16 +5,38 @@ import threading
 import time
 import pygame
 import os
-import numpy as np
-from PIL import Image, ImageTk
-import tempfile
 import json
 import datetime
 import platform
 import webbrowser
-import sqlite3
 from pathlib import Path
 import re
+import argparse
+from pipeline import LatestFrameQueue, StageStats, format_stage_stats
+from detection import FaceDetector, MotionGate, DETECTION_RESOLUTIONS
+from focus import FocusTracker, FocusTimeline, FOCUSED, UNFOCUSED
+from frame_sources import CameraSource, open_source
+from scheduler import DetectionScheduler
+from preview import PreviewRenderer
+from hosts_file import HostsFile
+from blocklist import compile_files, compile_sites, parse_lines, Blocklist
+from dns_sinkhole import DnsSinkhole, SinkholeThread, parse_address
+from process_watcher import ProcessWatcher, DEFAULT_APPS
+from browser_history import BrowserHistoryWatcher, BROWSER_APPS
+from sound_bank import SoundBank, PROFILES, DEFAULT_PROFILE
+from storage import Storage
+from migrations import migrate
+from persistence import PersistenceWorker
+from history_view import SessionHistoryView
+from journal_view import JournalBrowser
+import journal_search
+from badges import BADGES, BadgeEngine
+import queries
+import data_io
+from queries import CHART_RANGES
+
+# Seconds to wait for a stopped session's threads to exit before going on
+PIPELINE_EXIT_TIMEOUT = 2.0
 
 class FocusBuddyApp:
     def __init__(self, root):
@@ -35,10 +57,9 @@ class FocusBuddyApp:
         self.alert_active = False
         self.alert_thread = None
         self.warning_count = 0
-        self.last_detection_time = time.time()
         self.grace_period = 3  # seconds before alerting
         self.session_start_time = None
-        self.total_focus_time = 0
+        self.frame_source = "camera:0"
         self.hardcore_mode = False
         self.distracting_sites = ["youtube.com", "facebook.com", "twitter.com", "instagram.com", 
                                 "reddit.com", "tiktok.com", "netflix.com", "twitch.tv"]
@@ -46,6 +67,7 @@ class FocusBuddyApp:
         # Video frame size control
         self.video_width = 480
         self.video_height = 360
+        self.preview_fps = 15.0
         
         # User data
         self.data_dir = os.path.join(os.path.expanduser("~"), ".focusbuddy")
@@ -53,30 +75,42 @@ class FocusBuddyApp:
         self.db_path = os.path.join(self.data_dir, "focusbuddy.db")
         self.setup_database()
         
+        # Sites to block: the Settings list plus any imported blocklists
+        # (compiled into blocklist_path and merged in the background)
+        self.blocklist_path = os.path.join(self.data_dir, "blocklist.idx")
+        self.blocklist = compile_sites(self.distracting_sites)
+        self.blocklist_generation = 0
+        self.dns_sinkhole = None
+        self.distracting_apps = list(DEFAULT_APPS)
+        self.distraction_prompt_open = False
+        
         # Badge system
-        self.badges = {
-            "focus_rookie": {"name": "Focus Rookie", "desc": "Complete your first 30-minute session", "icon": "🥉"},
-            "focus_adept": {"name": "Focus Adept", "desc": "Complete a 1-hour session", "icon": "🥈"},
-            "focus_master": {"name": "Focus Master", "desc": "Complete a 2-hour session", "icon": "🥇"},
-            "early_bird": {"name": "Early Bird", "desc": "Start a session before 8 AM", "icon": "🐦"},
-            "night_owl": {"name": "Night Owl", "desc": "Complete a session after 10 PM", "icon": "🦉"},
-            "hat_trick": {"name": "Hat Trick", "desc": "Complete 3 sessions in one day", "icon": "🎩"},
-            "iron_will": {"name": "Iron Will", "desc": "Complete a hardcore mode session", "icon": "⚔️"},
-            "streak_week": {"name": "Streak Week", "desc": "Focus every day for a week", "icon": "🔥"},
-            "journaler": {"name": "Journaler", "desc": "Complete 5 session journals", "icon": "📓"}
-        }
+        self.badges = BADGES
         
         # Create UI elements
         self.create_ui()
         
         # OpenCV variables
         self.cap = None
-        self.face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
-        
-        # Create default sound
-        self.create_default_sound()
-        
-        # Background monitor for distracting sites
+        self.frame_queue = None
+        self.preview_queue = None
+        self.session_stop = None
+        self.capture_thread = None
+        self.video_thread = None
+        self.stage_stats = []
+        self.preview_renderer = None
+        self.preview_visible = True
+        self.last_stats_refresh = 0
+        self.face_detector = FaceDetector(self.sensitivity_var.get(), tracking=self.tracking_var.get(),
+                                          detect_width=DETECTION_RESOLUTIONS[self.resolution_var.get()],
+                                          motion_gate=self.motion_gate_var.get())
+        
+        # Render the alert sounds
+        self.create_sound_bank()
+        
+        # Background monitor for distracting apps and sites
+        self.process_watcher = ProcessWatcher(self.distracting_apps)
+        self.history_watcher = BrowserHistoryWatcher(self.blocklist)
         self.site_monitor_thread = threading.Thread(target=self.monitor_distracting_sites)
         self.site_monitor_thread.daemon = True
         self.site_monitor_thread.start()
@@ -84,9 +118,11 @@ class FocusBuddyApp:
         # On closing window
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
         
-        # Stabilization buffers
-        self.focus_buffer = [False] * 5  # Last 5 focus states
-        self.focus_index = 0
+        # Majority-vote focus state with grace period
+        self.focus_tracker = FocusTracker(grace_period=self.grace_period)
+        
+        # Adaptive detection rate
+        self.detection_scheduler = DetectionScheduler(cpu_budget=float(self.cpu_budget_var.get()) / 100)
         
         # Update focus scores display
         self.update_focus_stats()
@@ -94,32 +130,19 @@ class FocusBuddyApp:
 
     def setup_database(self):
         """Set up SQLite database for storing user data"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Create focus sessions table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS focus_sessions (
-            id INTEGER PRIMARY KEY,
-            start_time TEXT,
-            duration INTEGER,
-            focus_score REAL,
-            hardcore_mode INTEGER,
-            journal_text TEXT
-        )
-        ''')
-        
-        # Create badges table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS earned_badges (
-            id INTEGER PRIMARY KEY,
-            badge_id TEXT,
-            earn_date TEXT
-        )
-        ''')
+        # All database access happens on the persistence worker thread
+        self.badge_engine = BadgeEngine()
+        self.persistence = PersistenceWorker(self.open_database, self.root)
         
-        conn.commit()
-        conn.close()
+        # Award badges retroactively if the badge rules changed since the last run
+        self.persistence.write(self.badge_engine.load, self.on_badges_earned,
+                               lambda e: print(f"Error checking badges: {e}"))
+    
+    def open_database(self):
+        """Open the database and create or upgrade the schema (runs on the worker)"""
+        storage = Storage(self.db_path)
+        migrate(storage)
+        return storage
 
     def set_theme(self):
         """Set up a modern theme for the application"""
@@ -157,33 +180,13 @@ class FocusBuddyApp:
         style.configure("Status.TLabel", font=("Arial", 14))
         style.configure("Badge.TLabel", font=("Arial", 24))
         
-    def create_default_sound(self):
-        """Create a default alert sound file"""
+    def create_sound_bank(self):
+        """Render the alert sounds into memory"""
         try:
-            beep_file = os.path.join(tempfile.gettempdir(), "focus_monitor_beep.wav")
-            
-            sample_rate = 44100
-            duration = 0.8
-            frequency = 880
-            
-            num_samples = int(sample_rate * duration)
-            amplitude = 32000
-            
-            buf = np.zeros((num_samples, 2), dtype=np.int16)
-            for i in range(num_samples):
-                t = i / sample_rate
-                value = int(amplitude * np.sin(2 * np.pi * frequency * t))
-                buf[i][0] = value
-                buf[i][1] = value
-            
-            sound = pygame.sndarray.make_sound(buf)
-            pygame.mixer.Sound.write(sound, beep_file)
-            
-            self.alarm_sound_file = beep_file
-            
+            self.sound_bank = SoundBank(self.alert_style_var.get())
         except Exception as e:
             print(f"Error creating default sound: {e}")
-            self.alarm_sound_file = None
+            self.sound_bank = None
     
     def create_ui(self):
         """Create the UI for the application"""
@@ -199,6 +202,10 @@ class FocusBuddyApp:
         self.stats_tab = ttk.Frame(self.notebook)
         self.notebook.add(self.stats_tab, text="Stats & Badges")
         
+        # Journals tab
+        self.journals_tab = ttk.Frame(self.notebook)
+        self.notebook.add(self.journals_tab, text="Journals")
+        
         # Settings tab
         self.settings_tab = ttk.Frame(self.notebook)
         self.notebook.add(self.settings_tab, text="Settings")
@@ -228,6 +235,10 @@ class FocusBuddyApp:
         self.time_indicator = ttk.Label(status_frame, text="Time: 00:00", font=("Arial", 16))
         self.time_indicator.pack(side=tk.RIGHT, padx=5, pady=5)
         
+        # Per-stage throughput of the video pipeline
+        self.pipeline_label = ttk.Label(left_frame, text="", foreground="gray")
+        self.pipeline_label.pack(anchor=tk.W, padx=10)
+        
         # Control buttons
         control_frame = ttk.Frame(left_frame)
         control_frame.pack(fill=tk.X, padx=5, pady=5)
@@ -276,22 +287,34 @@ class FocusBuddyApp:
         history_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=5, pady=5)
         
         # Week summary (placeholder for chart)
-        week_chart_label = ttk.Label(history_frame, text="Weekly Focus Scores")
-        week_chart_label.pack(anchor=tk.W, padx=5, pady=5)
+        chart_header = ttk.Frame(history_frame)
+        chart_header.pack(fill=tk.X, padx=5, pady=5)
+        
+        week_chart_label = ttk.Label(chart_header, text="Focus Scores")
+        week_chart_label.pack(side=tk.LEFT)
+        
+        self.chart_range_var = tk.StringVar(value="7 days")
+        chart_range_combo = ttk.Combobox(chart_header, textvariable=self.chart_range_var,
+                                        values=[f"{days} days" for days in CHART_RANGES],
+                                        width=10, state="readonly")
+        chart_range_combo.pack(side=tk.RIGHT)
+        chart_range_combo.bind("<<ComboboxSelected>>", lambda e: self.generate_weekly_chart())
         
         self.week_chart_frame = ttk.Frame(history_frame, height=200)
         self.week_chart_frame.pack(fill=tk.X, padx=5, pady=5)
+        self.chart_canvas = None
+        self.chart_items = []
+        self.chart_range_days = 7
+        self.chart_cache = {}  # only touched on the persistence worker
+        self.chart_key = None
         
         # Session history
-        ttk.Label(history_frame, text="Recent Sessions:", style="Header.TLabel").pack(anchor=tk.W, padx=5, pady=5)
+        ttk.Label(history_frame, text="Sessions:", style="Header.TLabel").pack(anchor=tk.W, padx=5, pady=5)
         
         history_list_frame = ttk.Frame(history_frame)
         history_list_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
         self.history_tree = ttk.Treeview(history_list_frame, columns=("date", "duration", "score"), show="headings")
-        self.history_tree.heading("date", text="Date")
-        self.history_tree.heading("duration", text="Duration")
-        self.history_tree.heading("score", text="Score")
         self.history_tree.column("date", width=120)
         self.history_tree.column("duration", width=80)
         self.history_tree.column("score", width=80)
@@ -299,7 +322,10 @@ class FocusBuddyApp:
         
         history_scrollbar = ttk.Scrollbar(history_list_frame, orient="vertical", command=self.history_tree.yview)
         history_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.history_tree.configure(yscrollcommand=history_scrollbar.set)
+        self.history_tree.bind("<Double-1>", self.on_history_double_click)
+        
+        # Pages through all sessions as the user scrolls
+        self.history_view = SessionHistoryView(self.history_tree, history_scrollbar, self.persistence)
         
         # Right side - Badges
         # Create the frame with width specified at creation time, not in pack
@@ -320,6 +346,40 @@ class FocusBuddyApp:
         self.badges_frame = ttk.Frame(self.badges_canvas)
         self.badges_canvas.create_window((0, 0), window=self.badges_frame, anchor="nw")
         
+        # Journals tab content
+        journals_frame = ttk.Frame(self.journals_tab)
+        journals_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        
+        search_frame = ttk.Frame(journals_frame)
+        search_frame.pack(fill=tk.X, padx=5, pady=5)
+        
+        ttk.Label(search_frame, text="Search:").pack(side=tk.LEFT, padx=5)
+        self.journal_search_var = tk.StringVar()
+        ttk.Entry(search_frame, textvariable=self.journal_search_var).pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        ttk.Button(search_frame, text="Rebuild Index", 
+                 command=self.rebuild_journal_index).pack(side=tk.RIGHT, padx=5)
+        
+        journal_list_frame = ttk.Frame(journals_frame)
+        journal_list_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        self.journal_tree = ttk.Treeview(journal_list_frame, columns=("date", "snippet"), show="headings", height=10)
+        self.journal_tree.heading("date", text="Date")
+        self.journal_tree.heading("snippet", text="Journal")
+        self.journal_tree.column("date", width=120, stretch=False)
+        self.journal_tree.column("snippet", width=500)
+        self.journal_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        
+        journal_scrollbar = ttk.Scrollbar(journal_list_frame, orient="vertical", command=self.journal_tree.yview)
+        journal_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.journal_tree.configure(yscrollcommand=journal_scrollbar.set)
+        
+        self.journal_text = scrolledtext.ScrolledText(journals_frame, height=10, wrap=tk.WORD, state=tk.DISABLED)
+        self.journal_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        # Searches run in the background as the user types
+        self.journal_browser = JournalBrowser(self.journal_search_var, self.journal_tree,
+                                              self.journal_text, self.persistence)
+        
         # Settings tab content
         settings_frame = ttk.Frame(self.settings_tab)
         settings_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
@@ -338,6 +398,34 @@ class FocusBuddyApp:
         sensitivity_combo = ttk.Combobox(focus_settings, textvariable=self.sensitivity_var, 
                                         values=["Low", "Medium", "High"], width=10, state="readonly")
         sensitivity_combo.grid(row=1, column=1, padx=5, pady=5, sticky=tk.W)
+        sensitivity_combo.bind("<<ComboboxSelected>>", self.on_sensitivity_changed)
+        
+        ttk.Label(focus_settings, text="Face Tracking (faster):").grid(row=2, column=0, padx=5, pady=5, sticky=tk.W)
+        self.tracking_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(focus_settings, variable=self.tracking_var,
+                      command=self.on_tracking_changed).grid(row=2, column=1, padx=5, pady=5, sticky=tk.W)
+        
+        ttk.Label(focus_settings, text="Detection Resolution:").grid(row=3, column=0, padx=5, pady=5, sticky=tk.W)
+        self.resolution_var = tk.StringVar(value="Auto")
+        resolution_combo = ttk.Combobox(focus_settings, textvariable=self.resolution_var,
+                                       values=list(DETECTION_RESOLUTIONS), width=10, state="readonly")
+        resolution_combo.grid(row=3, column=1, padx=5, pady=5, sticky=tk.W)
+        resolution_combo.bind("<<ComboboxSelected>>", self.on_resolution_changed)
+        
+        ttk.Label(focus_settings, text="Detection CPU Budget (%):").grid(row=4, column=0, padx=5, pady=5, sticky=tk.W)
+        self.cpu_budget_var = tk.StringVar(value="25")
+        cpu_budget_entry = ttk.Entry(focus_settings, textvariable=self.cpu_budget_var, width=5)
+        cpu_budget_entry.grid(row=4, column=1, padx=5, pady=5, sticky=tk.W)
+        
+        ttk.Label(focus_settings, text="Preview FPS:").grid(row=5, column=0, padx=5, pady=5, sticky=tk.W)
+        self.preview_fps_var = tk.StringVar(value=f"{self.preview_fps:g}")
+        preview_fps_entry = ttk.Entry(focus_settings, textvariable=self.preview_fps_var, width=5)
+        preview_fps_entry.grid(row=5, column=1, padx=5, pady=5, sticky=tk.W)
+        
+        ttk.Label(focus_settings, text="Skip Unchanged Frames:").grid(row=6, column=0, padx=5, pady=5, sticky=tk.W)
+        self.motion_gate_var = tk.BooleanVar(value=True)
+        ttk.Checkbutton(focus_settings, variable=self.motion_gate_var,
+                      command=self.on_motion_gate_changed).grid(row=6, column=1, padx=5, pady=5, sticky=tk.W)
         
         # Distracting Sites settings
         sites_frame = ttk.LabelFrame(settings_frame, text="Distracting Sites")
@@ -349,6 +437,41 @@ class FocusBuddyApp:
         self.sites_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         self.sites_text.insert("1.0", "\n".join(self.distracting_sites))
         
+        blocklist_buttons = ttk.Frame(sites_frame)
+        blocklist_buttons.pack(fill=tk.X, padx=5, pady=0)
+        
+        ttk.Button(blocklist_buttons, text="Import Blocklist", 
+                 command=self.import_blocklist).pack(side=tk.LEFT, padx=5, pady=5)
+        ttk.Button(blocklist_buttons, text="Clear Imported", 
+                 command=self.clear_blocklist).pack(side=tk.LEFT, padx=5, pady=5)
+        
+        self.blocklist_label = ttk.Label(blocklist_buttons, text="No blocklist imported")
+        self.blocklist_label.pack(side=tk.LEFT, padx=5, pady=5)
+        
+        # How sites are blocked during a session
+        blocking_settings = ttk.Frame(sites_frame)
+        blocking_settings.pack(fill=tk.X, padx=5, pady=0)
+        
+        ttk.Label(blocking_settings, text="Blocking Method:").grid(row=0, column=0, padx=5, pady=5, sticky=tk.W)
+        self.blocking_method_var = tk.StringVar(value="Hosts file")
+        ttk.Combobox(blocking_settings, textvariable=self.blocking_method_var,
+                     values=["Hosts file", "DNS sinkhole"], width=14,
+                     state="readonly").grid(row=0, column=1, padx=5, pady=5, sticky=tk.W)
+        
+        ttk.Label(blocking_settings, text="Sinkhole Address:").grid(row=1, column=0, padx=5, pady=5, sticky=tk.W)
+        self.dns_listen_var = tk.StringVar(value="127.0.0.1:53")
+        ttk.Entry(blocking_settings, textvariable=self.dns_listen_var,
+                  width=22).grid(row=1, column=1, padx=5, pady=5, sticky=tk.W)
+        
+        ttk.Label(blocking_settings, text="Upstream DNS:").grid(row=2, column=0, padx=5, pady=5, sticky=tk.W)
+        self.dns_upstream_var = tk.StringVar(value="1.1.1.1:53")
+        ttk.Entry(blocking_settings, textvariable=self.dns_upstream_var,
+                  width=22).grid(row=2, column=1, padx=5, pady=5, sticky=tk.W)
+        
+        ttk.Label(sites_frame, text="Distracting apps (comma-separated, wildcards allowed):").pack(anchor=tk.W, padx=5, pady=5)
+        self.apps_var = tk.StringVar(value=", ".join(self.distracting_apps))
+        ttk.Entry(sites_frame, textvariable=self.apps_var).pack(fill=tk.X, padx=5, pady=0)
+        
         ttk.Label(sites_frame, text="Auto-start focus when distracting site detected:").pack(anchor=tk.W, padx=5, pady=5)
         self.auto_focus_var = tk.BooleanVar(value=True)
         auto_focus_check = ttk.Checkbutton(sites_frame, variable=self.auto_focus_var)
@@ -358,6 +481,16 @@ class FocusBuddyApp:
         sound_frame = ttk.LabelFrame(settings_frame, text="Alert Sound")
         sound_frame.pack(fill=tk.X, padx=5, pady=5)
         
+        style_settings = ttk.Frame(sound_frame)
+        style_settings.pack(fill=tk.X, padx=5, pady=5)
+        
+        ttk.Label(style_settings, text="Alert Style:").pack(side=tk.LEFT, padx=5, pady=5)
+        self.alert_style_var = tk.StringVar(value=DEFAULT_PROFILE)
+        alert_style_combo = ttk.Combobox(style_settings, textvariable=self.alert_style_var,
+                                         values=list(PROFILES), width=10, state="readonly")
+        alert_style_combo.pack(side=tk.LEFT, padx=5, pady=5)
+        alert_style_combo.bind("<<ComboboxSelected>>", self.on_alert_style_changed)
+        
         sound_buttons = ttk.Frame(sound_frame)
         sound_buttons.pack(fill=tk.X, padx=5, pady=5)
         
@@ -366,15 +499,26 @@ class FocusBuddyApp:
         ttk.Button(sound_buttons, text="Test Sound", 
                  command=self.test_sound).pack(side=tk.LEFT, padx=5, pady=5)
         
-        self.sound_label = ttk.Label(sound_frame, text="Using default alert sound")
+        self.sound_label = ttk.Label(sound_frame, text="Using default alert sound (gets louder and faster if ignored)")
         self.sound_label.pack(anchor=tk.W, padx=5, pady=5)
         
+        # Backup settings
+        backup_frame = ttk.LabelFrame(settings_frame, text="Backup")
+        backup_frame.pack(fill=tk.X, padx=5, pady=5)
+        
+        ttk.Button(backup_frame, text="Export Data", 
+                 command=self.export_data).pack(side=tk.LEFT, padx=5, pady=5)
+        ttk.Button(backup_frame, text="Import Data", 
+                 command=self.import_data).pack(side=tk.LEFT, padx=5, pady=5)
+        
         # Apply settings button
         ttk.Button(settings_frame, text="Apply Settings", 
                  command=self.apply_settings).pack(anchor=tk.E, padx=5, pady=10)
         
         # Load saved sessions into history
         self.load_session_history()
+        self.journal_browser.refresh()
+        self.compile_blocklist()
     
     def toggle_monitoring(self):
         """Toggle between start and stop monitoring"""
@@ -403,13 +547,21 @@ class FocusBuddyApp:
             self.hardcore_button.config(text="Hardcore Mode")
             self.mode_label.config(text="Normal")
     
-    def start_monitoring(self):
+    def start_monitoring(self, waited=0.0):
         """Start the camera monitoring"""
         if self.running:
             return
+        
+        # The last session's threads may still be winding down; they must
+        # let go of the camera before it is opened again. Their Tk calls
+        # need the main loop, so wait from it instead of blocking it.
+        if self.pipeline_alive() and waited < PIPELINE_EXIT_TIMEOUT:
+            self.root.after(50, self.start_monitoring, waited + 0.05)
+            return
             
-        # Initialize camera
-        self.cap = cv2.VideoCapture(0)
+        # Initialize camera (or another frame source; recorded and
+        # synthetic ones loop, so the session lasts until it is stopped)
+        self.cap = open_source(self.frame_source, loop=True)
         if not self.cap.isOpened():
             messagebox.showerror("Camera Error", "Cannot access camera! Please check your camera connection.")
             self.status_label.config(text="Error - Cannot access camera!")
@@ -419,31 +571,59 @@ class FocusBuddyApp:
         self.start_button.config(text="Stop Session", style="Stop.TButton")
         self.status_label.config(text="Session Active")
         self.session_start_time = time.time()
-        self.total_focus_time = 0
+        self.focus_tracker.reset(now=self.session_start_time)
+        self.face_detector.reset()
+        self.detection_scheduler.reset(now=self.session_start_time)
         
         # Block distracting sites
         self.block_distracting_sites()
         
+        # Capture, detection and preview run as separate stages joined by
+        # latest-frame-wins queues, so a slow stage drops stale frames
+        # instead of delaying the others. Each stage gets this session's
+        # queues and stop event, so a stage left over from an earlier
+        # session can never pick up the new ones.
+        self.session_stop = threading.Event()
+        self.frame_queue = LatestFrameQueue(maxsize=1)
+        self.preview_queue = LatestFrameQueue(maxsize=1)
+        self.capture_stats = StageStats("Capture")
+        self.detect_stats = StageStats("Detect")
+        self.render_stats = StageStats("Preview")
+        self.stage_stats = [self.capture_stats, self.detect_stats, self.render_stats]
+        
+        # Start capture thread; it owns the capture from here on and
+        # releases it when the session stops
+        self.capture_thread = threading.Thread(target=self.capture_frames,
+                                               args=(self.cap, self.frame_queue, self.session_stop))
+        self.capture_thread.daemon = True
+        self.capture_thread.start()
+        
         # Start video processing thread
-        self.video_thread = threading.Thread(target=self.process_video)
+        self.video_thread = threading.Thread(target=self.process_video,
+                                             args=(self.frame_queue, self.preview_queue, self.session_stop))
         self.video_thread.daemon = True
         self.video_thread.start()
         
+        # Preview rendering runs on the Tk main loop
+        self.root.after(0, self.render_preview, self.preview_queue, self.session_stop)
+        
         # Start timer update thread
-        self.timer_thread = threading.Thread(target=self.update_timer)
+        self.timer_thread = threading.Thread(target=self.update_timer, args=(self.session_stop,))
         self.timer_thread.daemon = True
         self.timer_thread.start()
     
-    def stop_monitoring(self):
-        """Stop the camera monitoring"""
-        if not self.running:
+    def stop_monitoring(self, session=None):
+        """Stop the camera monitoring (only if session, when given, is still the current one)"""
+        if not self.running or (session is not None and session is not self.session_stop):
             return
             
         # Calculate total session time
-        session_time = time.time() - self.session_start_time
+        now = time.time()
+        session_time = now - self.session_start_time
         
-        # Calculate focus score (percentage of time focused)
-        focus_score = min(100, int((self.total_focus_time / session_time) * 100)) if session_time > 0 else 0
+        # Calculate focus score (percentage of time focused) from the timeline
+        focus_score = self.focus_tracker.focus_score(now)
+        timeline_blob = self.focus_tracker.timeline.to_blob(session_time)
         
         # Update UI
         self.running = False
@@ -451,13 +631,14 @@ class FocusBuddyApp:
         self.status_label.config(text="Session Completed")
         self.score_label.config(text=f"{focus_score}%")
         
-        # Release camera
-        if self.cap is not None:
-            self.cap.release()
-            self.cap = None
+        # Stop the pipeline stages; the capture thread releases the camera
+        # once its current read returns
+        self.close_pipeline()
+        self.cap = None
         
         # Reset indicators
         self.focus_indicator.config(text="🔴 Not Focused")
+        self.pipeline_label.config(text="")
         
         # Stop any active alerts
         self.stop_alert()
@@ -465,22 +646,12 @@ class FocusBuddyApp:
         # Unblock sites
         self.unblock_distracting_sites()
         
-        # Save session data
-        self.save_session(session_time, focus_score)
-        
-        # Update stats
-        self.update_focus_stats()
-        
-        # Check for badges
-        self.check_badges(session_time, focus_score)
-        
-        # Show journal dialog if session was longer than 5 minutes
-        if session_time > 300:  # 5 minutes
-            self.show_journal_dialog()
+        # Save the session, award badges and reload the stats in the background
+        self.save_session(session_time, focus_score, timeline_blob)
     
-    def update_timer(self):
+    def update_timer(self, stop):
         """Update the session timer display"""
-        while self.running:
+        while not stop.is_set():
             if self.session_start_time:
                 elapsed = time.time() - self.session_start_time
                 mins, secs = divmod(int(elapsed), 60)
@@ -493,88 +664,83 @@ class FocusBuddyApp:
                 
                 self.time_indicator.config(text=f"Time: {time_str}")
             
-            time.sleep(1)
+            stop.wait(1)
+    
+    def close_pipeline(self):
+        """Wake up and stop all video pipeline stages"""
+        if self.session_stop is not None:
+            self.session_stop.set()
+        for queue in (self.frame_queue, self.preview_queue):
+            if queue is not None:
+                queue.close()
     
-    def process_video(self):
-        """Process video frames and detect faces"""
-        frame_count = 0
-        last_focus_check = time.time()
-        focused_time = 0
-        
-        while self.running and self.cap is not None:
-            ret, frame = self.cap.read()
-            if not ret:
-                self.status_label.config(text="Error - Camera disconnected!")
-                if not self.hardcore_mode:
-                    self.stop_monitoring()
-                break
+    def pipeline_alive(self):
+        """Whether the capture or detection thread of the last session is still running"""
+        return any(thread is not None and thread.is_alive()
+                   for thread in (self.capture_thread, self.video_thread))
+    
+    def capture_frames(self, cap, frame_queue, stop):
+        """Capture stage: read camera frames as fast as the camera delivers them"""
+        # A camera delivers frames in real time; other sources would be read
+        # as fast as they decode, so they are paced to their frame rate
+        interval = 0.0 if isinstance(cap, CameraSource) else 1.0 / cap.fps
+        next_frame = time.time()
+        try:
+            while not stop.is_set():
+                ret, frame = cap.read()
+                if not ret:
+                    if stop.is_set():
+                        break
+                    self.status_label.config(text="Error - Camera disconnected!")
+                    if not self.hardcore_mode:
+                        self.root.after(0, self.stop_monitoring, stop)
+                    break
                 
-            # Process every 2nd frame for better performance
-            frame_count += 1
-            if frame_count % 2 != 0:
-                continue
+                # Hand the newest frame to the detector; stale frames are dropped
+                frame_queue.put((time.time(), frame))
+                self.capture_stats.tick()
                 
-            # Convert to grayscale for detection
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            
-            # Apply histogram equalization for better contrast
-            gray = cv2.equalizeHist(gray)
-            
-            # Detect faces with adjusted parameters based on sensitivity
-            sensitivity = self.sensitivity_var.get()
-            if sensitivity == "Low":
-                min_neighbors = 3
-                scale_factor = 1.2
-            elif sensitivity == "High":
-                min_neighbors = 7
-                scale_factor = 1.05
-            else:  # Medium
-                min_neighbors = 5
-                scale_factor = 1.1
-            
-            faces = self.face_cascade.detectMultiScale(
-                gray, 
-                scaleFactor=scale_factor, 
-                minNeighbors=min_neighbors, 
-                minSize=(30, 30),
-                flags=cv2.CASCADE_SCALE_IMAGE
-            )
-            
-            # Update focused status based on face detection
-            focused = len(faces) > 0
-            
-            # Draw rectangles on detected faces
-            for (x, y, w, h) in faces:
-                cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
-            
-            # Update focus buffer for stabilization
-            self.focus_buffer[self.focus_index] = focused
-            self.focus_index = (self.focus_index + 1) % len(self.focus_buffer)
+                if interval:
+                    next_frame += interval
+                    delay = next_frame - time.time()
+                    if delay > 0:
+                        stop.wait(delay)
+                    else:
+                        # Fell behind; carry on from now rather than catch up
+                        next_frame = time.time()
+        finally:
+            frame_queue.close()
+            # Released here rather than by stop_monitoring, so it can't
+            # happen in the middle of a read
+            cap.release()
+    
+    def process_video(self, frame_queue, preview_queue, stop):
+        """Detection stage: detect faces on the newest captured frame"""
+        last_score_update = time.time()
+        
+        while not stop.is_set():
+            item = frame_queue.get(timeout=0.5)
+            if item is None:
+                if frame_queue.closed:
+                    break
+                continue
+            captured_at, frame = item
             
-            # Determine stable focus state (majority vote)
-            stable_focused = sum(self.focus_buffer) > len(self.focus_buffer) / 2
+            # Detect faces and update the stabilized focus state
+            detect_start = time.time()
+            faces = self.face_detector.detect(frame)
+            state = self.focus_tracker.update(len(faces) > 0)
+            stable_focused = state == FOCUSED
+            self.detection_scheduler.record(self.focus_tracker, time.time() - detect_start)
             
-            # Update time of last detection
-            if stable_focused:
-                self.last_detection_time = time.time()
-                
-                # Update total focus time every second
-                current_time = time.time()
-                if current_time - last_focus_check >= 1:
-                    focused_time = current_time - last_focus_check
-                    self.total_focus_time += focused_time
-                    last_focus_check = current_time
-                    
-                    # Update focus score in UI
-                    session_time = current_time - self.session_start_time
-                    focus_score = min(100, int((self.total_focus_time / session_time) * 100)) if session_time > 0 else 0
-                    self.score_label.config(text=f"{focus_score}%")
-            else:
-                last_focus_check = time.time()
+            # Update focus score in UI every second
+            current_time = time.time()
+            if current_time - last_score_update >= 1:
+                last_score_update = current_time
+                self.score_label.config(text=f"{self.focus_tracker.focus_score(current_time)}%")
             
             # Check if person is not focused for too long
-            time_since_focus = time.time() - self.last_detection_time
-            if not stable_focused and time_since_focus > self.grace_period:
+            if state == UNFOCUSED:
                 if not self.alert_active:
                     self.start_alert()
                 self.focus_indicator.config(text="🔴 Not Focused")
@@ -584,24 +750,23 @@ class FocusBuddyApp:
                 if stable_focused:
                     self.focus_indicator.config(text="🟢 Focused")
                 else:
-                    remaining = max(0, self.grace_period - time_since_focus)
+                    remaining = self.focus_tracker.grace_remaining(current_time)
                     self.focus_indicator.config(text=f"🟡 Grace Period: {remaining:.1f}s")
             
-            # Add status text to frame
-            status_text = "Focused" if stable_focused else "Not Focused"
-            cv2.putText(frame, status_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, 
-                      (0, 255, 0) if stable_focused else (0, 0, 255), 2)
-            
-            # Convert frame for display
-            cv2image = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            img = Image.fromarray(cv2image)
-            
-            # Resize to specified size
-            img = img.resize((self.video_width, self.video_height), Image.LANCZOS)
+            # Annotate and hand the frame to the preview stage, unless the
+            # preview is hidden
+            if self.preview_visible:
+                # Draw rectangles on detected faces
+                for (x, y, w, h) in faces:
+                    cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
                 
-            imgtk = ImageTk.PhotoImage(image=img)
-            self.video_label.imgtk = imgtk
-            self.video_label.config(image=imgtk)
+                # Add status text to frame
+                status_text = "Focused" if stable_focused else "Not Focused"
+                cv2.putText(frame, status_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, 
+                          (0, 255, 0) if stable_focused else (0, 0, 255), 2)
+                
+                preview_queue.put((captured_at, frame))
+            self.detect_stats.tick(latency=time.time() - captured_at)
             
             # Check for hardcore mode minimum time
             if self.hardcore_mode:
@@ -611,17 +776,75 @@ class FocusBuddyApp:
                     self.hardcore_mode = False
                     self.hardcore_button.config(text="Hardcore Mode")
                     self.mode_label.config(text="Normal (Completed Hardcore)")
-                    messagebox.showinfo("Hardcore Completed", 
-                                      "You've completed the minimum hardcore session time! You can now end the session if needed.")
-            
-            # Short delay to reduce CPU usage
-            time.sleep(0.03)
+                    self.root.after(0, messagebox.showinfo, "Hardcore Completed", 
+                                    "You've completed the minimum hardcore session time! You can now end the session if needed.")
+            
+            # Wait until the next detection is due; meanwhile the capture
+            # stage keeps replacing the queued frame with the newest one
+            delay = self.detection_scheduler.next_interval(self.focus_tracker) - (time.time() - detect_start)
+            if delay > 0:
+                stop.wait(delay)
+    
+    def render_preview(self, preview_queue, stop):
+        """Preview stage: show the newest annotated frame on the Tk main loop"""
+        if stop.is_set():
+            return
+        
+        # Don't render at all while the preview can't be seen
+        self.preview_visible = (self.notebook.select() == str(self.main_tab)
+                                and self.root.state() != "iconic")
+        
+        if self.preview_renderer is None:
+            self.preview_renderer = PreviewRenderer(self.video_label, self.video_width, self.video_height,
+                                                    max_fps=self.preview_fps)
+        
+        if self.preview_visible and self.preview_renderer.due():
+            item = preview_queue.get_nowait()
+            if item is not None:
+                captured_at, frame = item
+                self.preview_renderer.render(frame)
+                self.render_stats.tick(latency=time.time() - captured_at)
+        elif not self.preview_visible:
+            # Drop anything queued before the preview was hidden
+            preview_queue.get_nowait()
+        
+        # Refresh the throughput summary about once a second
+        if time.time() - self.last_stats_refresh >= 1:
+            self.last_stats_refresh = time.time()
+            if self.preview_visible:
+                summary = format_stage_stats(self.stage_stats)
+                if self.face_detector.motion_gate is not None:
+                    summary += f" | Reused {self.face_detector.reuse_rate():.0%}"
+                self.pipeline_label.config(text=summary)
+        
+        self.root.after(15 if self.preview_visible else 250, self.render_preview, preview_queue, stop)
+    
+    def on_sensitivity_changed(self, event=None):
+        """Apply a new detection sensitivity immediately"""
+        self.face_detector.sensitivity = self.sensitivity_var.get()
+        self.face_detector.reset()
+    
+    def on_resolution_changed(self, event=None):
+        """Apply a new detection resolution (Auto follows the sensitivity)"""
+        self.face_detector.detect_width = DETECTION_RESOLUTIONS[self.resolution_var.get()]
+        self.face_detector.reset()
+    
+    def on_motion_gate_changed(self):
+        """Turn reuse of detection results on static scenes on or off"""
+        self.face_detector.motion_gate = MotionGate() if self.motion_gate_var.get() else None
+    
+    def on_tracking_changed(self):
+        """Switch between region-of-interest tracking and full-frame scans"""
+        self.face_detector.tracking = self.tracking_var.get()
+        self.face_detector.reset()
     
     def start_alert(self):
         """Start the alert when the person is not focusing"""
         if self.alert_active:
             return
             
+        # Each distraction starts again at the gentlest alert
+        self.warning_count = 0
         self.alert_active = True
         self.alert_thread = threading.Thread(target=self.alert_loop)
         self.alert_thread.daemon = True
@@ -643,22 +866,21 @@ class FocusBuddyApp:
         
         while self.alert_active and self.running:
             # Display a rotating message
-            message = alert_messages[self.warning_count % len(alert_messages)]
+            warnings = self.warning_count
+            message = alert_messages[warnings % len(alert_messages)]
             self.warning_count += 1
             
-            # Play sound
-            self.play_alert_sound()
+            # Play sound, escalating with each warning
+            self.play_alert_sound(warnings)
             
-            # Wait before next alert
-            time.sleep(3)
+            # Wait before next alert (sooner as it escalates)
+            time.sleep(self.sound_bank.interval(warnings) if self.sound_bank else 3)
     
-    def play_alert_sound(self):
-        """Play the alert sound"""
+    def play_alert_sound(self, warning_count=0):
+        """Play the alert sound for the given number of warnings so far"""
         try:
-            if self.alarm_sound_file and os.path.exists(self.alarm_sound_file):
-                sound = pygame.mixer.Sound(self.alarm_sound_file)
-                sound.set_volume(1.0)  # Max volume
-                sound.play()
+            if self.sound_bank is not None:
+                self.sound_bank.play(warning_count)
         except Exception as e:
             print(f"Error playing sound: {e}")
             # Try system beep as fallback
@@ -676,10 +898,62 @@ class FocusBuddyApp:
             filetypes=[("Sound Files", "*.wav *.mp3")]
         )
         
-        if file_path:
-            self.alarm_sound_file = file_path
+        if file_path and self.sound_bank is not None:
+            try:
+                # Decoded once here, not on every alert
+                self.sound_bank.load_file(file_path)
+            except pygame.error as e:
+                messagebox.showerror("Select Sound", f"Could not load {os.path.basename(file_path)}: {e}")
+                return
             self.sound_label.config(text=f"Selected: {os.path.basename(file_path)}")
     
+    def on_alert_style_changed(self, event=None):
+        """Switch to a built-in alert style"""
+        if self.sound_bank is not None:
+            self.sound_bank.set_profile(self.alert_style_var.get())
+            self.sound_label.config(text=f"Using {self.alert_style_var.get()} alert sound")
+    
+    def export_data(self):
+        """Export sessions, journals and badges to a file"""
+        file_path = filedialog.asksaveasfilename(
+            title="Export Data",
+            defaultextension=".ndjson",
+            filetypes=[("NDJSON", "*.ndjson *.jsonl")]
+        )
+        if not file_path:
+            return
+        
+        self.persistence.read(
+            lambda storage: data_io.export_data(storage, file_path),
+            lambda counts: messagebox.showinfo(
+                "Export Data", f"Exported {counts['sessions']} sessions and {counts['badges']} badges."),
+            lambda e: messagebox.showerror("Export Data", f"Export failed: {e}"))
+    
+    def import_data(self):
+        """Import sessions, journals and badges from an exported file"""
+        file_path = filedialog.askopenfilename(
+            title="Import Data",
+            filetypes=[("NDJSON", "*.ndjson *.jsonl")]
+        )
+        if not file_path:
+            return
+        
+        # Submitted as a read so it is not wrapped in a batch transaction:
+        # the import commits chunk by chunk itself
+        self.persistence.read(
+            lambda storage: data_io.import_data(storage, file_path, engine=self.badge_engine),
+            self.on_data_imported,
+            lambda e: messagebox.showerror("Import Data", f"Import failed: {e}"))
+    
+    def on_data_imported(self, counts):
+        """Refresh everything after an import (Tk thread)"""
+        sessions, badges = counts["sessions"][1], counts["badges"][1]
+        messagebox.showinfo("Import Data", f"Imported {sessions} new sessions and {badges} new badges.")
+        self.update_focus_stats()
+        self.update_badges_display()
+        self.load_session_history()
+        self.journal_browser.refresh()
+    
     def test_sound(self):
         """Test the currently selected sound"""
         self.play_alert_sound()
@@ -691,12 +965,32 @@ class FocusBuddyApp:
             new_grace = float(self.grace_var.get())
             if new_grace > 0:
                 self.grace_period = new_grace
+                self.focus_tracker.grace_period = new_grace
+            
+            # Update detection CPU budget
+            new_budget = float(self.cpu_budget_var.get())
+            if 0 < new_budget <= 100:
+                self.detection_scheduler.cpu_budget = new_budget / 100
+            
+            # Update preview frame rate cap
+            new_preview_fps = float(self.preview_fps_var.get())
+            if new_preview_fps > 0:
+                self.preview_fps = new_preview_fps
+                if self.preview_renderer is not None:
+                    self.preview_renderer.max_fps = new_preview_fps
             
             # Update distracting sites
             sites_text = self.sites_text.get("1.0", "end-1c")
             sites = [site.strip() for site in sites_text.split('\n') if site.strip()]
             if sites:
                 self.distracting_sites = sites
+                self.compile_blocklist()
+            
+            # Update distracting apps
+            apps = [app.strip() for app in self.apps_var.get().split(',') if app.strip()]
+            if apps != self.distracting_apps:
+                self.distracting_apps = apps
+                self.process_watcher.set_apps(apps)
             
             messagebox.showinfo("Settings", "Settings applied successfully!")
             
@@ -704,16 +998,46 @@ class FocusBuddyApp:
             messagebox.showerror("Invalid Input", f"Please enter valid numbers: {e}")
     
     def block_distracting_sites(self):
+        """Block distracting sites with the blocking method chosen in Settings"""
+        if self.blocking_method_var.get() == "DNS sinkhole":
+            self.start_dns_sinkhole()
+        else:
+            self.block_with_hosts_file()
+    
+    def unblock_distracting_sites(self):
+        """Undo whichever blocking method is in effect"""
+        self.stop_dns_sinkhole()
+        self.unblock_hosts_file()
+    
+    def start_dns_sinkhole(self):
+        """Answer DNS queries for blocked sites locally (and forward the rest) while the session runs"""
+        if self.dns_sinkhole is not None:
+            return
+        listen = self.dns_listen_var.get()
+        try:
+            sinkhole = DnsSinkhole(self.blocklist, parse_address(self.dns_upstream_var.get()))
+            self.dns_sinkhole = SinkholeThread(sinkhole, parse_address(listen))
+            self.dns_sinkhole.start()
+        except (OSError, ValueError) as e:
+            self.dns_sinkhole = None
+            print(f"Error starting DNS sinkhole: {e}")
+            messagebox.showwarning("Site Blocking",
+                                   f"Could not start the DNS sinkhole on {listen}: {e}\n"
+                                   "Port 53 needs administrator privileges; another port works if "
+                                   "your DNS settings point to it.")
+    
+    def stop_dns_sinkhole(self):
+        if self.dns_sinkhole is not None:
+            self.dns_sinkhole.stop()
+            self.dns_sinkhole = None
+    
+    def block_with_hosts_file(self):
         """Block distracting sites by modifying hosts file"""
         try:
-            # Get hosts file path based on OS
-            if platform.system() == "Windows":
-                hosts_path = r"C:\Windows\System32\drivers\etc\hosts"
-            else:
-                hosts_path = "/etc/hosts"
+            hosts = HostsFile()
             
             # Check if we have permission to modify the hosts file
-            if not os.access(hosts_path, os.W_OK):
+            if not hosts.writable():
                 if platform.system() != "Windows":
                     messagebox.showwarning("Permission Error", 
                                          "FOCUSBuddy needs administrator privileges to block sites.\n"
@@ -724,267 +1048,350 @@ class FocusBuddyApp:
                                          "Try running as administrator.")
                 return
             
-            # Read current hosts file
-            with open(hosts_path, 'r') as file:
-                hosts_content = file.read()
-            
-            # Add comment markers
-            start_marker = "# FOCUSBuddy Start"
-            end_marker = "# FOCUSBuddy End"
-            
-            # Remove any existing FOCUSBuddy entries
-            if start_marker in hosts_content and end_marker in hosts_content:
-                start_idx = hosts_content.find(start_marker)
-                end_idx = hosts_content.find(end_marker) + len(end_marker)
-                hosts_content = hosts_content[:start_idx] + hosts_content[end_idx:]
-            
-            # Add new entries
-            hosts_content += f"\n{start_marker}\n"
-            for site in self.distracting_sites:
-                hosts_content += f"127.0.0.1 {site}\n"
-                if not site.startswith("www."):
-                    hosts_content += f"127.0.0.1 www.{site}\n"
-            hosts_content += f"{end_marker}\n"
-            
-            # Write back to hosts file
-            with open(hosts_path, 'w') as file:
-                file.write(hosts_content)
+            # Rewrites the file atomically, and only if the block list changed
+            hosts.apply_names(self.blocklist.hosts_names())
                 
         except Exception as e:
             print(f"Error blocking sites: {e}")
             messagebox.showwarning("Site Blocking", "Could not block distracting sites. You may need administrator privileges.")
     
-    def unblock_distracting_sites(self):
+    def compile_blocklist(self):
+        """Rebuild the blocklist from the sites list and the imported index in the background"""
+        self.blocklist_generation += 1
+        generation = self.blocklist_generation
+        sites = list(self.distracting_sites)
+        index_path = self.blocklist_path if os.path.exists(self.blocklist_path) else None
+        
+        def compile_in_background():
+            try:
+                blocklist = Blocklist.load(index_path) if index_path else Blocklist()
+                imported_count = len(blocklist)
+                blocklist.update(parse_lines(sites))
+                self.root.after(0, self.on_blocklist_compiled, generation, blocklist, imported_count)
+            except Exception as e:
+                print(f"Error loading blocklist: {e}")
+        
+        threading.Thread(target=compile_in_background, daemon=True).start()
+    
+    def on_blocklist_compiled(self, generation, blocklist, imported_count):
+        """Use a freshly compiled blocklist (Tk thread)"""
+        if generation != self.blocklist_generation:
+            return
+        self.blocklist = blocklist
+        if self.dns_sinkhole is not None:
+            self.dns_sinkhole.set_blocklist(blocklist)
+        self.history_watcher.blocklist = blocklist
+        if imported_count:
+            self.blocklist_label.config(text=f"Imported: {imported_count} domains")
+        else:
+            self.blocklist_label.config(text="No blocklist imported")
+    
+    def import_blocklist(self):
+        """Add hosts-format or domain-list files to the imported blocklist"""
+        file_paths = filedialog.askopenfilenames(
+            title="Import Blocklist",
+            filetypes=[("Blocklists", "*.txt *.hosts *.list"), ("All files", "*.*")]
+        )
+        if not file_paths:
+            return
+        
+        self.blocklist_label.config(text="Compiling blocklist...")
+        index_path = self.blocklist_path
+        
+        def import_in_background():
+            try:
+                imported = Blocklist.load(index_path) if os.path.exists(index_path) else None
+                imported = compile_files(file_paths, imported)
+                imported.save(index_path)
+                self.root.after(0, self.compile_blocklist)
+            except Exception as e:
+                self.root.after(0, messagebox.showerror, "Import Blocklist", f"Import failed: {e}")
+                self.root.after(0, self.compile_blocklist)
+        
+        threading.Thread(target=import_in_background, daemon=True).start()
+    
+    def clear_blocklist(self):
+        """Forget all imported blocklists"""
+        try:
+            if os.path.exists(self.blocklist_path):
+                os.remove(self.blocklist_path)
+        except OSError as e:
+            messagebox.showerror("Clear Imported", f"Could not remove the blocklist: {e}")
+        self.compile_blocklist()
+    
+    def unblock_hosts_file(self):
         """Unblock sites by removing entries from hosts file"""
         try:
-            # Get hosts file path based on OS
-            if platform.system() == "Windows":
-                hosts_path = r"C:\Windows\System32\drivers\etc\hosts"
-            else:
-                hosts_path = "/etc/hosts"
+            hosts = HostsFile()
             
             # Check if we have permission to modify the hosts file
-            if not os.access(hosts_path, os.W_OK):
+            if not hosts.writable():
                 return
             
-            # Read current hosts file
-            with open(hosts_path, 'r') as file:
-                hosts_content = file.read()
-            
             # Remove FOCUSBuddy entries
-            start_marker = "# FOCUSBuddy Start"
-            end_marker = "# FOCUSBuddy End"
-            
-            if start_marker in hosts_content and end_marker in hosts_content:
-                start_idx = hosts_content.find(start_marker)
-                end_idx = hosts_content.find(end_marker) + len(end_marker)
-                hosts_content = hosts_content[:start_idx] + hosts_content[end_idx:]
-                
-                # Write back to hosts file
-                with open(hosts_path, 'w') as file:
-                    file.write(hosts_content)
+            hosts.clear()
                     
         except Exception as e:
             print(f"Error unblocking sites: {e}")
     
     def monitor_distracting_sites(self):
-        """Background thread to monitor if user opens distracting sites"""
+        """Background thread that offers a focus session when a distracting site or app is opened"""
         check_interval = 5  # seconds between checks
         
         while True:
-            # Only monitor when not in a focus session and auto-focus is enabled
-            if not self.running and self.auto_focus_var.get():
-                try:
-                    # Check if any distracting site is open in browser
-                    # This is a simplified check - in reality, we can't directly check
-                    # browser tabs without browser extensions or OS-specific APIs
-                    
-                    # For Windows, we can check running processes
-                    if platform.system() == "Windows":
-                        import subprocess
-                        result = subprocess.check_output('tasklist /fo csv', shell=True).decode()
-                        browsers = ["chrome.exe", "firefox.exe", "msedge.exe", "iexplore.exe", "opera.exe", "brave.exe"]
-                        
-                        # If any browser is running, we'll show a notification
-                        browser_running = any(browser in result for browser in browsers)
-                        if browser_running:
-                            # We can't know exactly what sites are open, so we'll just prompt
-                            # the user to start a focus session if they're browsing
-                            self.root.after(0, self.show_distraction_warning)
-                            
-                except Exception as e:
-                    print(f"Error in site monitoring: {e}")
+            try:
+                # Both watchers only report what is new since the last check
+                # (and keep polling during sessions so their cursors move on)
+                started = [app for kind, app in self.process_watcher.poll() if kind == "start"]
+                visits = self.history_watcher.poll()
+                if self.history_watcher.profiles:
+                    # Browsers are judged by the sites they visit, not by running
+                    started = [app for app in started if app not in BROWSER_APPS]
+                
+                # Only prompt when not in a focus session and auto-focus is enabled
+                if not self.running and self.auto_focus_var.get():
+                    if visits:
+                        browser, host = visits[-1][:2]
+                        self.root.after(0, self.show_distraction_warning,
+                                        f"{host} was just opened in {browser}.")
+                    elif started:
+                        self.root.after(0, self.show_distraction_warning,
+                                        f"{', '.join(started)} just started.")
                     
+            except Exception as e:
+                print(f"Error in site monitoring: {e}")
+                
             time.sleep(check_interval)
     
-    def show_distraction_warning(self):
+    def show_distraction_warning(self, reason):
         """Show a warning about potential distractions"""
-        if not self.running and messagebox.askyesno("Distraction Alert", 
-                                                 "It looks like you might be browsing the web. "
-                                                 "Would you like to start a focus session?"):
-            self.start_monitoring()
-    
-    def save_session(self, duration, focus_score):
-        """Save session data to database"""
+        if self.running or self.distraction_prompt_open:
+            return
+        self.distraction_prompt_open = True
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            now = datetime.datetime.now().isoformat()
-            cursor.execute('''
-            INSERT INTO focus_sessions (start_time, duration, focus_score, hardcore_mode)
-            VALUES (?, ?, ?, ?)
-            ''', (now, int(duration), focus_score, 1 if self.hardcore_mode else 0))
-            
-            conn.commit()
-            conn.close()
-        except Exception as e:
-            print(f"Error saving session: {e}")
+            if messagebox.askyesno("Distraction Alert", 
+                                   f"{reason} "
+                                   "Would you like to start a focus session?"):
+                self.start_monitoring()
+        finally:
+            self.distraction_prompt_open = False
     
-    def update_journal(self, session_id, journal_text):
-        """Update a session with journal text"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+    def save_session(self, duration, focus_score, timeline_blob=None):
+        """Save session data to database, then refresh stats, badges and history"""
+        now = datetime.datetime.now()
+        hardcore = self.hardcore_mode
+        
+        def job(storage):
+            # Save session data
+            session_id = queries.save_session(storage, now, duration, focus_score, hardcore, timeline_blob)
             
-            cursor.execute('''
-            UPDATE focus_sessions SET journal_text = ? WHERE id = ?
-            ''', (journal_text, session_id))
+            # Check for badges
+            new_badges = self.badge_engine.on_session(storage, now, duration, hardcore)
             
-            conn.commit()
-            conn.close()
-        except Exception as e:
-            print(f"Error updating journal: {e}")
+            return session_id, duration, new_badges, self.load_focus_stats(storage)
+        
+        self.persistence.write(job, self.on_session_saved,
+                               lambda e: print(f"Error saving session: {e}"))
+    
+    def on_session_saved(self, result):
+        """Show the results of a saved session (Tk thread)"""
+        session_id, duration, new_badges, stats = result
+        
+        # Update stats
+        self.show_focus_stats(stats)
+        
+        # Show badge notifications
+        self.on_badges_earned(new_badges)
+        
+        # Show the new session in the history
+        self.load_session_history()
+        
+        # Show journal dialog if session was longer than 5 minutes
+        if duration > 300:  # 5 minutes
+            self.show_journal_dialog(session_id)
+    
+    def save_journal(self, session_id, journal_text):
+        """Save a session journal and check for the journaler badge"""
+        now = datetime.datetime.now()
+        
+        def job(storage):
+            return self.badge_engine.on_journal(storage, session_id, journal_text, now)
+        
+        self.persistence.write(job, self.on_journal_saved,
+                               lambda e: print(f"Error updating journal: {e}"))
+    
+    def on_journal_saved(self, new_badges):
+        """Show the saved journal and any badge it earned (Tk thread)"""
+        self.journal_browser.refresh()
+        self.on_badges_earned(new_badges)
+    
+    def rebuild_journal_index(self):
+        """Re-index all journals for search"""
+        def job(storage):
+            if not journal_search.fts5_available(storage):
+                raise RuntimeError("this SQLite build has no full-text search (FTS5)")
+            journal_search.rebuild_index(storage)
+        
+        # Submitted as a read so the rebuild commits on its own
+        self.persistence.read(job, lambda result: self.journal_browser.refresh(),
+                              lambda e: messagebox.showerror("Rebuild Index", f"Rebuild failed: {e}"))
+    
+    def on_badges_earned(self, new_badges):
+        """Announce newly earned badges (Tk thread)"""
+        if new_badges:
+            self.show_badge_notification(new_badges)
+            self.update_badges_display()
     
     def load_session_history(self):
         """Load session history from database"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Get recent sessions
-            cursor.execute('''
-            SELECT id, start_time, duration, focus_score
-            FROM focus_sessions
-            ORDER BY start_time DESC
-            LIMIT 20
-            ''')
-            
-            # Clear existing entries
-            for item in self.history_tree.get_children():
-                self.history_tree.delete(item)
-            
-            # Add sessions to tree view
-            for row in cursor.fetchall():
-                session_id, start_time, duration, score = row
-                
-                # Parse the ISO timestamp
-                dt = datetime.datetime.fromisoformat(start_time)
-                date_str = dt.strftime("%Y-%m-%d %H:%M")
-                
-                # Format duration
-                mins, secs = divmod(duration, 60)
-                hours, mins = divmod(mins, 60)
-                if hours > 0:
-                    duration_str = f"{hours}h {mins}m"
-                else:
-                    duration_str = f"{mins}m {secs}s"
-                
-                # Add to tree
-                self.history_tree.insert("", "end", values=(date_str, duration_str, f"{score}%"))
-            
-            conn.close()
+            self.history_view.refresh()
         except Exception as e:
             print(f"Error loading history: {e}")
     
+    def on_history_double_click(self, event):
+        """Open the per-minute timeline of the double-clicked session"""
+        item = self.history_tree.identify_row(event.y)
+        if item:
+            self.show_session_timeline(int(item))
+    
+    def show_session_timeline(self, session_id):
+        """Show a per-minute focus chart for one session"""
+        self.persistence.read(lambda storage: queries.session_timeline(storage, session_id),
+                              self.show_timeline_window,
+                              lambda e: print(f"Error loading timeline: {e}"))
+    
+    def show_timeline_window(self, row):
+        """Draw the timeline window once the session has been loaded (Tk thread)"""
+        if row is None or row[1] is None:
+            messagebox.showinfo("Session Timeline", "No timeline was recorded for this session.")
+            return
+        
+        start_time, blob = row
+        timeline, duration = FocusTimeline.from_blob(blob)
+        minutes = timeline.per_minute(duration)
+        totals = timeline.totals(duration)
+        
+        timeline_window = tk.Toplevel(self.root)
+        timeline_window.title("Session Timeline")
+        
+        dt = datetime.datetime.fromisoformat(start_time)
+        ttk.Label(timeline_window, text=f"Session of {dt.strftime('%Y-%m-%d %H:%M')}",
+                style="Header.TLabel").pack(pady=10, padx=10, anchor=tk.W)
+        
+        summary = (f"Focused {int(totals[FOCUSED]) // 60}m {int(totals[FOCUSED]) % 60}s  •  "
+                   f"Score {timeline.focus_score(duration)}%")
+        ttk.Label(timeline_window, text=summary).pack(padx=10, anchor=tk.W)
+        
+        # One bar per minute, colored like the weekly chart
+        max_height = 120
+        bar_width = max(2, min(20, 600 // len(minutes)))
+        chart_canvas = tk.Canvas(timeline_window, width=len(minutes) * bar_width + 40,
+                                 height=max_height + 30, bg='white')
+        chart_canvas.pack(padx=10, pady=10)
+        
+        for i, score in enumerate(minutes):
+            bar_height = int((score / 100) * max_height) if score > 0 else 1
+            x1 = i * bar_width + 20
+            if score >= 80:
+                color = "#27ae60"  # Green
+            elif score >= 50:
+                color = "#f39c12"  # Orange
+            else:
+                color = "#e74c3c"  # Red
+            chart_canvas.create_rectangle(x1, max_height - bar_height, x1 + bar_width - 1, max_height,
+                                          fill=color, outline="")
+        chart_canvas.create_text(20, max_height + 12, text="0m", anchor=tk.W)
+        chart_canvas.create_text(20 + len(minutes) * bar_width, max_height + 12,
+                                 text=f"{len(minutes)}m", anchor=tk.E)
+        
+        ttk.Button(timeline_window, text="Close", command=timeline_window.destroy).pack(pady=10)
+    
     def update_focus_stats(self):
         """Update focus statistics display"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Get today's session count
-            today = datetime.datetime.now().strftime("%Y-%m-%d")
-            cursor.execute('''
-            SELECT COUNT(*) FROM focus_sessions
-            WHERE date(start_time) = ?
-            ''', (today,))
-            today_count = cursor.fetchone()[0]
-            self.today_sessions_label.config(text=str(today_count))
-            
-            # Calculate streak
-            streak = 0
-            current_date = datetime.datetime.now().date()
-            
-            # Check up to 100 previous days for sessions
-            for i in range(100):
-                check_date = (current_date - datetime.timedelta(days=i)).strftime("%Y-%m-%d")
-                cursor.execute('''
-                SELECT COUNT(*) FROM focus_sessions
-                WHERE date(start_time) = ?
-                ''', (check_date,))
-                
-                if cursor.fetchone()[0] > 0:
-                    if i == 0 or streak > 0:  # Either today or continuing streak
-                        streak += 1
-                else:
-                    if i > 0:  # Not today, streak broken
-                        break
-            
-            self.streak_label.config(text=f"{streak} days")
-            
-            # Get weekly data for chart
-            self.generate_weekly_chart()
-            
-            conn.close()
-            
-        except Exception as e:
-            print(f"Error updating stats: {e}")
+        self.persistence.read(self.load_focus_stats, self.show_focus_stats,
+                              lambda e: print(f"Error updating stats: {e}"))
+    
+    def load_focus_stats(self, storage):
+        """Today's session count, the streak and the chart (runs on the worker)"""
+        now = datetime.datetime.now()
+        
+        # Get today's session count
+        today_count = queries.today_count(storage, now.strftime("%Y-%m-%d"))
+        
+        # Calculate streak
+        streak = queries.get_streak(storage, now.date())
+        
+        return today_count, streak, self.load_chart(storage)
+    
+    def show_focus_stats(self, stats):
+        """Show loaded statistics (Tk thread)"""
+        today_count, streak, chart = stats
+        self.today_sessions_label.config(text=str(today_count))
+        self.streak_label.config(text=f"{streak} days")
+        
+        # Get weekly data for chart
+        self.draw_chart(chart)
+    
+    def load_chart(self, storage, range_days=None):
+        """Chart key and data for the selected range (runs on the worker)"""
+        if range_days is None:
+            range_days = self.chart_range_days
+        today = datetime.datetime.now().date()
+        
+        # Cached per range, day and data version, so unchanged data costs nothing
+        key = (range_days, today, storage.data_version())
+        if key not in self.chart_cache:
+            self.chart_cache = {key: queries.chart_data(storage, range_days, today)}
+        return key, self.chart_cache[key]
     
     def generate_weekly_chart(self):
-        """Generate a simple text-based chart of weekly focus scores"""
+        """Reload the focus score chart for the selected range"""
+        self.chart_range_days = int(self.chart_range_var.get().split()[0])
+        range_days = self.chart_range_days
+        self.persistence.read(lambda storage: self.load_chart(storage, range_days), self.draw_chart,
+                              lambda e: print(f"Error generating chart: {e}"))
+    
+    def draw_chart(self, chart):
+        """Draw the focus score chart, updating the existing canvas items in place"""
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
+            key, data = chart
             
-            # Clear previous chart
-            for widget in self.week_chart_frame.winfo_children():
-                widget.destroy()
-            
-            # Get last 7 days data
-            days = []
-            scores = []
-            
-            for i in range(6, -1, -1):
-                date = (datetime.datetime.now() - datetime.timedelta(days=i)).strftime("%Y-%m-%d")
-                day_name = (datetime.datetime.now() - datetime.timedelta(days=i)).strftime("%a")
-                
-                cursor.execute('''
-                SELECT AVG(focus_score) FROM focus_sessions
-                WHERE date(start_time) = ?
-                ''', (date,))
-                
-                avg_score = cursor.fetchone()[0]
-                if avg_score is None:
-                    avg_score = 0
-                else:
-                    avg_score = round(avg_score)
-                
-                days.append(day_name)
-                scores.append(avg_score)
+            # Nothing changed since the last draw
+            if key == self.chart_key:
+                return
+            self.chart_key = key
             
-            # Create a simple bar chart
+            # Chart geometry
             max_height = 150
-            bar_width = 30
-            spacing = 10
-            
-            chart_canvas = tk.Canvas(self.week_chart_frame, height=max_height + 30, bg='white')
-            chart_canvas.pack(fill=tk.X, expand=True)
-            
-            # Draw bars
-            for i, score in enumerate(scores):
+            chart_width = 280
+            slot = chart_width / len(data)
+            bar_width = max(2, int(slot * 0.75))
+            label_step = max(1, -(-len(data) // 10))
+            show_scores = len(data) <= 13
+            
+            if self.chart_canvas is None:
+                self.chart_canvas = tk.Canvas(self.week_chart_frame, height=max_height + 30, bg='white')
+                self.chart_canvas.pack(fill=tk.X, expand=True)
+            
+            # Grow the pool of bar items as needed; they are reused afterwards
+            while len(self.chart_items) < len(data):
+                self.chart_items.append((
+                    self.chart_canvas.create_rectangle(0, 0, 0, 0),
+                    self.chart_canvas.create_text(0, 0),
+                    self.chart_canvas.create_text(0, 0),
+                ))
+            
+            # Update bars
+            for i, (rect, day_text, score_text) in enumerate(self.chart_items):
+                if i >= len(data):
+                    for item in (rect, day_text, score_text):
+                        self.chart_canvas.itemconfig(item, state="hidden")
+                    continue
+                
+                label, score = data[i]
                 bar_height = int((score / 100) * max_height) if score > 0 else 1
-                x1 = i * (bar_width + spacing) + 20
+                x1 = int(i * slot) + 20
                 y1 = max_height - bar_height
                 x2 = x1 + bar_width
                 y2 = max_height
@@ -997,16 +1404,19 @@ class FocusBuddyApp:
                 else:
                     color = "#e74c3c"  # Red
                 
-                chart_canvas.create_rectangle(x1, y1, x2, y2, fill=color)
-                chart_canvas.create_text(x1 + bar_width/2, y2 + 10, text=days[i])
-                chart_canvas.create_text(x1 + bar_width/2, y1 - 10, text=f"{score}%")
-            
-            conn.close()
+                self.chart_canvas.coords(rect, x1, y1, x2, y2)
+                self.chart_canvas.itemconfig(rect, fill=color, state="normal")
+                self.chart_canvas.coords(day_text, x1 + bar_width/2, y2 + 10)
+                self.chart_canvas.itemconfig(day_text, text=label,
+                                             state="normal" if i % label_step == 0 else "hidden")
+                self.chart_canvas.coords(score_text, x1 + bar_width/2, y1 - 10)
+                self.chart_canvas.itemconfig(score_text, text=f"{score}%",
+                                             state="normal" if show_scores else "hidden")
             
         except Exception as e:
             print(f"Error generating chart: {e}")
     
-    def show_journal_dialog(self):
+    def show_journal_dialog(self, session_id):
         """Show dialog for session journaling"""
         journal_window = tk.Toplevel(self.root)
         journal_window.title("Session Journal")
@@ -1041,135 +1451,13 @@ class FocusBuddyApp:
         ttk.Button(buttons_frame, text="Skip", 
                  command=journal_window.destroy).pack(side=tk.LEFT, padx=5)
         
-        # Get the session ID of the most recent session
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('SELECT MAX(id) FROM focus_sessions')
-        session_id = cursor.fetchone()[0]
-        conn.close()
-        
         save_btn = ttk.Button(buttons_frame, text="Save Journal", 
                             command=lambda: [
-                                self.update_journal(session_id, journal_text.get("1.0", "end-1c")),
-                                self.check_journaler_badge(),
+                                self.save_journal(session_id, journal_text.get("1.0", "end-1c")),
                                 journal_window.destroy()
                             ])
         save_btn.pack(side=tk.RIGHT, padx=5)
     
-    def check_badges(self, session_time, focus_score):
-        """Check if user earned any badges from this session"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Get already earned badges
-            cursor.execute('SELECT badge_id FROM earned_badges')
-            earned_badges = [row[0] for row in cursor.fetchall()]
-            
-            now = datetime.datetime.now()
-            today = now.strftime("%Y-%m-%d")
-            new_badges = []
-            
-            # Check time-based badges
-            if session_time >= 1800 and "focus_rookie" not in earned_badges:  # 30 minutes
-                new_badges.append("focus_rookie")
-                
-            if session_time >= 3600 and "focus_adept" not in earned_badges:  # 1 hour
-                new_badges.append("focus_adept")
-                
-            if session_time >= 7200 and "focus_master" not in earned_badges:  # 2 hours
-                new_badges.append("focus_master")
-            
-            # Check hardcore mode badge
-            if self.hardcore_mode and "iron_will" not in earned_badges:
-                new_badges.append("iron_will")
-            
-            # Check time of day badges
-            if now.hour < 8 and "early_bird" not in earned_badges:
-                new_badges.append("early_bird")
-                
-            if now.hour >= 22 and "night_owl" not in earned_badges:
-                new_badges.append("night_owl")
-            
-            # Check multiple sessions badge
-            cursor.execute('''
-            SELECT COUNT(*) FROM focus_sessions
-            WHERE date(start_time) = ?
-            ''', (today,))
-            
-            today_sessions = cursor.fetchone()[0]
-            if today_sessions >= 3 and "hat_trick" not in earned_badges:
-                new_badges.append("hat_trick")
-            
-            # Check streak badge
-            days_with_sessions = set()
-            cursor.execute('''
-            SELECT DISTINCT date(start_time) FROM focus_sessions
-            WHERE start_time >= date('now', '-7 days')
-            ''')
-            
-            for row in cursor.fetchall():
-                days_with_sessions.add(row[0])
-            
-            # Check if they have sessions for 7 consecutive days
-            streak_days = 0
-            for i in range(7):
-                check_date = (now - datetime.timedelta(days=i)).strftime("%Y-%m-%d")
-                if check_date in days_with_sessions:
-                    streak_days += 1
-                else:
-                    break
-                    
-            if streak_days >= 7 and "streak_week" not in earned_badges:
-                new_badges.append("streak_week")
-            
-            # Save new badges
-            for badge_id in new_badges:
-                cursor.execute('''
-                INSERT INTO earned_badges (badge_id, earn_date)
-                VALUES (?, ?)
-                ''', (badge_id, now.isoformat()))
-            
-            conn.commit()
-            conn.close()
-            
-            # Show badge notifications
-            if new_badges:
-                self.show_badge_notification(new_badges)
-                self.update_badges_display()
-                
-        except Exception as e:
-            print(f"Error checking badges: {e}")
-    
-    def check_journaler_badge(self):
-        """Check if user earned the journaler badge"""
-        try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Count sessions with journal entries
-            cursor.execute("SELECT COUNT(*) FROM focus_sessions WHERE journal_text IS NOT NULL AND journal_text != ''")
-            journal_count = cursor.fetchone()[0]
-            
-            # Check if already earned
-            cursor.execute("SELECT COUNT(*) FROM earned_badges WHERE badge_id = 'journaler'")
-            already_earned = cursor.fetchone()[0] > 0
-            
-            if journal_count >= 5 and not already_earned:
-                now = datetime.datetime.now().isoformat()
-                cursor.execute('''
-                INSERT INTO earned_badges (badge_id, earn_date)
-                VALUES (?, ?)
-                ''', ("journaler", now))
-                
-                conn.commit()
-                self.show_badge_notification(["journaler"])
-                self.update_badges_display()
-            
-            conn.close()
-        except Exception as e:
-            print(f"Error checking journaler badge: {e}")
-    
     def show_badge_notification(self, badge_ids):
         """Show a notification for earned badges"""
         badge_window = tk.Toplevel(self.root)
@@ -1201,18 +1489,16 @@ class FocusBuddyApp:
     
     def update_badges_display(self):
         """Update the badges display in the stats tab"""
+        self.persistence.read(queries.earned_badges, self.show_badges,
+                              lambda e: print(f"Error updating badges: {e}"))
+    
+    def show_badges(self, earned_badges):
+        """Rebuild the badge list from the earned badges (Tk thread)"""
         try:
             # Clear existing badges
             for widget in self.badges_frame.winfo_children():
                 widget.destroy()
             
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # Get earned badges
-            cursor.execute('SELECT badge_id, earn_date FROM earned_badges ORDER BY earn_date DESC')
-            earned_badges = cursor.fetchall()
-            
             if not earned_badges:
                 ttk.Label(self.badges_frame, text="No badges earned yet. Keep focusing!",
                         wraplength=250).pack(padx=10, pady=20)
@@ -1239,25 +1525,35 @@ class FocusBuddyApp:
                         
                         ttk.Separator(self.badges_frame, orient="horizontal").pack(fill=tk.X, padx=10, pady=5)
             
-            conn.close()
-            
         except Exception as e:
             print(f"Error updating badges: {e}")
     
-    def on_closing(self):
+    def on_closing(self, waited=0.0):
         """Clean up resources when closing the app"""
         self.running = False
-        if self.cap is not None:
-            self.cap.release()
+        self.close_pipeline()
+        # Let the pipeline threads finish (and release the camera) first
+        if self.pipeline_alive() and waited < PIPELINE_EXIT_TIMEOUT:
+            self.root.after(50, self.on_closing, waited + 0.05)
+            return
+        self.history_watcher.close()
             
         # Ensure sites are unblocked
         self.unblock_distracting_sites()
         
+        # Commit any queued writes before the window goes away
+        self.persistence.close()
         self.root.destroy()
 
 def main():
+    parser = argparse.ArgumentParser(description="FOCUSBuddy")
+    parser.add_argument("--source", default="camera:0",
+                        help="frame source: camera:N, video:PATH, images:DIR or synthetic[:WxH]")
+    args = parser.parse_args()
+    
     root = tk.Tk()
     app = FocusBuddyApp(root)
+    app.frame_source = args.source
     root.mainloop()
 
 if __name__ == "__main__":
@@ -0,0 +1,214 @@
+"""Badge definitions and the rules engine that awards them.
+
+Each badge has a declarative rule (metric, operator, value) over the facts
+of a finished session and a few running aggregates: the session's length,
+hour and hardcore flag, and the per-day session count, day streak and
+journal count. The aggregates live in the badge_aggregates row and are
+advanced in memory, so awarding badges after a session costs one small
+write plus one check per rule, whatever the size of the history.
+
+When the rules change (a badge is added or a threshold moves) the whole
+history is replayed once, in a single pass over focus_sessions, and any
+badge the user would have earned is awarded retroactively. Example:
+
+    python badges.py --replay
+"""
+import argparse
+import datetime
+import operator
+import os
+import sys
+
+import queries
+
+BADGES = {
+    "focus_rookie": {"name": "Focus Rookie", "desc": "Complete your first 30-minute session", "icon": "🥉",
+                     "rule": ("duration", ">=", 1800)},
+    "focus_adept": {"name": "Focus Adept", "desc": "Complete a 1-hour session", "icon": "🥈",
+                    "rule": ("duration", ">=", 3600)},
+    "focus_master": {"name": "Focus Master", "desc": "Complete a 2-hour session", "icon": "🥇",
+                     "rule": ("duration", ">=", 7200)},
+    "early_bird": {"name": "Early Bird", "desc": "Start a session before 8 AM", "icon": "🐦",
+                   "rule": ("hour", "<", 8)},
+    "night_owl": {"name": "Night Owl", "desc": "Complete a session after 10 PM", "icon": "🦉",
+                  "rule": ("hour", ">=", 22)},
+    "hat_trick": {"name": "Hat Trick", "desc": "Complete 3 sessions in one day", "icon": "🎩",
+                  "rule": ("day_sessions", ">=", 3)},
+    "iron_will": {"name": "Iron Will", "desc": "Complete a hardcore mode session", "icon": "⚔️",
+                  "rule": ("hardcore", "==", True)},
+    "streak_week": {"name": "Streak Week", "desc": "Focus every day for a week", "icon": "🔥",
+                    "rule": ("streak", ">=", 7)},
+    "journaler": {"name": "Journaler", "desc": "Complete 5 session journals", "icon": "📓",
+                  "rule": ("journal_count", ">=", 5)},
+}
+
+OPERATORS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    ">=": operator.ge,
+    ">": operator.gt,
+}
+
+
+def advance_day(state, day):
+    """Update the per-day count and streak for a session on day"""
+    last_day = state["last_day"]
+    if day == last_day:
+        state["day_sessions"] += 1
+        return
+    if last_day is not None and day < last_day:
+        # Out of order (the clock was changed): leave the current day alone
+        return
+    previous = (datetime.date.fromisoformat(day) - datetime.timedelta(days=1)).isoformat()
+    state["streak"] = state["streak"] + 1 if last_day == previous else 1
+    state["last_day"] = day
+    state["day_sessions"] = 1
+
+
+class BadgeEngine:
+    """Evaluates badge rules incrementally; runs on the persistence worker"""
+
+    def __init__(self, badges=BADGES):
+        self.rules = [(badge_id, metric, OPERATORS[op], value)
+                      for badge_id, badge in badges.items()
+                      for metric, op, value in [badge["rule"]]]
+        self.signature = ";".join(f"{badge_id}:{badge['rule']!r}" for badge_id, badge in sorted(badges.items()))
+        self.state = None
+        self.earned = None
+
+    def load(self, storage):
+        """Load the aggregates and earned badges, replaying history if the rules changed.
+
+        Returns the badges awarded by the replay, if one was needed.
+        """
+        if self.state is not None:
+            return []
+        self.earned = {row[0] for row in storage.query("SELECT DISTINCT badge_id FROM earned_badges")}
+        row = storage.query_one('''
+        SELECT last_day, day_sessions, streak, journal_count, rules_signature
+        FROM badge_aggregates WHERE id = 1
+        ''')
+        if row is None or row[4] != self.signature:
+            return self.replay(storage)
+        self.state = dict(zip(("last_day", "day_sessions", "streak", "journal_count"), row[:4]))
+        return []
+
+    def evaluate(self, facts):
+        """Badges not yet earned whose rule holds for these facts"""
+        return [badge_id for badge_id, metric, op, value in self.rules
+                if badge_id not in self.earned and metric in facts and op(facts[metric], value)]
+
+    def on_session(self, storage, now, duration, hardcore):
+        """Update the aggregates for a just-saved session; returns the new badge ids"""
+        self.load(storage)
+        state = dict(self.state)
+        advance_day(state, now.strftime("%Y-%m-%d"))
+        facts = dict(state, duration=duration, hour=now.hour, hardcore=bool(hardcore))
+        return self.commit(storage, state, self.evaluate(facts), now.isoformat())
+
+    def on_journal(self, storage, session_id, journal_text, now):
+        """Save a session journal and update the journal count; returns the new badge ids"""
+        self.load(storage)
+        previous = storage.scalar("SELECT journal_text FROM focus_sessions WHERE id = ?", (session_id,))
+        queries.update_journal(storage, session_id, journal_text)
+
+        state = dict(self.state)
+        state["journal_count"] += bool(journal_text) - bool(previous)
+        return self.commit(storage, state, self.evaluate({"journal_count": state["journal_count"]}),
+                           now.isoformat())
+
+    def commit(self, storage, state, new_badges, earn_date):
+        """Write the aggregates and awards, then adopt them in memory"""
+        try:
+            self.save_state(storage, state)
+            self.award(storage, [(badge_id, earn_date) for badge_id in new_badges])
+        except Exception:
+            # Reload from the database next time rather than trust memory
+            self.state = None
+            raise
+        self.state = state
+        self.earned.update(new_badges)
+        return new_badges
+
+    def save_state(self, storage, state, signature=None):
+        storage.execute('''
+        INSERT INTO badge_aggregates (id, last_day, day_sessions, streak, journal_count, rules_signature)
+        VALUES (1, :last_day, :day_sessions, :streak, :journal_count, :signature)
+        ON CONFLICT(id) DO UPDATE SET
+            last_day = excluded.last_day,
+            day_sessions = excluded.day_sessions,
+            streak = excluded.streak,
+            journal_count = excluded.journal_count,
+            rules_signature = COALESCE(excluded.rules_signature, rules_signature)
+        ''', dict(state, signature=signature))
+
+    def award(self, storage, awards):
+        storage.executemany('''
+        INSERT INTO earned_badges (badge_id, earn_date)
+        VALUES (?, ?)
+        ''', awards)
+
+    def replay(self, storage):
+        """Rebuild the aggregates from the whole history in one pass.
+
+        Badges that the history qualifies for but that were never awarded
+        are awarded with the date of the session that earned them. Returns
+        the new badge ids.
+        """
+        earned = {row[0] for row in storage.query("SELECT DISTINCT badge_id FROM earned_badges")}
+        self.earned = set(earned)
+        state = {"last_day": None, "day_sessions": 0, "streak": 0, "journal_count": 0}
+        awards = []
+
+        with storage.transaction():
+            # Iterate the cursor rather than fetching, so memory stays flat
+            cursor = storage.execute('''
+            SELECT start_time, duration, hardcore_mode, journal_text IS NOT NULL AND journal_text != ''
+            FROM focus_sessions
+            ORDER BY start_time, id
+            ''')
+            for start_time, duration, hardcore, journaled in cursor:
+                started = datetime.datetime.fromisoformat(start_time)
+                advance_day(state, start_time[:10])
+                state["journal_count"] += journaled
+                facts = dict(state, duration=duration, hour=started.hour, hardcore=bool(hardcore))
+                for badge_id in self.evaluate(facts):
+                    awards.append((badge_id, start_time))
+                    self.earned.add(badge_id)
+
+            try:
+                self.award(storage, awards)
+                self.save_state(storage, state, self.signature)
+            except Exception:
+                self.earned = earned
+                raise
+        self.state = state
+        return [badge_id for badge_id, earn_date in awards]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay the session history through the badge rules")
+    parser.add_argument("--db", default=os.path.join(os.path.expanduser("~"), ".focusbuddy", "focusbuddy.db"),
+                        help="path to focusbuddy.db")
+    parser.add_argument("--replay", action="store_true",
+                        help="replay even if the rules have not changed since the last replay")
+    args = parser.parse_args(argv)
+
+    from storage import Storage
+    from migrations import migrate
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.db)), exist_ok=True)
+    storage = Storage(args.db)
+    try:
+        migrate(storage)
+        engine = BadgeEngine()
+        new_badges = engine.replay(storage) if args.replay else engine.load(storage)
+        print(f"Awarded {len(new_badges)} new badges: {', '.join(new_badges) or 'none'}")
+    finally:
+        storage.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
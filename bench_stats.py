@@ -0,0 +1,305 @@
+"""Synthetic history generator and benchmark for the stats and badge paths.
+
+Fills a FocusBuddy database with a realistic history (daily rhythms, days
+off, long and short sessions, journals, hardcore sessions and the badges
+they earn) and times the database work behind the Stats & Badges tab:
+today's count and streak, the focus chart for every range, the history
+pages, journal search, awarding badges after a session, the badge list and
+a full badge replay. Everything runs headlessly against the same query code the app
+uses. Examples:
+
+    python bench_stats.py --sessions 100000 --json before.json
+    python bench_stats.py --db big.db --sessions 10000000 --generate-only
+    python bench_stats.py --db big.db --json after.json
+    python bench_stats.py --compare before.json after.json --threshold 15
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+import journal_search
+import queries
+from badges import BadgeEngine
+from focus import FocusTimeline, FOCUSED, GRACE, UNFOCUSED
+from history_view import SORT_COLUMNS, fetch_page
+from migrations import migrate
+from storage import Storage
+
+JOURNAL_WORDS = (
+    "finished draft chapter report review tests refactor meeting notes email inbox reading "
+    "lecture exercises proof bug deploy design sketch outline essay revision flashcards "
+    "phone distracted tired focused calm music coffee break walk deadline progress stuck "
+    "planning research slides budget interview practice guitar spanish algebra chemistry "
+    "history thesis paper code server database migration chart badge streak morning evening"
+).split()
+
+CHUNK_SIZE = 10000
+
+
+def timeline_templates(rng, count=16):
+    """A few timeline blobs to share between sessions (building one per row would dominate)"""
+    blobs = []
+    for _ in range(count):
+        timeline = FocusTimeline(0.0)
+        now = 0.0
+        end = rng.uniform(600, 7200)
+        while now < end:
+            timeline.record(rng.choices((FOCUSED, GRACE, UNFOCUSED), (6, 1, 2))[0], now)
+            now += rng.expovariate(1 / 90)
+        blobs.append(timeline.to_blob(end))
+    return blobs
+
+
+def generate_sessions(sessions, days, seed=0, journal_rate=0.3, hardcore_rate=0.1):
+    """Yield focus_sessions rows, oldest first, ending today"""
+    rng = random.Random(seed)
+    blobs = timeline_templates(rng)
+    first_day = datetime.date.today() - datetime.timedelta(days=days - 1)
+    per_day = sessions / days
+
+    produced = 0
+    for day_index in range(days):
+        remaining = sessions - produced
+        if remaining <= 0:
+            return
+        day = first_day + datetime.timedelta(days=day_index)
+
+        # Some days off, busier weekdays; the last day takes whatever is left
+        if day_index == days - 1:
+            count = remaining
+        elif rng.random() < 0.15:
+            count = 0
+        else:
+            weight = 1.2 if day.weekday() < 5 else 0.5
+            count = min(remaining, max(0, int(rng.gauss(per_day * weight / 0.85, per_day * 0.3) + 0.5)))
+
+        # Sessions cluster around the morning, afternoon and evening
+        starts = sorted(rng.choice((9, 14, 20)) * 3600 + rng.gauss(0, 7200) for _ in range(count))
+        for i, seconds in enumerate(starts):
+            seconds = min(max(seconds, 0), 86399)
+            started = datetime.datetime.combine(day, datetime.time()) + datetime.timedelta(
+                seconds=int(seconds), microseconds=i % 1000000)
+            duration = int(min(4 * 3600, rng.lognormvariate(7.6, 0.6)))  # median about 33 minutes
+            score = round(min(100.0, max(0.0, rng.betavariate(5, 2) * 100)), 1)
+            journal = None
+            if rng.random() < journal_rate:
+                journal = " ".join(rng.choices(JOURNAL_WORDS, k=rng.randint(8, 40)))
+            start_time = started.isoformat()
+            yield (start_time, start_time[:10], duration, score, int(rng.random() < hardcore_rate),
+                   journal, rng.choice(blobs))
+        produced += count
+
+
+def generate_history(storage, sessions, days=None, seed=0, journal_rate=0.3):
+    """Fill an empty database with a synthetic history; returns the number of days"""
+    if days is None:
+        # About 2.5 sessions a day, capped at 50 years so huge runs stay valid dates
+        days = max(1, min(int(sessions / 2.5), 365 * 50))
+
+    rows = generate_sessions(sessions, days, seed, journal_rate)
+    while True:
+        chunk = [row for _, row in zip(range(CHUNK_SIZE), rows)]
+        if not chunk:
+            break
+        with storage.transaction():
+            storage.executemany('''
+            INSERT OR IGNORE INTO focus_sessions
+                (start_time, day, duration, focus_score, hardcore_mode, journal_text, timeline)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', chunk)
+
+    # Derived tables and badges, exactly as an import would leave them
+    with storage.transaction():
+        queries.rebuild_daily_rollup(storage)
+        BadgeEngine().replay(storage)
+    storage.execute("ANALYZE")
+    return days
+
+
+def time_calls(fn, repeat):
+    """Run fn repeat times; returns timings in milliseconds (first call included)"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def summarize(timings):
+    ordered = sorted(timings)
+    p95 = ordered[max(0, min(len(ordered) - 1, int(round(0.95 * len(ordered))) - 1))]
+    return {
+        "runs": len(timings),
+        "first_ms": round(timings[0], 3),
+        "min_ms": round(ordered[0], 3),
+        "median_ms": round(statistics.median(ordered), 3),
+        "p95_ms": round(p95, 3),
+    }
+
+
+def run_suite(storage, repeat=20):
+    """Time every stats and badge path; returns {name: summary}"""
+    today = datetime.date.today()
+    results = {}
+
+    def bench(name, fn):
+        results[name] = summarize(time_calls(fn, repeat))
+
+    # update_focus_stats: today's count and the streak
+    bench("focus_stats", lambda: (queries.today_count(storage, today.isoformat()),
+                                  queries.get_streak(storage, today)))
+
+    # generate_weekly_chart, every range (uncached, as after a new session)
+    for range_days in queries.CHART_RANGES:
+        bench(f"chart_{range_days}d", lambda r=range_days: queries.chart_data(storage, r, today))
+
+    # load_session_history: first page per sort, and a page deep in the history
+    for sort in SORT_COLUMNS:
+        bench(f"history_first_page_{sort}", lambda s=sort: fetch_page(storage, s, True))
+    middle = storage.query_one('''
+    SELECT start_time, id FROM focus_sessions
+    ORDER BY start_time DESC, id DESC
+    LIMIT 1 OFFSET (SELECT COUNT(*) / 2 FROM focus_sessions)
+    ''')
+    if middle is not None:
+        bench("history_deep_page", lambda: fetch_page(storage, "date", True, after=tuple(middle)))
+
+    # Journals tab: newest journals, and searches for common, paired and partial words
+    bench("journal_recent", lambda: journal_search.recent(storage, 100))
+    for name, text in (("common", "focused"), ("two_words", "guitar spanish"), ("prefix", "chem")):
+        bench(f"journal_search_{name}", lambda t=text: journal_search.search(storage, t, 100))
+
+    # update_badges_display
+    bench("badge_list", lambda: queries.earned_badges(storage))
+
+    # check_badges: save a session and award its badges, then roll both back
+    engine = BadgeEngine()
+    engine.load(storage)
+    state, earned = dict(engine.state), set(engine.earned)
+
+    def end_session():
+        try:
+            with storage.transaction():
+                ended = datetime.datetime.now()
+                queries.save_session(storage, ended, 1900, 80, False)
+                engine.on_session(storage, ended, 1900, False)
+                raise _Rollback
+        except _Rollback:
+            engine.state, engine.earned = dict(state), set(earned)
+
+    bench("session_end_badges", end_session)
+
+    # Full badge replay (bulk backfill), fewer runs since it scans everything
+    results["badge_replay"] = summarize(time_calls(lambda: BadgeEngine().replay(storage), max(1, repeat // 10)))
+    return results
+
+
+class _Rollback(Exception):
+    pass
+
+
+def compare(before, after, threshold, min_delta_ms=0.1):
+    """Print per-path changes in median time; returns the regressed paths.
+
+    A path regresses when its median is more than threshold percent and
+    more than min_delta_ms slower, so timer noise on sub-millisecond
+    queries is not reported.
+    """
+    regressions = []
+    print(f"{'path':<28} {'before ms':>10} {'after ms':>10} {'change':>8}")
+    for name, result in after["results"].items():
+        if name not in before["results"]:
+            print(f"{name:<28} {'-':>10} {result['median_ms']:>10.3f} {'new':>8}")
+            continue
+        old = before["results"][name]["median_ms"]
+        new = result["median_ms"]
+        change = (new - old) / old * 100 if old > 0 else 0.0
+        flag = ""
+        if change > threshold and new - old > min_delta_ms:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:<28} {old:>10.3f} {new:>10.3f} {change:>+7.1f}%{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark FocusBuddy's stats and badge queries")
+    parser.add_argument("--sessions", type=int, default=10000, help="sessions to generate (1k to 10M)")
+    parser.add_argument("--days", type=int, help="days of history to spread them over")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--db", help="database to use; generated if it has no sessions, kept afterwards")
+    parser.add_argument("--generate-only", action="store_true", help="fill the database and exit")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per path")
+    parser.add_argument("--json", dest="json_path", help="also write results to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"),
+                        help="compare two result files instead of running")
+    parser.add_argument("--threshold", type=float, default=10,
+                        help="percent slowdown in median time that counts as a regression")
+    parser.add_argument("--min-delta", type=float, default=0.1,
+                        help="ignore slowdowns smaller than this many milliseconds")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            before = json.load(f)
+        with open(args.compare[1]) as f:
+            after = json.load(f)
+        return 1 if compare(before, after, args.threshold, args.min_delta) else 0
+
+    temp_dir = None
+    db_path = args.db
+    if db_path is None:
+        temp_dir = tempfile.mkdtemp(prefix="focusbuddy-bench-")
+        db_path = os.path.join(temp_dir, "focusbuddy.db")
+
+    storage = Storage(db_path)
+    try:
+        migrate(storage)
+        existing = storage.scalar("SELECT COUNT(*) FROM focus_sessions")
+        generate_seconds = 0.0
+        if not existing:
+            started = time.perf_counter()
+            generate_history(storage, args.sessions, args.days, args.seed)
+            generate_seconds = time.perf_counter() - started
+            print(f"Generated {args.sessions} sessions in {generate_seconds:.1f}s", file=sys.stderr)
+        if args.generate_only:
+            return 0
+
+        results = {
+            "meta": {
+                "sessions": storage.scalar("SELECT COUNT(*) FROM focus_sessions"),
+                "days": storage.scalar("SELECT COUNT(*) FROM daily_rollup"),
+                "badges": storage.scalar("SELECT COUNT(*) FROM earned_badges"),
+                "generate_s": round(generate_seconds, 2),
+                "repeat": args.repeat,
+                "sqlite": sqlite3.sqlite_version,
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "time": datetime.datetime.now().isoformat(timespec="seconds"),
+            },
+            "results": run_suite(storage, args.repeat),
+        }
+    finally:
+        storage.close()
+        if temp_dir is not None:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    print(json.dumps(results, indent=2))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
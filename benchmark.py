@@ -0,0 +1,164 @@
+"""Headless replay benchmark for the detection loop.
+
+Drives the same detector and focus logic as the app's video pipeline over a
+frame source as fast as possible and reports throughput, per-frame latency
+and the resulting focus timeline. Example:
+
+    python benchmark.py --source synthetic:640x480 --frames 600
+    python benchmark.py --source synthetic --face face.png
+    python benchmark.py --source video:session.mp4 --json results.json
+"""
+import argparse
+import json
+import sys
+import time
+
+import cv2
+
+from detection import FaceDetector, SENSITIVITY_PRESETS, DETECTION_RESOLUTIONS
+from focus import FocusTracker
+from frame_sources import open_source
+from scheduler import DetectionScheduler
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def run_benchmark(source, detector, tracker, max_frames=None, scheduler=None):
+    """Replay a source through detection and focus tracking.
+
+    Timestamps for the focus logic come from the source's nominal frame rate,
+    so the timeline is reproducible regardless of how fast this machine is.
+    With a scheduler, frames that arrive before the next detection is due
+    are skipped, as the live pipeline would.
+    """
+    latencies = []
+    timeline = []
+    frames = 0
+    detections = 0
+    next_due = 0.0
+
+    tracker.reset(now=0.0)
+    detector.reset()
+    if scheduler is not None:
+        scheduler.reset(now=0.0)
+    started = time.perf_counter()
+
+    while max_frames is None or frames < max_frames:
+        ret, frame = source.read()
+        if not ret:
+            break
+
+        now = frames / source.fps
+        if scheduler is not None and now < next_due:
+            frames += 1
+            continue
+
+        t0 = time.perf_counter()
+        faces = detector.detect(frame)
+        state = tracker.update(len(faces) > 0, now=now)
+        latencies.append(time.perf_counter() - t0)
+        detections += 1
+
+        if scheduler is not None:
+            scheduler.record(tracker, latencies[-1], now=now)
+            next_due = now + scheduler.next_interval(tracker, now=now)
+
+        # Record state transitions only
+        if not timeline or timeline[-1][1] != state:
+            timeline.append((round(now, 3), state))
+        frames += 1
+
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "frames": frames,
+        "elapsed_s": round(elapsed, 4),
+        "detections": detections,
+        "fps": round(frames / elapsed, 2) if elapsed > 0 else 0.0,
+        "latency_p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "latency_p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "focus_score": tracker.focus_score(now=frames / source.fps),
+        "full_scans": detector.full_scans,
+        "roi_scans": detector.roi_scans,
+        "reuse_rate": round(detector.reuse_rate(), 4),
+        "timeline": timeline,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the FocusBuddy detection loop")
+    parser.add_argument("--source", default="synthetic",
+                        help="camera:N, video:PATH, images:DIR or synthetic[:WxH]")
+    parser.add_argument("--face", help="image pasted into synthetic frames as the user's face "
+                                       "(without it a synthetic run only measures the no-face path)")
+    parser.add_argument("--frames", type=int, default=300, help="maximum number of frames to process")
+    parser.add_argument("--sensitivity", default="Medium", choices=list(SENSITIVITY_PRESETS))
+    parser.add_argument("--resolution", default="Auto", choices=list(DETECTION_RESOLUTIONS),
+                        help="working-image width for detection (Auto follows the sensitivity)")
+    parser.add_argument("--no-tracking", action="store_true",
+                        help="scan the full frame every time instead of tracking the face")
+    parser.add_argument("--no-motion-gate", action="store_true",
+                        help="run the cascade even when the scene hasn't changed")
+    parser.add_argument("--reacquire", type=int, default=30,
+                        help="force a full-frame scan after this many tracked detections")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="skip frames using the adaptive detection-rate scheduler")
+    parser.add_argument("--cpu-budget", type=float, default=25,
+                        help="detection CPU budget in percent, with --adaptive")
+    parser.add_argument("--grace", type=float, default=3, help="grace period in seconds")
+    parser.add_argument("--json", dest="json_path", help="also write results to this file")
+    args = parser.parse_args(argv)
+
+    if args.face and not args.source.startswith("synthetic"):
+        print("--face only applies to synthetic sources", file=sys.stderr)
+        return 1
+    if args.face and cv2.imread(args.face) is None:
+        print(f"Cannot read face image: {args.face}", file=sys.stderr)
+        return 1
+
+    source = open_source(args.source, face_image=args.face)
+    if not source.isOpened():
+        print(f"Cannot open source: {args.source}", file=sys.stderr)
+        return 1
+
+    try:
+        detector = FaceDetector(args.sensitivity, tracking=not args.no_tracking,
+                                reacquire_interval=args.reacquire,
+                                detect_width=DETECTION_RESOLUTIONS[args.resolution],
+                                motion_gate=not args.no_motion_gate)
+        scheduler = DetectionScheduler(cpu_budget=args.cpu_budget / 100) if args.adaptive else None
+        results = run_benchmark(source, detector,
+                                FocusTracker(grace_period=args.grace), args.frames, scheduler)
+    finally:
+        source.release()
+
+    results["source"] = args.source
+    results["face"] = args.face
+    results["sensitivity"] = args.sensitivity
+    results["resolution"] = args.resolution
+
+    print(f"Frames:       {results['frames']} ({results['detections']} detected)")
+    print(f"Throughput:   {results['fps']} frames/s")
+    print(f"Latency p50:  {results['latency_p50_ms']} ms")
+    print(f"Latency p99:  {results['latency_p99_ms']} ms")
+    print(f"Scans:        {results['full_scans']} full / {results['roi_scans']} tracked")
+    print(f"Reused:       {results['reuse_rate']:.1%} of frames skipped the cascade")
+    print(f"Focus score:  {results['focus_score']}%")
+    print("Timeline:")
+    for at, state in results["timeline"]:
+        print(f"  {at:8.2f}s  {state}")
+
+    if args.json_path:
+        with open(args.json_path, "w") as file:
+            json.dump(results, file, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
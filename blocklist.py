@@ -0,0 +1,243 @@
+"""Blocklist compiler: domain lists in, suffix trie out.
+
+Reads hosts-format files ("0.0.0.0 ads.example.com") and plain domain
+lists, normalizes and dedupes the names, and stores them in a trie keyed on
+reversed labels (com -> youtube -> ...). A blocked domain is a True leaf
+that covers its whole subtree, so blocking youtube.com also blocks
+m.youtube.com, names already covered by a parent are dropped as they are
+added, and "is this host blocked?" walks at most one node per label.
+
+A compiled list is written as a compact index: the remaining domains,
+sorted in reversed-label order and zlib-compressed. Examples:
+
+    python blocklist.py compile hosts.txt domains.txt -o blocklist.idx
+    python blocklist.py check blocklist.idx m.youtube.com
+    python blocklist.py hosts blocklist.idx > section.txt
+"""
+import argparse
+import re
+import sys
+import zlib
+
+INDEX_MAGIC = b"FBL1\n"
+
+# Names found in stock hosts files that must never be blocked
+RESERVED = {"localhost", "localhost.localdomain", "local", "broadcasthost", "ip6-localhost",
+            "ip6-loopback", "ip6-localnet", "ip6-mcastprefix", "ip6-allnodes", "ip6-allrouters",
+            "ip6-allhosts", "0.0.0.0"}
+
+# Two or more labels of up to 63 characters; underscores occur in real lists
+DOMAIN = re.compile(r"^(?:[a-z0-9_](?:[a-z0-9_-]{0,61}[a-z0-9_])?\.)+[a-z0-9_](?:[a-z0-9_-]{0,61}[a-z0-9_])?$")
+
+# The address column of a hosts file; loose, but never matches a domain
+ADDRESS = re.compile(r"^(?:\d{1,3}(?:\.\d{1,3}){3}|[0-9a-f]*:[0-9a-f:.]*(?:%\S+)?)$", re.IGNORECASE)
+
+
+def normalize_domain(text):
+    """Canonical form of a domain (lowercase, ASCII, no wildcard or trailing dot), or None if invalid"""
+    name = text.strip().lower().rstrip(".")
+    if name.startswith("*."):
+        name = name[2:]
+    elif name.startswith("||") and name.endswith("^"):
+        # Adblock-style domain rule
+        name = name[2:-1]
+    if not name or name in RESERVED or len(name) > 253:
+        return None
+    if not name.isascii():
+        try:
+            name = name.encode("idna").decode("ascii")
+        except UnicodeError:
+            return None
+    if not DOMAIN.match(name) or name.rpartition(".")[2].isdigit():
+        # Malformed, or a bare IPv4 address rather than a name
+        return None
+    return name
+
+
+def parse_lines(lines):
+    """Yield the normalized domains of a hosts-format or plain domain list"""
+    for line in lines:
+        line = line.split("#", 1)[0].split("!", 1)[0].strip()
+        if not line:
+            continue
+        tokens = line.split()
+        # Hosts format: an address followed by one or more names
+        names = tokens[1:] if ADDRESS.match(tokens[0]) else tokens[:1]
+        for token in names:
+            name = normalize_domain(token)
+            if name is not None:
+                yield name
+
+
+class Blocklist:
+    """Suffix trie of blocked domains"""
+
+    def __init__(self):
+        self.root = {}
+        self.count = 0
+        self.labels = {}  # interned label strings, shared between nodes
+
+    def __len__(self):
+        return self.count
+
+    def add(self, domain):
+        """Block a normalized domain and all its subdomains; returns False if already covered"""
+        node = self.root
+        labels = domain.split(".")[::-1]
+        last = len(labels) - 1
+        for depth, label in enumerate(labels):
+            label = self.labels.setdefault(label, label)
+            child = node.get(label)
+            if child is True:
+                return False
+            if depth == last:
+                if child is not None:
+                    # Replaces everything that was blocked below it
+                    self.count -= _count_leaves(child)
+                node[label] = True
+                self.count += 1
+                return True
+            if child is None:
+                child = node[label] = {}
+            node = child
+        return False
+
+    def update(self, domains):
+        """Add many domains; returns how many changed the list"""
+        return sum(self.add(domain) for domain in domains)
+
+    def blocks(self, host):
+        """Whether a host name is blocked (exactly or as a subdomain)"""
+        node = self.root
+        for label in host.lower().rstrip(".").split(".")[::-1]:
+            node = node.get(label)
+            if node is True:
+                return True
+            if node is None:
+                return False
+        return False
+
+    __contains__ = blocks
+
+    def domains(self):
+        """Yield every blocked domain, in reversed-label order"""
+        stack = [(self.root, ())]
+        while stack:
+            node, suffix = stack.pop()
+            for label in sorted(node, reverse=True):
+                child = node[label]
+                path = suffix + (label,)
+                if child is True:
+                    yield ".".join(reversed(path))
+                else:
+                    stack.append((child, path))
+
+    def hosts_names(self, prefixes=("www", "m")):
+        """Names for a hosts file, which can't match subdomains by itself:
+        each domain plus the common prefixes in front of it"""
+        for domain in self.domains():
+            yield domain
+            if domain.split(".", 1)[0] not in prefixes:
+                for prefix in prefixes:
+                    yield f"{prefix}.{domain}"
+
+    def to_bytes(self):
+        """Compact serialized index"""
+        compressor = zlib.compressobj()
+        chunks = [INDEX_MAGIC]
+        batch = []
+        for domain in self.domains():
+            batch.append(domain)
+            if len(batch) >= 10000:
+                chunks.append(compressor.compress(("\n".join(batch) + "\n").encode("ascii")))
+                batch = []
+        if batch:
+            chunks.append(compressor.compress(("\n".join(batch) + "\n").encode("ascii")))
+        chunks.append(compressor.flush())
+        return b"".join(chunks)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if not data.startswith(INDEX_MAGIC):
+            raise ValueError("not a FocusBuddy blocklist index")
+        blocklist = cls()
+        text = zlib.decompress(data[len(INDEX_MAGIC):]).decode("ascii")
+        blocklist.update(domain for domain in text.split("\n") if domain)
+        return blocklist
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+
+def _count_leaves(node):
+    count = 0
+    stack = [node]
+    while stack:
+        for child in stack.pop().values():
+            if child is True:
+                count += 1
+            else:
+                stack.append(child)
+    return count
+
+
+def compile_files(paths, blocklist=None):
+    """Add the domains of hosts-format or plain list files to a blocklist"""
+    if blocklist is None:
+        blocklist = Blocklist()
+    for path in paths:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            blocklist.update(parse_lines(f))
+    return blocklist
+
+
+def compile_sites(sites, index_path=None):
+    """Blocklist for the sites typed in Settings plus an optional compiled index"""
+    blocklist = Blocklist.load(index_path) if index_path else Blocklist()
+    blocklist.update(parse_lines(sites))
+    return blocklist
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile and query FocusBuddy blocklists")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    compile_parser = commands.add_parser("compile", help="compile list files into an index")
+    compile_parser.add_argument("lists", nargs="+", help="hosts-format or plain domain list files")
+    compile_parser.add_argument("-o", "--output", required=True, help="index file to write")
+
+    check_parser = commands.add_parser("check", help="check host names against an index")
+    check_parser.add_argument("index")
+    check_parser.add_argument("hosts", nargs="+")
+
+    hosts_parser = commands.add_parser("hosts", help="print the hosts-file section for an index")
+    hosts_parser.add_argument("index")
+    hosts_parser.add_argument("--address", default="127.0.0.1")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "compile":
+            blocklist = compile_files(args.lists)
+            blocklist.save(args.output)
+            print(f"{len(blocklist)} domains written to {args.output}")
+        elif args.command == "check":
+            blocklist = Blocklist.load(args.index)
+            for host in args.hosts:
+                print(f"{host}: {'blocked' if blocklist.blocks(host) else 'allowed'}")
+        else:
+            from hosts_file import render_section
+            sys.stdout.write(render_section(Blocklist.load(args.index).hosts_names(), args.address))
+    except (OSError, ValueError, zlib.error) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
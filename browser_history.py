@@ -0,0 +1,303 @@
+"""Detects visits to distracting sites from the browsers' own history.
+
+Chromium-based browsers (Chrome, Chromium, Edge, Brave) and Firefox keep
+their history in SQLite files in the user's profile. Each profile is read
+read-only, without taking the browser's locks, and keeps a cursor on the
+last visit it has seen: a poll skips profiles whose files haven't changed
+and otherwise reads only the visits after the cursor through the visits
+table's primary key, so its cost doesn't grow with the history. History
+already there when watching starts is not reported. Example:
+
+    python browser_history.py youtube.com reddit.com --interval 2
+"""
+import argparse
+import datetime
+import glob
+import os
+import platform
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+from blocklist import Blocklist, parse_lines
+
+# Process names of the browsers whose history can be read (see process_watcher)
+BROWSER_APPS = {"chrome", "chromium", "chromium-browser", "msedge", "microsoft-edge", "brave",
+                "brave-browser", "firefox", "firefox-bin"}
+
+# Both store visit times in microseconds: Chromium since 1601-01-01,
+# Firefox since the Unix epoch
+EPOCH_OFFSETS = {"chromium": 11644473600, "firefox": 0}
+
+# Per browser: the newest visit, and visits after a cursor (id, time), in id order
+QUERIES = {
+    "chromium": (
+        "SELECT id, visit_time FROM visits ORDER BY id DESC LIMIT 1",
+        '''
+        SELECT visits.id, visits.visit_time, urls.url
+        FROM visits JOIN urls ON urls.id = visits.url
+        WHERE visits.id > ? AND visits.visit_time > ?
+        ORDER BY visits.id
+        LIMIT ?
+        '''),
+    "firefox": (
+        "SELECT id, visit_date FROM moz_historyvisits ORDER BY id DESC LIMIT 1",
+        '''
+        SELECT v.id, v.visit_date, p.url
+        FROM moz_historyvisits v JOIN moz_places p ON p.id = v.place_id
+        WHERE v.id > ? AND v.visit_date > ?
+        ORDER BY v.id
+        LIMIT ?
+        '''),
+}
+
+
+def profile_roots():
+    """(browser, kind, glob pattern of history files) for this OS's browsers"""
+    home = os.path.expanduser("~")
+    system = platform.system()
+    if system == "Windows":
+        local = os.environ.get("LOCALAPPDATA", os.path.join(home, "AppData", "Local"))
+        roaming = os.environ.get("APPDATA", os.path.join(home, "AppData", "Roaming"))
+        chromium = {
+            "Chrome": os.path.join(local, "Google", "Chrome", "User Data"),
+            "Chromium": os.path.join(local, "Chromium", "User Data"),
+            "Edge": os.path.join(local, "Microsoft", "Edge", "User Data"),
+            "Brave": os.path.join(local, "BraveSoftware", "Brave-Browser", "User Data"),
+        }
+        firefox = [os.path.join(roaming, "Mozilla", "Firefox", "Profiles")]
+    elif system == "Darwin":
+        support = os.path.join(home, "Library", "Application Support")
+        chromium = {
+            "Chrome": os.path.join(support, "Google", "Chrome"),
+            "Chromium": os.path.join(support, "Chromium"),
+            "Edge": os.path.join(support, "Microsoft Edge"),
+            "Brave": os.path.join(support, "BraveSoftware", "Brave-Browser"),
+        }
+        firefox = [os.path.join(support, "Firefox", "Profiles")]
+    else:
+        config = os.environ.get("XDG_CONFIG_HOME", os.path.join(home, ".config"))
+        chromium = {
+            "Chrome": os.path.join(config, "google-chrome"),
+            "Chromium": os.path.join(config, "chromium"),
+            "Edge": os.path.join(config, "microsoft-edge"),
+            "Brave": os.path.join(config, "BraveSoftware", "Brave-Browser"),
+        }
+        firefox = [os.path.join(home, ".mozilla", "firefox"),
+                   os.path.join(home, "snap", "firefox", "common", ".mozilla", "firefox")]
+
+    roots = [(browser, "chromium", os.path.join(path, "*", "History")) for browser, path in chromium.items()]
+    roots.extend(("Firefox", "firefox", os.path.join(path, "*", "places.sqlite")) for path in firefox)
+    return roots
+
+
+def find_profiles(roots=None):
+    """(browser, kind, history file) for every profile found"""
+    profiles = []
+    for browser, kind, pattern in roots if roots is not None else profile_roots():
+        profiles.extend((browser, kind, path) for path in sorted(glob.glob(pattern)))
+    return profiles
+
+
+def visit_host(url):
+    """Host name of a web URL, or None for other schemes"""
+    try:
+        parts = urlsplit(url)
+        return parts.hostname if parts.scheme in ("http", "https") else None
+    except ValueError:
+        return None
+
+
+class HistoryProfile:
+    """One profile's history database and the cursor on its visits"""
+
+    def __init__(self, browser, kind, path):
+        self.browser = browser
+        self.kind = kind
+        self.path = path
+        self.last_id = None  # None until the first read sets it to the newest visit
+        self.last_time = 0  # in the browser's own units
+        self.signature = None
+        self.copy_dir = None  # where a locked database is copied to, if it ever was
+        self.copy_signature = None
+
+    def changed(self):
+        """Whether the database (or its write-ahead log) changed since the last read"""
+        signature = []
+        for path in (self.path, self.path + "-wal"):
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                signature.append(None)
+        if signature == self.signature:
+            return False
+        self.signature = signature
+        return True
+
+    def connect(self):
+        """Read-only connection that doesn't wait on (or block) the browser.
+
+        Plain read-only mode sees the write-ahead log but needs the
+        database's locks; browsers that hold them exclusively are read as
+        an immutable snapshot of the main file instead, and if even that
+        can't be opened, from a copy of it.
+        """
+        uri = "file:" + self.path.replace("?", "%3f").replace("#", "%23")
+        for flags in ("mode=ro", "mode=ro&immutable=1"):
+            conn = None
+            try:
+                conn = sqlite3.connect(f"{uri}?{flags}", uri=True, timeout=0)
+                conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+                return conn
+            except sqlite3.OperationalError:
+                if conn is not None:
+                    conn.close()
+        return sqlite3.connect(self.copy())
+
+    def copy(self):
+        """Path of a private copy of the main file, copied again only when it changed.
+
+        Browsers mostly append to the write-ahead log, which a copy of the
+        main file doesn't see anyway, so most polls reuse the last copy.
+        """
+        stat = os.stat(self.path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if self.copy_dir is None:
+            self.copy_dir = tempfile.mkdtemp(prefix="focusbuddy-history-")
+        copy = os.path.join(self.copy_dir, "history.sqlite")
+        if signature != self.copy_signature:
+            self.copy_signature = None
+            shutil.copyfile(self.path, copy)
+            self.copy_signature = signature
+        return copy
+
+    def close(self):
+        """Delete the copy of the database, if there is one"""
+        if self.copy_dir is not None:
+            shutil.rmtree(self.copy_dir, ignore_errors=True)
+            self.copy_dir = self.copy_signature = None
+
+    def read_new(self, limit=1000):
+        """Visits since the last read as (visit id, unix time, url) rows"""
+        newest_query, visits_query = QUERIES[self.kind]
+        conn = self.connect()
+        try:
+            newest_id, newest_time = conn.execute(newest_query).fetchone() or (0, 0)
+            if self.last_id is None:
+                # First look at this profile: only visits from now on count
+                self.last_id, self.last_time = newest_id, newest_time
+                return []
+            min_time = 0
+            if newest_id < self.last_id:
+                # The history was cleared and visit ids started over; the
+                # time cursor keeps visits already seen from coming back
+                self.last_id, min_time = 0, self.last_time
+            rows = conn.execute(visits_query, (self.last_id, min_time, limit)).fetchall()
+        finally:
+            conn.close()
+        if not rows:
+            return []
+        self.last_id = rows[-1][0]
+        self.last_time = max(self.last_time, max(row[1] for row in rows))
+        if len(rows) == limit:
+            # More to read: make sure the next poll doesn't skip the profile
+            self.signature = None
+        offset = EPOCH_OFFSETS[self.kind]
+        return [(visit_id, visit_time / 1000000 - offset, url) for visit_id, visit_time, url in rows]
+
+
+class BrowserHistoryWatcher:
+    """Reports new visits to blocked hosts across all browser profiles.
+
+    poll() and close() may be called from different threads: closing waits
+    for a poll in progress, and polls after it report nothing.
+    """
+
+    def __init__(self, blocklist, roots=None, batch=1000):
+        self.blocklist = blocklist
+        self.roots = roots
+        self.batch = batch
+        self.profiles = {}  # history file -> HistoryProfile
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def refresh_profiles(self):
+        """Pick up new profiles (keeping the cursors of known ones)"""
+        found = {path: (browser, kind) for browser, kind, path in find_profiles(self.roots)}
+        for path in self.profiles.keys() - found.keys():
+            self.profiles.pop(path).close()
+        for path, (browser, kind) in found.items():
+            if path not in self.profiles:
+                self.profiles[path] = HistoryProfile(browser, kind, path)
+
+    def poll(self):
+        """New distracting visits as (browser, host, url, unix time) tuples"""
+        with self.lock:
+            if self.closed:
+                return []
+            return self._poll()
+
+    def _poll(self):
+        self.refresh_profiles()
+        visits = []
+        for profile in self.profiles.values():
+            if not profile.changed():
+                continue
+            try:
+                rows = profile.read_new(self.batch)
+            except (sqlite3.Error, OSError) as e:
+                # Caught mid-write, or not a history database; try again next time
+                print(f"Error reading {profile.browser} history: {e}")
+                profile.signature = None
+                continue
+            for _, visited, url in rows:
+                host = visit_host(url)
+                if host and self.blocklist.blocks(host):
+                    visits.append((profile.browser, host, url, visited))
+        return visits
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            for profile in self.profiles.values():
+                profile.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Print visits to distracting sites as browsers record them")
+    parser.add_argument("sites", nargs="*", help="domains to watch for (subdomains included)")
+    parser.add_argument("--index", help="compiled blocklist index to watch for as well")
+    parser.add_argument("--interval", type=float, default=5.0, help="seconds between polls")
+    args = parser.parse_args(argv)
+
+    try:
+        blocklist = Blocklist.load(args.index) if args.index else Blocklist()
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    blocklist.update(parse_lines(args.sites))
+
+    watcher = BrowserHistoryWatcher(blocklist)
+    watcher.refresh_profiles()
+    for profile in watcher.profiles.values():
+        print(f"Watching {profile.browser}: {profile.path}", file=sys.stderr)
+    try:
+        while True:
+            for browser, host, url, visited in watcher.poll():
+                when = datetime.datetime.fromtimestamp(visited).strftime("%H:%M:%S")
+                print(f"{when} {browser:<8} {host}  {url}")
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+"""Streaming export and import of sessions, journals and badges.
+
+NDJSON files hold both tables, one {"type": "session"|"badge", ...} object
+per line; CSV files hold one table each. Rows are streamed through
+generators and written in chunked executemany transactions, so memory use
+stays flat however large the file is. Imports are idempotent: sessions are
+keyed on (start_time, duration) and badges on badge_id, and rows that
+already exist are skipped. The daily rollup and badge aggregates are rebuilt once at the end.
+Examples:
+
+    python data_io.py export backup.ndjson
+    python data_io.py export sessions.csv --table sessions
+    python data_io.py import backup.ndjson
+"""
+import argparse
+import base64
+import csv
+import json
+import os
+import sqlite3
+import sys
+
+import queries
+from badges import BadgeEngine
+
+# Exported columns per table, in file order. The natural key comes first.
+TABLES = {
+    "sessions": ("focus_sessions", "session",
+                 ("start_time", "day", "duration", "focus_score", "hardcore_mode", "journal_text", "timeline")),
+    "badges": ("earned_badges", "badge", ("badge_id", "earn_date")),
+}
+RECORD_TYPES = {record_type: table for table, (_, record_type, _) in TABLES.items()}
+
+CHUNK_SIZE = 5000
+
+
+def detect_format(path, fmt=None):
+    """File format from an explicit choice or the file extension"""
+    if fmt:
+        return fmt
+    return "csv" if path.lower().endswith(".csv") else "ndjson"
+
+
+def iter_rows(storage, table, chunk_size=CHUNK_SIZE):
+    """Yield the exported columns of every row of a table, in id order.
+
+    Rows are read in keyset-paginated chunks, so no query stays open while
+    the caller writes them out.
+    """
+    sql_table, _, columns = TABLES[table]
+    last_id = 0
+    while True:
+        rows = storage.query(f'''
+        SELECT id, {", ".join(columns)} FROM {sql_table}
+        WHERE id > ? ORDER BY id LIMIT ?
+        ''', (last_id, chunk_size))
+        for row in rows:
+            yield row[1:]
+        if len(rows) < chunk_size:
+            return
+        last_id = rows[-1][0]
+
+
+def encode_value(value):
+    # Timelines are binary; files carry them as base64 text
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode("ascii")
+    return value
+
+
+def export_data(storage, path, fmt=None, tables=("sessions", "badges")):
+    """Write tables to an NDJSON or CSV file; returns row counts per table"""
+    fmt = detect_format(path, fmt)
+    if fmt == "csv" and len(tables) != 1:
+        raise ValueError("a CSV file holds one table; choose sessions or badges")
+
+    counts = dict.fromkeys(tables, 0)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for table in tables:
+            _, record_type, columns = TABLES[table]
+            if fmt == "csv":
+                writer = csv.writer(f)
+                writer.writerow(columns)
+                for row in iter_rows(storage, table):
+                    writer.writerow(["" if value is None else encode_value(value) for value in row])
+                    counts[table] += 1
+            else:
+                for row in iter_rows(storage, table):
+                    record = {"type": record_type}
+                    record.update(zip(columns, map(encode_value, row)))
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    counts[table] += 1
+    return counts
+
+
+def read_records(path, fmt=None, table=None):
+    """Yield (table, record dict, line number) from an NDJSON or CSV file"""
+    fmt = detect_format(path, fmt)
+    with open(path, encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            if table is None:
+                raise ValueError("importing a CSV file needs its table (sessions or badges)")
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield table, {key: (value if value != "" else None) for key, value in record.items()}, reader.line_num
+            return
+
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"line {number}: {e}") from None
+            record_table = RECORD_TYPES.get(record.get("type"))
+            if record_table is None:
+                raise ValueError(f"line {number}: unknown record type {record.get('type')!r}")
+            if table is None or record_table == table:
+                yield record_table, record, number
+
+
+def session_row(record):
+    """Validate a session record into an insert row"""
+    start_time = record["start_time"]
+    if not start_time:
+        raise ValueError("session without start_time")
+    timeline = record.get("timeline")
+    return (
+        start_time,
+        record.get("day") or start_time[:10],
+        int(float(record.get("duration") or 0)),
+        float(record.get("focus_score") or 0),
+        1 if str(record.get("hardcore_mode") or 0) not in ("0", "False", "false") else 0,
+        record.get("journal_text"),
+        base64.b64decode(timeline) if timeline else None,
+    )
+
+
+def badge_row(record):
+    """Validate a badge record into an insert row"""
+    badge_id = record["badge_id"]
+    if not badge_id:
+        raise ValueError("badge without badge_id")
+    return badge_id, record.get("earn_date")
+
+
+INSERTS = {
+    "sessions": (session_row, '''
+    INSERT OR IGNORE INTO focus_sessions
+        (start_time, day, duration, focus_score, hardcore_mode, journal_text, timeline)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    '''),
+    "badges": (badge_row, '''
+    INSERT OR IGNORE INTO earned_badges (badge_id, earn_date)
+    VALUES (?, ?)
+    '''),
+}
+
+
+def import_data(storage, path, fmt=None, table=None, engine=None, chunk_size=CHUNK_SIZE):
+    """Import an NDJSON or CSV file; returns {table: (rows read, rows inserted)}"""
+    counts = {name: [0, 0] for name in TABLES}
+    pending = {name: [] for name in TABLES}
+
+    def flush(name):
+        rows = pending[name]
+        if not rows:
+            return
+        with storage.transaction():
+            # rowcount sums changes() over the statements: rows actually
+            # inserted, not counting ignored duplicates or rows written by
+            # triggers (e.g. the journal search index)
+            counts[name][1] += storage.executemany(INSERTS[name][1], rows).rowcount
+        rows.clear()
+
+    for name, record, number in read_records(path, fmt, table):
+        try:
+            pending[name].append(INSERTS[name][0](record))
+        except KeyError as e:
+            raise ValueError(f"line {number}: missing {e}") from None
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"line {number}: {e}") from None
+        counts[name][0] += 1
+        if len(pending[name]) >= chunk_size:
+            flush(name)
+    for name in TABLES:
+        flush(name)
+
+    # Rebuild the derived tables once, now that every row is in
+    with storage.transaction():
+        queries.rebuild_daily_rollup(storage)
+        (engine or BadgeEngine()).replay(storage)
+    return {name: tuple(count) for name, count in counts.items()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export or import FocusBuddy sessions and badges")
+    parser.add_argument("action", choices=["export", "import"])
+    parser.add_argument("path", help="NDJSON (.ndjson/.jsonl) or CSV (.csv) file")
+    parser.add_argument("--db", default=os.path.join(os.path.expanduser("~"), ".focusbuddy", "focusbuddy.db"),
+                        help="path to focusbuddy.db")
+    parser.add_argument("--format", choices=["ndjson", "csv"], help="file format (default: from the extension)")
+    parser.add_argument("--table", choices=list(TABLES), help="only this table (required for CSV)")
+    args = parser.parse_args(argv)
+
+    from storage import Storage
+    from migrations import migrate
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.db)), exist_ok=True)
+    storage = Storage(args.db)
+    try:
+        migrate(storage)
+        if args.action == "export":
+            tables = (args.table,) if args.table else tuple(TABLES)
+            counts = export_data(storage, args.path, args.format, tables)
+            print(", ".join(f"{count} {table}" for table, count in counts.items()) + f" written to {args.path}")
+        else:
+            counts = import_data(storage, args.path, args.format, args.table)
+            print(", ".join(f"{table}: {inserted} new of {read}" for table, (read, inserted) in counts.items()))
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        storage.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
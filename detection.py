@@ -0,0 +1,242 @@
+"""Face detection used to decide whether the user is at their desk"""
+import cv2
+
+# Cascade parameters and working-image width for each "Detection
+# Sensitivity" setting. Higher sensitivity searches a larger image so that
+# smaller (more distant) faces are still found.
+SENSITIVITY_PRESETS = {
+    "Low": {"scale_factor": 1.2, "min_neighbors": 3, "detect_width": 320},
+    "Medium": {"scale_factor": 1.1, "min_neighbors": 5, "detect_width": 480},
+    "High": {"scale_factor": 1.05, "min_neighbors": 7, "detect_width": 640},
+}
+
+# Choices for the "Detection Resolution" setting (working-image width)
+DETECTION_RESOLUTIONS = {"Auto": None, "320": 320, "480": 480, "640": 640, "Native": 0}
+
+# Smallest face searched for, in native-resolution pixels
+MIN_FACE_SIZE = 30
+
+# The frontal-face cascade is trained on 24x24 windows
+CASCADE_WINDOW = 24
+
+
+class MotionGate:
+    """Cheap change detector that lets static frames reuse the last verdict.
+
+    Each frame is shrunk to a tiny grayscale thumbnail and compared with the
+    thumbnail of the last frame that went through the cascade. If the mean
+    absolute difference is below the threshold and the last two cascade
+    runs agreed, the previous result is reused. After max_reuse reuses in a
+    row a real detection is forced.
+    """
+
+    def __init__(self, threshold=3.0, max_reuse=10, thumb_size=(32, 24)):
+        self.threshold = threshold
+        self.max_reuse = max_reuse
+        self.thumb_size = thumb_size
+        self.reset()
+
+    def reset(self):
+        self.reference = None
+        self.last_present = None
+        self.confident = False
+        self.streak = 0
+        self.frames = 0
+        self.reused = 0
+
+    def thumbnail(self, gray):
+        return cv2.resize(gray, self.thumb_size, interpolation=cv2.INTER_AREA)
+
+    def can_reuse(self, thumb):
+        """Whether the last detection result still holds for this thumbnail"""
+        self.frames += 1
+        if self.reference is None or not self.confident or self.streak >= self.max_reuse:
+            return False
+        if float(cv2.absdiff(thumb, self.reference).mean()) > self.threshold:
+            return False
+        self.streak += 1
+        self.reused += 1
+        return True
+
+    def record(self, thumb, present):
+        """Register the outcome of a real cascade run"""
+        self.confident = present == self.last_present
+        self.last_present = present
+        self.reference = thumb
+        self.streak = 0
+
+    def reuse_rate(self):
+        """Fraction of frames that skipped the cascade"""
+        return self.reused / self.frames if self.frames else 0.0
+
+
+class FaceDetector:
+    """Haar-cascade face detector with sensitivity presets.
+
+    Frames wider than the working width are downscaled once; preprocessing
+    and the cascade run on the small image and the boxes are scaled back to
+    frame coordinates. detect_width=None follows the sensitivity preset and
+    0 disables downscaling.
+
+    With motion_gate enabled, frames of a static scene reuse the previous
+    result instead of running the cascade (see MotionGate).
+
+    With tracking enabled, once a face has been found later frames are only
+    searched in an expanded region around the last face and within a narrow
+    band of face sizes. A full-frame scan is done again every
+    reacquire_interval detections, or as soon as the region comes up empty.
+    """
+
+    def __init__(self, sensitivity="Medium", cascade_path=None, tracking=True,
+                 reacquire_interval=30, roi_margin=0.5, scale_band=0.3, detect_width=None,
+                 motion_gate=True):
+        if cascade_path is None:
+            cascade_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+        self.face_cascade = cv2.CascadeClassifier(cascade_path)
+        self.sensitivity = sensitivity
+        self.tracking = tracking
+        self.reacquire_interval = reacquire_interval
+        self.roi_margin = roi_margin
+        self.scale_band = scale_band
+        self.detect_width = detect_width
+        self.motion_gate = MotionGate() if motion_gate else None
+        self.reset()
+
+    def reset(self):
+        """Forget the tracked face, e.g. at the start of a session"""
+        # Tracked face box, in working-image coordinates
+        self.last_face = None
+        self.last_faces = []
+        self.since_full_scan = 0
+        self.full_scans = 0
+        self.roi_scans = 0
+        if self.motion_gate is not None:
+            self.motion_gate.reset()
+
+    def get_state(self):
+        """Per-stream state (tracked face and motion-gate reference), for
+        detectors shared between several streams"""
+        gate = None
+        if self.motion_gate is not None:
+            gate = (self.motion_gate.reference, self.motion_gate.last_present,
+                    self.motion_gate.confident, self.motion_gate.streak)
+        return self.last_face, self.last_faces, self.since_full_scan, gate
+
+    def set_state(self, state):
+        """Restore state from get_state(); None starts a fresh stream"""
+        if state is None:
+            self.last_face, self.last_faces, self.since_full_scan, gate = None, [], 0, None
+        else:
+            self.last_face, self.last_faces, self.since_full_scan, gate = state
+        if self.motion_gate is not None:
+            if gate is None:
+                gate = (None, None, False, 0)
+            (self.motion_gate.reference, self.motion_gate.last_present,
+             self.motion_gate.confident, self.motion_gate.streak) = gate
+
+    def reuse_rate(self):
+        """Fraction of frames answered from the motion gate"""
+        return self.motion_gate.reuse_rate() if self.motion_gate is not None else 0.0
+
+    def params(self):
+        """Cascade parameters for the current sensitivity"""
+        return SENSITIVITY_PRESETS.get(self.sensitivity, SENSITIVITY_PRESETS["Medium"])
+
+    def working_width(self):
+        """Width of the image the cascade runs on (0 means native)"""
+        if self.detect_width is not None:
+            return self.detect_width
+        return self.params()["detect_width"]
+
+    def detect(self, frame):
+        """Return the list of (x, y, w, h) face boxes found in a BGR frame"""
+        # Downscale once to the working resolution
+        frame_h, frame_w = frame.shape[:2]
+        width = self.working_width()
+        scale = 1.0
+        if width and frame_w > width:
+            scale = width / frame_w
+            frame = cv2.resize(frame, (width, max(1, int(round(frame_h * scale)))),
+                               interpolation=cv2.INTER_AREA)
+        self.min_size = max(CASCADE_WINDOW, int(round(MIN_FACE_SIZE * scale)))
+
+        # Convert to grayscale for detection
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+        # Static scene with a confident last result: skip the cascade
+        thumb = None
+        motion_gate = self.motion_gate
+        if motion_gate is not None:
+            thumb = motion_gate.thumbnail(gray)
+            if motion_gate.can_reuse(thumb):
+                return self._to_frame(self.last_faces, scale)
+
+        faces = []
+        last_face = self.last_face
+        if (self.tracking and last_face is not None
+                and self.since_full_scan < self.reacquire_interval):
+            faces = self._detect_in_roi(gray, last_face)
+            self.roi_scans += 1
+            self.since_full_scan += 1
+
+        # Fall back to (or periodically force) a full-frame scan
+        if not faces:
+            faces = self._detect_full(gray)
+            self.full_scans += 1
+            self.since_full_scan = 0
+
+        # Track the largest face
+        self.last_face = max(faces, key=lambda f: f[2] * f[3]) if faces else None
+        self.last_faces = faces
+        if thumb is not None:
+            motion_gate.record(thumb, len(faces) > 0)
+
+        return self._to_frame(faces, scale)
+
+    def _to_frame(self, faces, scale):
+        # Map boxes back onto the original frame
+        if scale != 1.0:
+            faces = [tuple(int(round(v / scale)) for v in face) for face in faces]
+        return faces
+
+    def _detect_full(self, gray):
+        # Apply histogram equalization for better contrast
+        gray = cv2.equalizeHist(gray)
+
+        params = self.params()
+        faces = self.face_cascade.detectMultiScale(
+            gray,
+            scaleFactor=params["scale_factor"],
+            minNeighbors=params["min_neighbors"],
+            minSize=(self.min_size, self.min_size),
+            flags=cv2.CASCADE_SCALE_IMAGE
+        )
+        return [tuple(int(v) for v in face) for face in faces]
+
+    def _detect_in_roi(self, gray, last_face):
+        x, y, w, h = last_face
+        img_h, img_w = gray.shape[:2]
+
+        # Expand the last face box by a margin on every side
+        mx, my = int(w * self.roi_margin), int(h * self.roi_margin)
+        x0, y0 = max(0, x - mx), max(0, y - my)
+        x1, y1 = min(img_w, x + w + mx), min(img_h, y + h + my)
+        roi = cv2.equalizeHist(gray[y0:y1, x0:x1])
+
+        # Only look for faces of roughly the same size as before
+        size = max(w, h)
+        min_size = max(self.min_size, int(size * (1 - self.scale_band)))
+        max_size = int(size * (1 + self.scale_band))
+        if min(roi.shape[:2]) < min_size:
+            return []
+
+        params = self.params()
+        faces = self.face_cascade.detectMultiScale(
+            roi,
+            scaleFactor=params["scale_factor"],
+            minNeighbors=params["min_neighbors"],
+            minSize=(min_size, min_size),
+            maxSize=(max_size, max_size),
+            flags=cv2.CASCADE_SCALE_IMAGE
+        )
+        return [(int(fx) + x0, int(fy) + y0, int(fw), int(fh)) for (fx, fy, fw, fh) in faces]
@@ -0,0 +1,359 @@
+"""Local DNS sinkhole: an alternative to blocking sites in the hosts file.
+
+A small asyncio UDP DNS server. Queries for blocked names (a suffix match
+against a Blocklist, so every subdomain is covered) are answered locally
+with NXDOMAIN or a loopback address; everything else is forwarded to an
+upstream resolver, and its answers are kept in an LRU cache for their TTL.
+Point the system's (or the browser's) DNS server at the listen address to
+use it. Example:
+
+    python dns_sinkhole.py --listen 127.0.0.1:5353 --upstream 1.1.1.1:53 youtube.com reddit.com
+"""
+import argparse
+import asyncio
+import random
+import socket
+import struct
+import sys
+import threading
+from collections import OrderedDict
+
+from blocklist import Blocklist, parse_lines
+
+TYPE_A = 1
+TYPE_AAAA = 28
+TYPE_OPT = 41
+CLASS_IN = 1
+
+RCODE_SERVFAIL = 2
+RCODE_NXDOMAIN = 3
+
+FLAG_QR = 0x8000
+FLAG_AA = 0x0400
+FLAG_TC = 0x0200
+FLAG_RD = 0x0100
+FLAG_RA = 0x0080
+OPCODE_MASK = 0x7800
+
+BLOCKED_TTL = 60
+NEGATIVE_TTL = 60  # for upstream answers without records to take a TTL from
+MAX_CACHE_TTL = 3600
+
+MODES = ("nxdomain", "loopback")
+
+
+def parse_address(text, default_port=53):
+    """(host, port) from "host", "host:port" or "[v6 address]:port" """
+    text = text.strip()
+    if text.startswith("["):
+        host, _, rest = text[1:].partition("]")
+        port = rest[1:] if rest.startswith(":") else ""
+    elif text.count(":") == 1:
+        host, port = text.split(":")
+    else:
+        host, port = text, ""
+    if not host:
+        raise ValueError(f"no host in address {text!r}")
+    return host, int(port) if port else default_port
+
+
+def parse_question(packet):
+    """(name, qtype, qclass, end of question) of a standard query, or None"""
+    if len(packet) < 12:
+        return None
+    flags, qdcount = struct.unpack_from("!HH", packet, 2)
+    if flags & (FLAG_QR | OPCODE_MASK) or qdcount != 1:
+        return None
+    labels = []
+    offset = 12
+    while True:
+        if offset >= len(packet):
+            return None
+        length = packet[offset]
+        offset += 1
+        if length == 0:
+            break
+        if length > 63:
+            # Compression pointers have no place in a question
+            return None
+        labels.append(packet[offset:offset + length])
+        offset += length
+    if offset + 4 > len(packet):
+        return None
+    qtype, qclass = struct.unpack_from("!HH", packet, offset)
+    name = b".".join(labels).decode("ascii", "replace").lower()
+    return name, qtype, qclass, offset + 4
+
+
+def skip_name(packet, offset):
+    """Offset just past a (possibly compressed) name"""
+    while True:
+        length = packet[offset]
+        if length >= 0xC0:
+            return offset + 2
+        offset += 1 + length
+        if length == 0:
+            return offset
+
+
+def answer_ttl(packet, question_end):
+    """How long an upstream answer may be cached: its lowest record TTL, or None if it mustn't be"""
+    flags, _, ancount, nscount, arcount = struct.unpack_from("!HHHHH", packet, 2)
+    rcode = flags & 0x000F
+    if flags & FLAG_TC or rcode not in (0, RCODE_NXDOMAIN):
+        return None
+    ttl = None
+    offset = question_end
+    try:
+        for _ in range(ancount + nscount + arcount):
+            offset = skip_name(packet, offset)
+            rtype, _, record_ttl, rdlength = struct.unpack_from("!HHIH", packet, offset)
+            offset += 10 + rdlength
+            if rtype != TYPE_OPT:
+                ttl = record_ttl if ttl is None else min(ttl, record_ttl)
+    except (IndexError, struct.error):
+        return None
+    if ttl is None:
+        ttl = NEGATIVE_TTL
+    return min(ttl, MAX_CACHE_TTL)
+
+
+def response_header(packet, rcode, answers):
+    """Header for a locally built response to packet"""
+    flags = struct.unpack_from("!H", packet, 2)[0]
+    return packet[:2] + struct.pack("!HHHHH", FLAG_QR | FLAG_AA | FLAG_RA | (flags & FLAG_RD) | rcode,
+                                    1, answers, 0, 0)
+
+
+def blocked_response(packet, question_end, qtype, mode):
+    """Answer for a blocked name: NXDOMAIN, or the loopback address (no records for other types)"""
+    question = packet[12:question_end]
+    if mode == "nxdomain":
+        return response_header(packet, RCODE_NXDOMAIN, 0) + question
+    if qtype == TYPE_A:
+        address = socket.inet_pton(socket.AF_INET, "127.0.0.1")
+    elif qtype == TYPE_AAAA:
+        address = socket.inet_pton(socket.AF_INET6, "::1")
+    else:
+        return response_header(packet, 0, 0) + question
+    # The answer's name is a pointer to the question's, at offset 12
+    record = b"\xc0\x0c" + struct.pack("!HHIH", qtype, CLASS_IN, BLOCKED_TTL, len(address)) + address
+    return response_header(packet, 0, 1) + question + record
+
+
+def failure_response(packet, question_end):
+    return response_header(packet, RCODE_SERVFAIL, 0) + packet[12:question_end]
+
+
+class DnsSinkhole(asyncio.DatagramProtocol):
+    """UDP DNS server that sinks blocked names and forwards the rest.
+
+    Forwarded queries share one upstream socket; each gets a random,
+    unused query id so answers can be matched back to their client, and
+    answers from anywhere but the upstream address are ignored. Cached
+    answers are replayed with the client's query id and question.
+    """
+
+    def __init__(self, blocklist, upstream=("1.1.1.1", 53), mode="nxdomain", cache_size=4096, timeout=2.0):
+        if mode not in MODES:
+            raise ValueError(f"unknown mode {mode!r}")
+        self.blocklist = blocklist
+        self.upstream = upstream
+        self.mode = mode
+        self.cache_size = cache_size
+        self.timeout = timeout
+        self.cache = OrderedDict()  # (name, qtype, qclass) -> (expires, answer, question end)
+        self.pending = {}  # upstream query id -> (client packet, question end, client address, key, timer)
+        self.transport = None
+        self.upstream_transport = None
+        self.upstream_address = None
+        self.loop = None
+        self.stats = {"queries": 0, "blocked": 0, "cached": 0, "forwarded": 0, "failed": 0}
+
+    async def start(self, host="127.0.0.1", port=53):
+        """Start listening on host:port"""
+        self.loop = asyncio.get_running_loop()
+        self.upstream_transport, _ = await self.loop.create_datagram_endpoint(
+            lambda: _UpstreamProtocol(self), remote_addr=self.upstream)
+        self.upstream_address = self.upstream_transport.get_extra_info("peername")
+        try:
+            self.transport, _ = await self.loop.create_datagram_endpoint(lambda: self, local_addr=(host, port))
+        except OSError:
+            self.upstream_transport.close()
+            raise
+
+    def close(self):
+        for timer in (entry[4] for entry in self.pending.values()):
+            timer.cancel()
+        self.pending.clear()
+        if self.transport is not None:
+            self.transport.close()
+        if self.upstream_transport is not None:
+            self.upstream_transport.close()
+
+    def set_blocklist(self, blocklist):
+        """Swap in a new blocklist; cached answers may now be for blocked names"""
+        self.blocklist = blocklist
+        self.cache.clear()
+
+    def datagram_received(self, packet, addr):
+        question = parse_question(packet)
+        if question is None:
+            return
+        name, qtype, qclass, question_end = question
+        self.stats["queries"] += 1
+
+        if self.blocklist.blocks(name):
+            self.stats["blocked"] += 1
+            self.transport.sendto(blocked_response(packet, question_end, qtype, self.mode), addr)
+            return
+
+        key = (name, qtype, qclass)
+        cached = self.cache.get(key)
+        if cached is not None:
+            expires, answer, answer_question_end = cached
+            if expires > self.loop.time():
+                self.cache.move_to_end(key)
+                self.stats["cached"] += 1
+                self.transport.sendto(packet[:2] + answer[2:12] + packet[12:question_end]
+                                      + answer[answer_question_end:], addr)
+                return
+            del self.cache[key]
+
+        self.forward(packet, question_end, addr, key)
+
+    def forward(self, packet, question_end, addr, key):
+        if len(self.pending) >= 0xFFFF:
+            self.stats["failed"] += 1
+            self.transport.sendto(failure_response(packet, question_end), addr)
+            return
+        query_id = random.getrandbits(16)
+        while query_id in self.pending:
+            query_id = random.getrandbits(16)
+        timer = self.loop.call_later(self.timeout, self.expire, query_id)
+        self.pending[query_id] = (packet, question_end, addr, key, timer)
+        self.stats["forwarded"] += 1
+        self.upstream_transport.sendto(struct.pack("!H", query_id) + packet[2:])
+
+    def expire(self, query_id):
+        """The upstream never answered: tell the client so it can retry"""
+        packet, question_end, addr, _, _ = self.pending.pop(query_id)
+        self.stats["failed"] += 1
+        self.transport.sendto(failure_response(packet, question_end), addr)
+
+    def upstream_received(self, answer, addr):
+        if addr[:2] != self.upstream_address[:2] or len(answer) < 12:
+            return
+        entry = self.pending.pop(struct.unpack_from("!H", answer)[0], None)
+        if entry is None:
+            return
+        packet, question_end, client, key, timer = entry
+        timer.cancel()
+        # Relay with the client's own query id
+        self.transport.sendto(packet[:2] + answer[2:], client)
+
+        try:
+            answer_question_end = skip_name(answer, 12) + 4
+            ttl = answer_ttl(answer, answer_question_end)
+        except IndexError:
+            ttl = None
+        if ttl:
+            self.cache[key] = (self.loop.time() + ttl, answer, answer_question_end)
+            self.cache.move_to_end(key)
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+
+class _UpstreamProtocol(asyncio.DatagramProtocol):
+    def __init__(self, sinkhole):
+        self.sinkhole = sinkhole
+
+    def datagram_received(self, data, addr):
+        self.sinkhole.upstream_received(data, addr)
+
+
+class SinkholeThread:
+    """Runs a DnsSinkhole on an event loop in its own thread (for the Tk app)"""
+
+    def __init__(self, sinkhole, listen=("127.0.0.1", 53)):
+        self.sinkhole = sinkhole
+        self.listen = listen
+        self.loop = None
+        self.thread = None
+        self.ready = threading.Event()
+        self.error = None
+
+    def start(self, timeout=5.0):
+        """Start serving; raises whatever stopped the server from binding"""
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        if not self.ready.wait(timeout):
+            raise OSError("DNS sinkhole did not start in time")
+        if self.error is not None:
+            raise self.error
+
+    def run(self):
+        self.loop = asyncio.new_event_loop()
+        try:
+            try:
+                self.loop.run_until_complete(self.sinkhole.start(*self.listen))
+            except Exception as e:
+                self.error = e
+                return
+            finally:
+                self.ready.set()
+            self.loop.run_forever()
+        finally:
+            self.sinkhole.close()
+            # Let the transports release their sockets before the loop goes
+            self.loop.run_until_complete(asyncio.sleep(0))
+            self.loop.close()
+
+    def set_blocklist(self, blocklist):
+        self.loop.call_soon_threadsafe(self.sinkhole.set_blocklist, blocklist)
+
+    def stop(self):
+        if self.thread is not None and self.thread.is_alive():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+
+
+async def serve(sinkhole, listen):
+    await sinkhole.start(*listen)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        sinkhole.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run FocusBuddy's DNS sinkhole")
+    parser.add_argument("sites", nargs="*", help="domains to block (subdomains included)")
+    parser.add_argument("--index", help="compiled blocklist index to block as well")
+    parser.add_argument("--listen", default="127.0.0.1:53", help="address to serve on (default 127.0.0.1:53)")
+    parser.add_argument("--upstream", default="1.1.1.1:53", help="resolver for everything not blocked")
+    parser.add_argument("--mode", choices=MODES, default="nxdomain",
+                        help="answer blocked names with NXDOMAIN or a loopback address")
+    parser.add_argument("--cache-size", type=int, default=4096, help="answers to keep cached")
+    args = parser.parse_args(argv)
+
+    sinkhole = None
+    try:
+        blocklist = Blocklist.load(args.index) if args.index else Blocklist()
+        blocklist.update(parse_lines(args.sites))
+        sinkhole = DnsSinkhole(blocklist, parse_address(args.upstream), args.mode, args.cache_size)
+        listen = parse_address(args.listen)
+        print(f"Blocking {len(blocklist)} domains on {listen[0]}:{listen[1]}", file=sys.stderr)
+        asyncio.run(serve(sinkhole, listen))
+    except KeyboardInterrupt:
+        if sinkhole is not None:
+            sinkhole.close()
+            print(", ".join(f"{key} {value}" for key, value in sinkhole.stats.items()), file=sys.stderr)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+"""Focus state logic shared by the app, the benchmark and headless runs"""
+import struct
+import sys
+import time
+from array import array
+
+FOCUSED = "focused"
+GRACE = "grace"
+UNFOCUSED = "unfocused"
+
+# Compact state codes used in memory and in the stored blob
+STATE_CODES = {UNFOCUSED: 0, FOCUSED: 1, GRACE: 2}
+CODE_STATES = {code: state for state, code in STATE_CODES.items()}
+
+# Blob layout: header, then count uint32 start offsets (ms), then count state bytes
+BLOB_MAGIC = b"FT"
+BLOB_VERSION = 1
+BLOB_HEADER = struct.Struct("<2sBII")
+
+
+class FocusTimeline:
+    """Focus / grace / unfocused intervals of a session.
+
+    Only state transitions are stored: run start offsets (seconds since the
+    session start) in one array and state codes in another, so a long
+    session with few transitions takes a few bytes.
+    """
+
+    def __init__(self, start=0.0):
+        self.start = start
+        self.offsets = array("d")
+        self.states = array("B")
+
+    def __len__(self):
+        return len(self.states)
+
+    def record(self, state, now):
+        """Record the state at a point in time; only transitions are kept"""
+        code = STATE_CODES[state]
+        if not self.states or self.states[-1] != code:
+            self.offsets.append(max(0.0, now - self.start))
+            self.states.append(code)
+
+    def intervals(self, end):
+        """Yield (begin, end, state) runs, with offsets in seconds, cut off at end.
+
+        Runs recorded after end (a detection that raced the end of the
+        session, or a malformed blob) are left out.
+        """
+        count = len(self.states)
+        for i in range(count):
+            begin = self.offsets[i]
+            if begin > end:
+                continue
+            finish = min(self.offsets[i + 1], end) if i + 1 < count else end
+            yield begin, max(begin, finish), CODE_STATES[self.states[i]]
+
+    def totals(self, end):
+        """Seconds spent in each state up to end (seconds since start)"""
+        totals = {FOCUSED: 0.0, GRACE: 0.0, UNFOCUSED: 0.0}
+        for begin, finish, state in self.intervals(end):
+            totals[state] += finish - begin
+        return totals
+
+    def focus_score(self, end):
+        """Percentage of the session spent focused"""
+        if end <= 0:
+            return 0
+        return min(100, int(self.totals(end)[FOCUSED] / end * 100))
+
+    def per_minute(self, end):
+        """Focused percentage for each minute of the session"""
+        minutes = max(1, int(-(-end // 60)))
+        focused = [0.0] * minutes
+        for begin, finish, state in self.intervals(end):
+            if state != FOCUSED:
+                continue
+            while begin < finish:
+                minute = min(int(begin // 60), minutes - 1)
+                boundary = min(finish, (minute + 1) * 60)
+                focused[minute] += boundary - begin
+                begin = boundary
+        result = []
+        for minute, seconds in enumerate(focused):
+            length = min(60, end - minute * 60)
+            result.append(min(100, int(seconds / length * 100)) if length > 0 else 0)
+        return result
+
+    def to_blob(self, end):
+        """Serialize to a compact little-endian blob"""
+        offsets = array("I", (int(round(offset * 1000)) for offset in self.offsets))
+        if sys.byteorder != "little":
+            offsets.byteswap()
+        header = BLOB_HEADER.pack(BLOB_MAGIC, BLOB_VERSION, len(self.states), int(round(end * 1000)))
+        return header + offsets.tobytes() + self.states.tobytes()
+
+    @classmethod
+    def from_blob(cls, blob):
+        """Load a timeline saved with to_blob; returns (timeline, end)"""
+        magic, version, count, end_ms = BLOB_HEADER.unpack_from(blob)
+        if magic != BLOB_MAGIC or version != BLOB_VERSION:
+            raise ValueError("not a focus timeline blob")
+
+        offsets = array("I")
+        offsets.frombytes(blob[BLOB_HEADER.size:BLOB_HEADER.size + 4 * count])
+        if sys.byteorder != "little":
+            offsets.byteswap()
+
+        timeline = cls()
+        timeline.offsets = array("d", (offset / 1000 for offset in offsets))
+        timeline.states.frombytes(blob[BLOB_HEADER.size + 4 * count:BLOB_HEADER.size + 5 * count])
+        return timeline, end_ms / 1000
+
+
+class FocusTracker:
+    """Turns per-frame face detections into a stable focus state.
+
+    A majority vote over the last few detections smooths out flicker, and
+    the user only counts as unfocused once no face has been seen for longer
+    than the grace period. Every state change is recorded in a
+    FocusTimeline, which the focus score is computed from.
+    """
+
+    def __init__(self, grace_period=3, buffer_size=5, clock=time.time):
+        self.grace_period = grace_period
+        self.buffer_size = buffer_size
+        self.clock = clock
+        self.reset()
+
+    def reset(self, now=None):
+        """Start a new session"""
+        if now is None:
+            now = self.clock()
+        self.focus_buffer = [False] * self.buffer_size
+        self.focus_index = 0
+        self.session_start_time = now
+        self.last_detection_time = now
+        self.stable_focused = False
+        self.state = GRACE
+        self.timeline = FocusTimeline(start=now)
+        self.timeline.record(self.state, now)
+
+    def update(self, focused, now=None):
+        """Feed one detection result and return the resulting focus state"""
+        if now is None:
+            now = self.clock()
+
+        # Update focus buffer for stabilization
+        self.focus_buffer[self.focus_index] = focused
+        self.focus_index = (self.focus_index + 1) % len(self.focus_buffer)
+
+        # Determine stable focus state (majority vote)
+        self.stable_focused = sum(self.focus_buffer) > len(self.focus_buffer) / 2
+
+        if self.stable_focused:
+            self.last_detection_time = now
+
+        # Check if person is not focused for too long
+        if self.stable_focused:
+            self.state = FOCUSED
+        elif now - self.last_detection_time > self.grace_period:
+            self.state = UNFOCUSED
+        else:
+            self.state = GRACE
+        self.timeline.record(self.state, now)
+        return self.state
+
+    def grace_remaining(self, now=None):
+        """Seconds left before an unfocused user triggers an alert"""
+        if now is None:
+            now = self.clock()
+        return max(0, self.grace_period - (now - self.last_detection_time))
+
+    def session_time(self, now=None):
+        if now is None:
+            now = self.clock()
+        return now - self.session_start_time
+
+    def focus_score(self, now=None):
+        """Percentage of the session spent focused"""
+        return self.timeline.focus_score(self.session_time(now))
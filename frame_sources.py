@@ -0,0 +1,184 @@
+"""Frame sources that feed the detection loop.
+
+Every source exposes the same read()/isOpened()/release() interface as
+cv2.VideoCapture, so the app can run on a live camera, a recorded clip, a
+folder of images or generated frames without any other changes.
+"""
+import os
+
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+
+class FrameSource:
+    """Base class for all frame sources"""
+
+    # Nominal frame rate, used to derive timestamps when replaying offline
+    fps = 30.0
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        """Return (ret, frame) like cv2.VideoCapture.read()"""
+        raise NotImplementedError
+
+    def release(self):
+        pass
+
+
+class CameraSource(FrameSource):
+    """Live webcam"""
+
+    def __init__(self, index=0):
+        self.cap = cv2.VideoCapture(index)
+        fps = self.cap.get(cv2.CAP_PROP_FPS)
+        if fps and fps > 0:
+            self.fps = fps
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self):
+        return self.cap.read()
+
+    def release(self):
+        self.cap.release()
+
+
+class VideoFileSource(FrameSource):
+    """Recorded video clip, optionally looped"""
+
+    def __init__(self, path, loop=False):
+        self.path = path
+        self.loop = loop
+        self.cap = cv2.VideoCapture(path)
+        fps = self.cap.get(cv2.CAP_PROP_FPS)
+        if fps and fps > 0:
+            self.fps = fps
+
+    def isOpened(self):
+        return self.cap.isOpened()
+
+    def read(self):
+        ret, frame = self.cap.read()
+        if not ret and self.loop:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.cap.read()
+        return ret, frame
+
+    def release(self):
+        self.cap.release()
+
+
+class ImageDirectorySource(FrameSource):
+    """Directory of still images played back in file name order"""
+
+    def __init__(self, path, fps=30.0, loop=False):
+        self.path = path
+        self.fps = fps
+        self.loop = loop
+        self.files = sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+            if name.lower().endswith(IMAGE_EXTENSIONS)
+        ) if os.path.isdir(path) else []
+        self.position = 0
+
+    def isOpened(self):
+        return len(self.files) > 0
+
+    def read(self):
+        if self.position >= len(self.files):
+            if not self.loop or not self.files:
+                return False, None
+            self.position = 0
+        frame = cv2.imread(self.files[self.position])
+        self.position += 1
+        return frame is not None, frame
+
+
+class SyntheticSource(FrameSource):
+    """Generated frames for running the detection loop without any media.
+
+    Frames are seeded noise; if a face image is given it is pasted in with a
+    small jitter while the presence schedule says the user is at the desk.
+    The schedule is a list of (seconds, present) pairs that repeats.
+    """
+
+    def __init__(self, width=640, height=480, num_frames=300, fps=30.0,
+                 face_image=None, schedule=None, seed=0):
+        self.width = width
+        self.height = height
+        self.num_frames = num_frames
+        self.fps = fps
+        self.schedule = schedule or [(10, True), (5, False)]
+        self.rng = np.random.default_rng(seed)
+        self.position = 0
+
+        self.face = None
+        if face_image:
+            self.face = cv2.imread(face_image)
+
+        # One noisy background reused for every frame keeps generation cheap
+        self.background = self.rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        self.background = cv2.GaussianBlur(self.background, (9, 9), 0)
+
+    def present_at(self, seconds):
+        """Whether the schedule says the user is present at a given time"""
+        cycle = sum(length for length, _ in self.schedule)
+        seconds = seconds % cycle if cycle > 0 else 0
+        for length, present in self.schedule:
+            if seconds < length:
+                return present
+            seconds -= length
+        return False
+
+    def read(self):
+        if self.num_frames is not None and self.position >= self.num_frames:
+            return False, None
+
+        frame = self.background.copy()
+        if self.face is not None and self.present_at(self.position / self.fps):
+            fh, fw = self.face.shape[:2]
+            fh, fw = min(fh, self.height), min(fw, self.width)
+            jitter = self.rng.integers(-4, 5, 2)
+            y = max(0, min(self.height - fh, (self.height - fh) // 2 + int(jitter[0])))
+            x = max(0, min(self.width - fw, (self.width - fw) // 2 + int(jitter[1])))
+            frame[y:y + fh, x:x + fw] = self.face[:fh, :fw]
+
+        self.position += 1
+        return True, frame
+
+
+def open_source(spec, loop=False, face_image=None):
+    """Create a frame source from a spec string.
+
+    Accepted forms: "camera:0", "video:clip.mp4", "images:folder",
+    "synthetic" or "synthetic:640x480". A bare number is a camera index, a
+    directory is an image folder and any other path is a video file. With
+    loop, clips and image folders start over at the end and synthetic
+    frames never run out; face_image is pasted into synthetic frames.
+    """
+    spec = str(spec)
+    kind, _, arg = spec.partition(":")
+
+    if kind == "camera":
+        return CameraSource(int(arg or 0))
+    if kind == "video":
+        return VideoFileSource(arg, loop=loop)
+    if kind == "images":
+        return ImageDirectorySource(arg, loop=loop)
+    if kind == "synthetic":
+        num_frames = None if loop else 300
+        if arg:
+            width, height = (int(v) for v in arg.lower().split("x"))
+            return SyntheticSource(width, height, num_frames=num_frames, face_image=face_image)
+        return SyntheticSource(num_frames=num_frames, face_image=face_image)
+
+    if spec.isdigit():
+        return CameraSource(int(spec))
+    if os.path.isdir(spec):
+        return ImageDirectorySource(spec, loop=loop)
+    return VideoFileSource(spec, loop=loop)
@@ -0,0 +1,210 @@
+"""Virtualized session history for the Stats & Badges tab"""
+import datetime
+
+# Sortable columns -> focus_sessions column. Every one of them has an index,
+# and SQLite indexes end with the rowid, so ORDER BY <column>, id is served
+# straight from the index.
+SORT_COLUMNS = {
+    "date": "start_time",
+    "duration": "duration",
+    "score": "focus_score",
+}
+
+HEADINGS = {"date": "Date", "duration": "Duration", "score": "Score"}
+
+
+def format_session_row(start_time, duration, score):
+    """Display values for one session row"""
+    # Parse the ISO timestamp
+    dt = datetime.datetime.fromisoformat(start_time)
+    date_str = dt.strftime("%Y-%m-%d %H:%M")
+
+    # Format duration
+    mins, secs = divmod(duration, 60)
+    hours, mins = divmod(mins, 60)
+    if hours > 0:
+        duration_str = f"{hours}h {mins}m"
+    else:
+        duration_str = f"{mins}m {secs}s"
+
+    return date_str, duration_str, f"{score}%"
+
+
+def fetch_page(storage, sort, descending, after=None, forward=True, limit=50):
+    """Fetch one page following (forward) or preceding a (value, id) key"""
+    column = SORT_COLUMNS[sort]
+
+    # Moving forward in display order follows the sort direction
+    descending = descending == forward
+    order = "DESC" if descending else "ASC"
+    where = ""
+    params = []
+    if after is not None:
+        where = f"WHERE ({column}, id) {'<' if descending else '>'} (?, ?)"
+        params.extend(after)
+
+    rows = storage.query(f'''
+    SELECT id, start_time, duration, focus_score, {column}
+    FROM focus_sessions
+    {where}
+    ORDER BY {column} {order}, id {order}
+    LIMIT ?
+    ''', params + [limit])
+    return rows if forward else rows[::-1]
+
+
+class SessionHistoryView:
+    """Pages focus_sessions into a Treeview as the user scrolls.
+
+    Rows are fetched with keyset pagination on (sort column, id), so every
+    page is an index range scan no matter how deep the user has scrolled,
+    and at most max_rows rows are kept in the Treeview: pages scrolled far
+    out of view are dropped and re-fetched if the user scrolls back.
+    Pages are queried on the persistence worker and applied when they
+    arrive; pages requested for an older sort order are discarded.
+    """
+
+    def __init__(self, tree, scrollbar, worker, page_size=50, max_rows=200):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.worker = worker
+        self.page_size = page_size
+        self.max_rows = max_rows
+        self.sort = "date"
+        self.descending = True
+        self.rows = []  # (sort value, id) of each materialized row, in display order
+        self.at_start = True
+        self.at_end = True
+        self.loading = False
+        self.generation = 0
+
+        self.tree.configure(yscrollcommand=self.on_scroll)
+        for column in HEADINGS:
+            self.tree.heading(column, command=lambda c=column: self.sort_by(c))
+        self.update_headings()
+
+    def sort_by(self, column):
+        """Sort by a column; clicking the current column flips the direction"""
+        if column == self.sort:
+            self.descending = not self.descending
+        else:
+            self.sort = column
+            self.descending = True
+        self.update_headings()
+        self.refresh()
+
+    def update_headings(self):
+        for column, text in HEADINGS.items():
+            if column == self.sort:
+                text += " ▼" if self.descending else " ▲"
+            self.tree.heading(column, text=text)
+
+    def request(self, after, forward, apply):
+        """Fetch a page on the persistence worker and pass it to apply on the Tk thread"""
+        self.loading = True
+        generation = self.generation
+        sort, descending, limit = self.sort, self.descending, self.page_size
+
+        def job(storage):
+            return fetch_page(storage, sort, descending, after, forward, limit)
+
+        def done(page):
+            if generation != self.generation:
+                return
+            try:
+                apply(page)
+            finally:
+                self.loading = False
+
+        def failed(error):
+            print(f"Error loading history: {error}")
+            if generation == self.generation:
+                self.loading = False
+
+        self.worker.read(job, done, failed)
+
+    def refresh(self):
+        """Reload from the top of the current sort order"""
+        self.generation += 1
+        self.request(None, True, self._show_first)
+
+    def _show_first(self, page):
+        self.tree.delete(*self.tree.get_children())
+        self.rows = []
+        self._insert(page, at_end=True)
+        self.at_start = True
+        self.at_end = len(page) < self.page_size
+        self.tree.yview_moveto(0)
+
+    def on_scroll(self, first, last):
+        """Treeview scroll callback: load more rows near either edge"""
+        self.scrollbar.set(first, last)
+        if self.loading or not self.rows:
+            return
+
+        first, last = float(first), float(last)
+        if last > 0.9 and not self.at_end:
+            self.tree.after_idle(self.load_next)
+        elif first < 0.1 and not self.at_start:
+            self.tree.after_idle(self.load_previous)
+
+    def load_next(self):
+        """Append the next page, dropping rows from the top if over the limit"""
+        if self.loading or self.at_end or not self.rows:
+            return
+        self.request(self.rows[-1], True, self._append)
+
+    def load_previous(self):
+        """Prepend the previous page, dropping rows from the bottom if over the limit"""
+        if self.loading or self.at_start or not self.rows:
+            return
+        self.request(self.rows[0], False, self._prepend)
+
+    def _append(self, page):
+        anchor = self._top_item()
+        self.at_end = len(page) < self.page_size
+        self._insert(page, at_end=True)
+
+        excess = len(self.rows) - self.max_rows
+        if excess > 0:
+            self.tree.delete(*self.tree.get_children()[:excess])
+            del self.rows[:excess]
+            self.at_start = False
+        self._restore(anchor)
+
+    def _prepend(self, page):
+        anchor = self._top_item()
+        self.at_start = len(page) < self.page_size
+        self._insert(page, at_end=False)
+
+        excess = len(self.rows) - self.max_rows
+        if excess > 0:
+            self.tree.delete(*self.tree.get_children()[-excess:])
+            del self.rows[-excess:]
+            self.at_end = False
+        self._restore(anchor)
+
+    def _insert(self, page, at_end):
+        keys = []
+        for index, (session_id, start_time, duration, score, sort_value) in enumerate(page):
+            position = "end" if at_end else index
+            self.tree.insert("", position, iid=str(session_id),
+                             values=format_session_row(start_time, duration, score))
+            keys.append((sort_value, session_id))
+        if at_end:
+            self.rows.extend(keys)
+        else:
+            self.rows[:0] = keys
+
+    def _top_item(self):
+        children = self.tree.get_children()
+        if not children:
+            return None
+        index = int(round(self.tree.yview()[0] * len(children)))
+        return children[min(index, len(children) - 1)]
+
+    def _restore(self, anchor):
+        # Keep the row that was at the top of the view in place
+        children = self.tree.get_children()
+        if anchor and self.tree.exists(anchor) and children:
+            self.tree.yview_moveto(self.tree.index(anchor) / len(children))
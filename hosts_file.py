@@ -0,0 +1,184 @@
+"""Managed FocusBuddy section of the system hosts file"""
+import os
+import platform
+import tempfile
+
+START_MARKER = "# FOCUSBuddy Start"
+END_MARKER = "# FOCUSBuddy End"
+
+
+def system_hosts_path():
+    """Hosts file location for this OS"""
+    if platform.system() == "Windows":
+        return r"C:\Windows\System32\drivers\etc\hosts"
+    return "/etc/hosts"
+
+
+def expand_sites(sites):
+    """Host names to block for a list of sites: each site and its www. name, without duplicates"""
+    seen = set()
+    for site in sites:
+        for name in (site,) if site.startswith("www.") else (site, f"www.{site}"):
+            if name not in seen:
+                seen.add(name)
+                yield name
+
+
+def render_section(names, address="127.0.0.1", newline="\n"):
+    """The whole managed section, markers included, as one string"""
+    lines = [START_MARKER]
+    lines.extend(f"{address} {name}" for name in names)
+    lines.append(END_MARKER)
+    return newline.join(lines) + newline
+
+
+class HostsFile:
+    """Reads and rewrites the FocusBuddy section of a hosts file.
+
+    The file is streamed line by line; only the managed section is held in
+    memory. Nothing is written when the section already has the wanted
+    content. Otherwise the new file is written to a temporary file next to
+    it and moved over the original with os.replace, so a crash leaves
+    either the old or the new file, never a partial one. Where the hosts
+    file cannot be replaced (e.g. a bind mount in a container) it is
+    rewritten in place instead.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or system_hosts_path()
+
+    def writable(self):
+        return os.access(self.path, os.W_OK)
+
+    def lines(self):
+        """The file's lines with their endings; nothing if it doesn't exist"""
+        try:
+            f = open(self.path, "r", newline="")
+        except FileNotFoundError:
+            return
+        with f:
+            yield from f
+
+    def newline(self):
+        """Line ending used by the file (the platform's for an empty file)"""
+        first = next(self.lines(), "")
+        if first.endswith("\r\n"):
+            return "\r\n"
+        if first.endswith("\n"):
+            return "\n"
+        return os.linesep
+
+    def read_section(self):
+        """Current managed section text, markers included, or None"""
+        section = []
+        inside = False
+        found = False
+        for line in self.lines():
+            marker = line.strip()
+            if not inside and marker == START_MARKER:
+                inside = True
+            if inside:
+                section.append(line)
+                if marker == END_MARKER:
+                    inside = False
+                    found = True
+        # An unterminated section is not ours to manage
+        return "".join(section) if found and not inside else None
+
+    def apply(self, sites, address="127.0.0.1"):
+        """Block sites; returns whether the file was written"""
+        return self.apply_names(expand_sites(sites), address)
+
+    def apply_names(self, names, address="127.0.0.1"):
+        """Block exactly these host names; returns whether the file was written"""
+        return self.write_section(render_section(names, address, self.newline()))
+
+    def clear(self):
+        """Remove the managed section; returns whether the file was written"""
+        if self.read_section() is None:
+            return False
+        return self.write_section(None)
+
+    def write_section(self, section):
+        """Replace the managed section with section (None removes it)"""
+        current = self.read_section()
+        if current == section:
+            return False
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        try:
+            fd, temp_path = tempfile.mkstemp(prefix=".hosts-", dir=directory)
+        except OSError:
+            self.rewrite_in_place(section, current is not None)
+            return True
+
+        try:
+            with os.fdopen(fd, "w", newline="") as out:
+                self.copy_with_section(out, section, current is not None)
+                out.flush()
+                os.fsync(out.fileno())
+            self.copy_metadata(temp_path)
+            try:
+                os.replace(temp_path, self.path)
+            except OSError:
+                # The hosts file itself can't be swapped; fall back to rewriting it
+                os.unlink(temp_path)
+                self.rewrite_in_place(section, current is not None)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.unlink(temp_path)
+            raise
+        return True
+
+    def copy_with_section(self, out, section, replace):
+        """Stream the file into out, swapping in the new section"""
+        inside = False
+        written = False
+        last = ""
+        for line in self.lines():
+            marker = line.strip()
+            if replace and not inside and marker == START_MARKER:
+                inside = True
+                if section is not None and not written:
+                    out.write(section)
+                    written = True
+                continue
+            if inside:
+                if marker == END_MARKER:
+                    inside = False
+                continue
+            out.write(line)
+            last = line
+
+        if section is not None and not written:
+            # Append on a fresh line, after one blank separator line
+            newline = "\r\n" if section.endswith("\r\n") else "\n"
+            if last and not last.endswith("\n"):
+                out.write(newline)
+            if last.strip():
+                out.write(newline)
+            out.write(section)
+
+    def rewrite_in_place(self, section, replace):
+        with tempfile.TemporaryFile("w+", newline="") as buffer:
+            self.copy_with_section(buffer, section, replace)
+            buffer.seek(0)
+            with open(self.path, "w", newline="") as f:
+                for chunk in iter(lambda: buffer.read(1 << 16), ""):
+                    f.write(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def copy_metadata(self, temp_path):
+        """Give the new file the original's permissions and owner"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            os.chmod(temp_path, 0o644)
+            return
+        os.chmod(temp_path, stat.st_mode & 0o7777)
+        if hasattr(os, "chown"):
+            try:
+                os.chown(temp_path, stat.st_uid, stat.st_gid)
+            except PermissionError:
+                pass
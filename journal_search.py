@@ -0,0 +1,185 @@
+"""Full-text search over session journals.
+
+Journals are indexed by an FTS5 table, journal_fts, that uses
+focus_sessions as its external content: it stores only the index, and
+triggers on focus_sessions keep it in step as journals are written, edited
+or deleted. Results are ranked with bm25 (among the newest matches, see
+RANKED_WINDOW) and come with a snippet around the matches. On SQLite
+builds without FTS5 the search falls back to a (slow) LIKE scan. Examples:
+
+    python journal_search.py --rebuild
+    python journal_search.py "deadline stress"
+"""
+import argparse
+import os
+import re
+import sqlite3
+import sys
+
+SNIPPET_START = "«"
+SNIPPET_END = "»"
+
+# bm25 scores every matching journal, so a very common word would cost time
+# in proportion to the whole history. Only the newest RANKED_WINDOW matches
+# are ranked, which keeps any search to a few tens of milliseconds.
+RANKED_WINDOW = 5000
+
+
+def fts5_available(storage):
+    """Whether this SQLite build can create FTS5 tables"""
+    try:
+        storage.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(x)")
+        storage.execute("DROP TABLE temp.fts5_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def has_index(storage):
+    return storage.scalar(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = 'journal_fts'") > 0
+
+
+def create_index(storage):
+    """Create the journal index and its triggers, and index existing journals"""
+    with storage.transaction():
+        storage.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS journal_fts USING fts5(
+            journal_text,
+            content='focus_sessions',
+            content_rowid='id',
+            tokenize='porter unicode61'
+        )
+        ''')
+        storage.execute('''
+        CREATE TRIGGER IF NOT EXISTS journal_fts_insert AFTER INSERT ON focus_sessions BEGIN
+            INSERT INTO journal_fts (rowid, journal_text) VALUES (new.id, new.journal_text);
+        END
+        ''')
+        storage.execute('''
+        CREATE TRIGGER IF NOT EXISTS journal_fts_delete AFTER DELETE ON focus_sessions BEGIN
+            INSERT INTO journal_fts (journal_fts, rowid, journal_text) VALUES ('delete', old.id, old.journal_text);
+        END
+        ''')
+        storage.execute('''
+        CREATE TRIGGER IF NOT EXISTS journal_fts_update AFTER UPDATE OF journal_text ON focus_sessions BEGIN
+            INSERT INTO journal_fts (journal_fts, rowid, journal_text) VALUES ('delete', old.id, old.journal_text);
+            INSERT INTO journal_fts (rowid, journal_text) VALUES (new.id, new.journal_text);
+        END
+        ''')
+        storage.execute("INSERT INTO journal_fts (journal_fts) VALUES ('rebuild')")
+
+
+def rebuild_index(storage):
+    """Re-index every journal from scratch (creating the index if needed) and merge its segments"""
+    if not has_index(storage):
+        create_index(storage)
+    else:
+        with storage.transaction():
+            storage.execute("INSERT INTO journal_fts (journal_fts) VALUES ('rebuild')")
+    storage.execute("INSERT INTO journal_fts (journal_fts) VALUES ('optimize')")
+
+
+def search_terms(text):
+    """Words of a search string, lowercased"""
+    return re.findall(r"\w+", text.lower())
+
+
+def match_expression(text):
+    """FTS5 query for a user's search string, or None if it has no words.
+
+    Every word must appear; each is quoted so punctuation or FTS keywords
+    in the input can't break the query, and the last one matches as a
+    prefix so results follow the user's typing. Prefixes shorter than
+    three letters match too many words to be worth it.
+    """
+    terms = search_terms(text)
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    if len(terms[-1]) >= 3:
+        quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def search(storage, text, limit=50):
+    """Best matching journals as (session id, start_time, snippet) rows"""
+    expression = match_expression(text)
+    if expression is None:
+        return recent(storage, limit)
+
+    if has_index(storage):
+        # Walking matches in rowid order without scoring them is cheap
+        oldest = storage.scalar('''
+        SELECT rowid FROM journal_fts WHERE journal_fts MATCH ?
+        ORDER BY rowid DESC LIMIT 1 OFFSET ?
+        ''', (expression, RANKED_WINDOW)) or 0
+        return storage.query(f'''
+        SELECT s.id, s.start_time,
+               snippet(journal_fts, 0, '{SNIPPET_START}', '{SNIPPET_END}', '…', 12)
+        FROM journal_fts
+        JOIN focus_sessions s ON s.id = journal_fts.rowid
+        WHERE journal_fts MATCH ? AND journal_fts.rowid > ?
+        ORDER BY rank
+        LIMIT ?
+        ''', (expression, oldest, limit))
+
+    # No FTS5 in this SQLite build: scan, newest first
+    terms = search_terms(text)
+    where = " AND ".join("journal_text LIKE ?" for _ in terms)
+    return storage.query(f'''
+    SELECT id, start_time, substr(journal_text, 1, 80)
+    FROM focus_sessions
+    WHERE {where}
+    ORDER BY start_time DESC
+    LIMIT ?
+    ''', [f"%{term}%" for term in terms] + [limit])
+
+
+def recent(storage, limit=50):
+    """Newest journals as (session id, start_time, beginning of the text) rows"""
+    return storage.query('''
+    SELECT id, start_time, substr(journal_text, 1, 80)
+    FROM focus_sessions
+    WHERE journal_text IS NOT NULL AND journal_text != ''
+    ORDER BY start_time DESC
+    LIMIT ?
+    ''', (limit,))
+
+
+def journal_text(storage, session_id):
+    return storage.scalar("SELECT journal_text FROM focus_sessions WHERE id = ?", (session_id,))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search FocusBuddy session journals")
+    parser.add_argument("query", nargs="?", help="words to search for")
+    parser.add_argument("--db", default=os.path.join(os.path.expanduser("~"), ".focusbuddy", "focusbuddy.db"),
+                        help="path to focusbuddy.db")
+    parser.add_argument("--rebuild", action="store_true", help="rebuild the search index")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    from storage import Storage
+    from migrations import migrate
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.db)), exist_ok=True)
+    storage = Storage(args.db)
+    try:
+        migrate(storage)
+        if args.rebuild:
+            if not fts5_available(storage):
+                print("Error: this SQLite build has no FTS5", file=sys.stderr)
+                return 1
+            rebuild_index(storage)
+            print("Journal search index rebuilt")
+        if args.query:
+            for session_id, start_time, snippet in search(storage, args.query, args.limit):
+                print(f"{start_time[:16].replace('T', ' ')}  {snippet}")
+    finally:
+        storage.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
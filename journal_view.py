@@ -0,0 +1,93 @@
+"""Journal browser for the Journals tab"""
+import datetime
+import tkinter as tk
+
+import journal_search
+
+SEARCH_DELAY_MS = 250
+
+
+class JournalBrowser:
+    """Searches journals as the user types and shows the selected one.
+
+    Searches run on the persistence worker a moment after the last
+    keystroke; results for an outdated search string are discarded. With an
+    empty search string the newest journals are listed.
+    """
+
+    def __init__(self, search_var, tree, text, worker, limit=100):
+        self.search_var = search_var
+        self.tree = tree
+        self.text = text
+        self.worker = worker
+        self.limit = limit
+        self.pending = None
+        self.generation = 0
+        self.terms = []
+
+        self.text.tag_configure("match", background="#f9e79f")
+        self.search_var.trace_add("write", lambda *args: self.schedule())
+        self.tree.bind("<<TreeviewSelect>>", self.on_select)
+
+    def schedule(self):
+        """Search once the user pauses typing"""
+        if self.pending is not None:
+            self.tree.after_cancel(self.pending)
+        self.pending = self.tree.after(SEARCH_DELAY_MS, self.refresh)
+
+    def refresh(self):
+        """Run the current search"""
+        self.pending = None
+        self.generation += 1
+        generation = self.generation
+        query = self.search_var.get()
+        limit = self.limit
+
+        def done(rows):
+            if generation == self.generation:
+                self.terms = journal_search.search_terms(query)
+                self.show_results(rows)
+
+        self.worker.read(lambda storage: journal_search.search(storage, query, limit), done,
+                         lambda e: print(f"Error searching journals: {e}"))
+
+    def show_results(self, rows):
+        self.tree.delete(*self.tree.get_children())
+        for session_id, start_time, snippet in rows:
+            date_str = datetime.datetime.fromisoformat(start_time).strftime("%Y-%m-%d %H:%M")
+            self.tree.insert("", "end", iid=str(session_id),
+                             values=(date_str, " ".join(snippet.split())))
+        self.show_text("" if rows else "No journals found.")
+
+    def on_select(self, event=None):
+        """Load the full journal of the selected session"""
+        selection = self.tree.selection()
+        if not selection:
+            return
+        session_id = int(selection[0])
+        generation = self.generation
+
+        def done(journal):
+            if generation == self.generation and self.tree.selection() == selection:
+                self.show_text(journal or "")
+
+        self.worker.read(lambda storage: journal_search.journal_text(storage, session_id), done,
+                         lambda e: print(f"Error loading journal: {e}"))
+
+    def show_text(self, journal):
+        """Show a journal with the search words highlighted"""
+        self.text.config(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+        self.text.insert("1.0", journal)
+        for term in self.terms:
+            start = "1.0"
+            while True:
+                count = tk.IntVar()
+                start = self.text.search(r"\m" + term + r"\w*", start, stopindex=tk.END,
+                                         nocase=True, regexp=True, count=count)
+                if not start or count.get() == 0:
+                    break
+                end = f"{start}+{count.get()}c"
+                self.text.tag_add("match", start, end)
+                start = end
+        self.text.config(state=tk.DISABLED)
@@ -0,0 +1,180 @@
+"""Schema migrations for focusbuddy.db, keyed on PRAGMA user_version.
+
+Each migration upgrades the schema by one version and runs in its own
+transaction together with the user_version bump, so an interrupted upgrade
+resumes where it stopped. Migrations must also cope with databases that
+already have some of their changes (older builds applied a few of them
+ad hoc, before versioning existed).
+"""
+import journal_search
+import queries
+
+
+def _column_names(storage, table):
+    return [row[1] for row in storage.query(f"PRAGMA table_info({table})")]
+
+
+def _table_exists(storage, name):
+    return storage.scalar(
+        "SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)) > 0
+
+
+def create_base_schema(storage):
+    """Version 1: the original sessions and badges tables"""
+    storage.execute('''
+    CREATE TABLE IF NOT EXISTS focus_sessions (
+        id INTEGER PRIMARY KEY,
+        start_time TEXT,
+        duration INTEGER,
+        focus_score REAL,
+        hardcore_mode INTEGER,
+        journal_text TEXT
+    )
+    ''')
+    storage.execute('''
+    CREATE TABLE IF NOT EXISTS earned_badges (
+        id INTEGER PRIMARY KEY,
+        badge_id TEXT,
+        earn_date TEXT
+    )
+    ''')
+
+
+def add_session_timeline(storage):
+    """Version 2: run-length-encoded focus timeline per session"""
+    if "timeline" not in _column_names(storage, "focus_sessions"):
+        storage.execute("ALTER TABLE focus_sessions ADD COLUMN timeline BLOB")
+
+
+def add_daily_rollup(storage):
+    """Version 3: per-day totals, backfilled from existing sessions"""
+    if _table_exists(storage, "daily_rollup"):
+        return
+    storage.execute('''
+    CREATE TABLE daily_rollup (
+        day TEXT PRIMARY KEY,
+        session_count INTEGER NOT NULL DEFAULT 0,
+        total_duration INTEGER NOT NULL DEFAULT 0,
+        score_sum REAL NOT NULL DEFAULT 0,
+        weighted_score_sum REAL NOT NULL DEFAULT 0,
+        hardcore_count INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+    storage.execute('''
+    INSERT INTO daily_rollup (day, session_count, total_duration, score_sum,
+                              weighted_score_sum, hardcore_count)
+    SELECT substr(start_time, 1, 10), COUNT(*), SUM(duration), SUM(focus_score),
+           SUM(focus_score * duration), SUM(hardcore_mode)
+    FROM focus_sessions
+    GROUP BY substr(start_time, 1, 10)
+    ''')
+
+
+def add_day_column_and_indexes(storage):
+    """Version 4: stored local day per session and the basic indexes"""
+    if "day" not in _column_names(storage, "focus_sessions"):
+        storage.execute("ALTER TABLE focus_sessions ADD COLUMN day TEXT")
+    storage.execute("UPDATE focus_sessions SET day = substr(start_time, 1, 10) WHERE day IS NULL")
+    storage.execute("CREATE INDEX IF NOT EXISTS idx_sessions_start_time ON focus_sessions(start_time)")
+    storage.execute("CREATE INDEX IF NOT EXISTS idx_sessions_day ON focus_sessions(day)")
+    storage.execute("CREATE INDEX IF NOT EXISTS idx_badges_badge_id ON earned_badges(badge_id)")
+
+
+def add_history_sort_indexes(storage):
+    """Version 5: indexes for sorting the history by score or duration"""
+    storage.execute("CREATE INDEX IF NOT EXISTS idx_sessions_score ON focus_sessions(focus_score)")
+    storage.execute("CREATE INDEX IF NOT EXISTS idx_sessions_duration ON focus_sessions(duration)")
+
+
+def add_badge_aggregates(storage):
+    """Version 6: running aggregates for the badge rules engine.
+
+    Starts without a rules signature, so the engine replays the history
+    once to fill it in.
+    """
+    storage.execute('''
+    CREATE TABLE IF NOT EXISTS badge_aggregates (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        last_day TEXT,
+        day_sessions INTEGER NOT NULL DEFAULT 0,
+        streak INTEGER NOT NULL DEFAULT 0,
+        journal_count INTEGER NOT NULL DEFAULT 0,
+        rules_signature TEXT
+    )
+    ''')
+
+
+def add_natural_keys(storage):
+    """Version 7: unique natural keys, so imports can skip rows that exist.
+
+    Sessions are keyed on start_time and duration, badges on badge_id.
+    Duplicates (which nothing should have produced) are dropped first: of
+    sessions with the same start and length the one with a journal is kept,
+    otherwise the oldest row. How many rows went is printed.
+    """
+    removed = storage.execute('''
+    DELETE FROM focus_sessions
+    WHERE id IN (
+        SELECT id FROM (
+            SELECT id, ROW_NUMBER() OVER (
+                PARTITION BY start_time, duration
+                ORDER BY COALESCE(journal_text, '') = '', id
+            ) AS copy
+            FROM focus_sessions
+            WHERE start_time IS NOT NULL
+        )
+        WHERE copy > 1
+    )
+    ''').rowcount
+    removed_badges = storage.execute('''
+    DELETE FROM earned_badges
+    WHERE id NOT IN (SELECT MIN(id) FROM earned_badges GROUP BY badge_id)
+    ''').rowcount
+    if removed:
+        queries.rebuild_daily_rollup(storage)
+    if removed or removed_badges:
+        print(f"Schema upgrade: removed {removed} duplicate sessions and {removed_badges} duplicate badges")
+
+    storage.execute("DROP INDEX IF EXISTS idx_sessions_start_time")
+    storage.execute("CREATE UNIQUE INDEX idx_sessions_start_time ON focus_sessions(start_time, duration)")
+    storage.execute("DROP INDEX IF EXISTS idx_badges_badge_id")
+    storage.execute("CREATE UNIQUE INDEX idx_badges_badge_id ON earned_badges(badge_id)")
+
+
+def add_journal_search(storage):
+    """Version 8: FTS5 index over session journals, where SQLite has FTS5.
+
+    Without FTS5 the search falls back to LIKE; journal_search.py --rebuild
+    creates the index later on a build that has it.
+    """
+    if journal_search.fts5_available(storage):
+        journal_search.create_index(storage)
+
+
+# Position in this list + 1 is the schema version a migration produces.
+# Only ever append to it.
+MIGRATIONS = [
+    create_base_schema,
+    add_session_timeline,
+    add_daily_rollup,
+    add_day_column_and_indexes,
+    add_history_sort_indexes,
+    add_badge_aggregates,
+    add_natural_keys,
+    add_journal_search,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def migrate(storage):
+    """Upgrade the database in place to SCHEMA_VERSION; returns the version"""
+    version = storage.scalar("PRAGMA user_version")
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(f"Database schema version {version} is newer than this app supports ({SCHEMA_VERSION})")
+
+    for number in range(version + 1, SCHEMA_VERSION + 1):
+        with storage.transaction():
+            MIGRATIONS[number - 1](storage)
+            storage.execute(f"PRAGMA user_version = {number}")
+    return SCHEMA_VERSION
@@ -0,0 +1,142 @@
+"""Background database worker, so the Tk thread never waits on SQLite"""
+import atexit
+import queue
+import threading
+
+
+class PersistenceWorker:
+    """Runs every database job on one dedicated thread.
+
+    Jobs are callables taking the Storage. They are queued with read() or
+    write() and run in submission order; consecutive writes that are queued
+    together share one transaction (each inside its own savepoint, so a
+    failing job does not undo the others). Results are handed to the
+    callbacks on the Tk thread through root.after, only once the writes
+    they depend on are committed.
+
+    close() drains the queue and commits before closing the connection, and
+    is also registered with atexit so queued writes survive an unclean exit.
+    Without a root, callbacks run on the worker thread (headless use).
+    """
+
+    def __init__(self, open_storage, root=None, max_batch=64):
+        self.open_storage = open_storage
+        self.root = root
+        self.max_batch = max_batch
+        self.storage = None
+        self.requests = queue.Queue()
+        self.closed = False
+        self.lock = threading.Lock()
+
+        self.thread = threading.Thread(target=self.run, name="persistence")
+        self.thread.daemon = True
+        self.thread.start()
+        atexit.register(self.close)
+
+    def read(self, job, callback=None, errback=None):
+        """Queue a job that only reads"""
+        self.submit(job, callback, errback, write=False)
+
+    def write(self, job, callback=None, errback=None):
+        """Queue a job that modifies the database"""
+        self.submit(job, callback, errback, write=True)
+
+    def submit(self, job, callback=None, errback=None, write=False):
+        with self.lock:
+            if self.closed:
+                raise RuntimeError("persistence worker is closed")
+            self.requests.put((job, callback, errback, write))
+
+    def run(self):
+        try:
+            self.storage = self.open_storage()
+        except Exception as e:
+            print(f"Error opening database: {e}")
+
+        stop = False
+        while not stop:
+            request = self.requests.get()
+            if request is None:
+                break
+
+            # Take whatever else is already waiting, up to max_batch
+            batch = [request]
+            while len(batch) < self.max_batch:
+                try:
+                    request = self.requests.get_nowait()
+                except queue.Empty:
+                    break
+                if request is None:
+                    stop = True
+                    break
+                batch.append(request)
+            self.process(batch)
+
+        if self.storage is not None:
+            self.storage.close()
+
+    def process(self, batch):
+        """Run a batch in order, grouping consecutive writes into one transaction"""
+        writes = []
+        for request in batch:
+            if request[3]:
+                writes.append(request)
+                continue
+            self.run_writes(writes)
+            writes = []
+            self.deliver(request, *self.run_job(request[0]))
+        self.run_writes(writes)
+
+    def run_writes(self, writes):
+        if not writes:
+            return
+        outcomes = []
+        try:
+            with self.storage.transaction():
+                for request in writes:
+                    outcomes.append(self.run_job(request[0], savepoint=True))
+        except Exception as e:
+            # The commit itself failed, so none of the results stand
+            outcomes = [(None, e)] * len(writes)
+        for request, outcome in zip(writes, outcomes):
+            self.deliver(request, *outcome)
+
+    def run_job(self, job, savepoint=False):
+        if self.storage is None:
+            return None, RuntimeError("database is not available")
+        try:
+            if savepoint:
+                with self.storage.transaction():
+                    return job(self.storage), None
+            return job(self.storage), None
+        except Exception as e:
+            return None, e
+
+    def deliver(self, request, result, error):
+        job, callback, errback, write = request
+        if error is not None:
+            if errback is None:
+                print(f"Error in database job {getattr(job, '__name__', job)}: {error}")
+                return
+            callback, result = errback, error
+        if callback is None:
+            return
+        if self.root is None:
+            callback(result)
+            return
+        if self.closed:
+            # The window is going away; the data is saved regardless
+            return
+        try:
+            self.root.after(0, callback, result)
+        except Exception as e:
+            print(f"Error delivering database result: {e}")
+
+    def close(self, timeout=10):
+        """Finish all queued jobs, commit and close the database"""
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.requests.put(None)
+        self.thread.join(timeout)
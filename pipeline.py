@@ -0,0 +1,99 @@
+"""Building blocks for the capture -> detect -> render video pipeline"""
+import threading
+import time
+from collections import deque
+
+
+class LatestFrameQueue:
+    """Bounded hand-off queue between two pipeline stages.
+
+    When the queue is full the oldest item is dropped, so a slow consumer
+    always sees the newest frame instead of working through a backlog.
+    """
+
+    def __init__(self, maxsize=1):
+        self.maxsize = maxsize
+        self.items = deque()
+        self.dropped = 0
+        self.closed = False
+        self.cond = threading.Condition()
+
+    def put(self, item):
+        """Add an item, discarding the stalest one if the queue is full"""
+        with self.cond:
+            while len(self.items) >= self.maxsize:
+                self.items.popleft()
+                self.dropped += 1
+            self.items.append(item)
+            self.cond.notify()
+
+    def get(self, timeout=None):
+        """Wait for the next item; returns None on timeout or when closed"""
+        with self.cond:
+            if not self.items and not self.closed:
+                self.cond.wait(timeout)
+            if not self.items:
+                return None
+            return self.items.popleft()
+
+    def get_nowait(self):
+        """Return the next item without blocking, or None if empty"""
+        with self.cond:
+            if not self.items:
+                return None
+            return self.items.popleft()
+
+    def close(self):
+        """Wake up any waiting consumer and stop handing out new items"""
+        with self.cond:
+            self.closed = True
+            self.items.clear()
+            self.cond.notify_all()
+
+
+class StageStats:
+    """Rolling throughput and latency counter for one pipeline stage"""
+
+    def __init__(self, name, window=2.0):
+        self.name = name
+        self.window = window
+        self.stamps = deque()
+        self.total = 0
+        self.latency = 0.0
+        self.lock = threading.Lock()
+
+    def tick(self, latency=None):
+        """Record one processed item, optionally with its age in seconds"""
+        now = time.time()
+        with self.lock:
+            self.stamps.append(now)
+            self.total += 1
+            if latency is not None:
+                # Exponential moving average keeps the display steady
+                self.latency = latency if self.total == 1 else self.latency * 0.9 + latency * 0.1
+            self._trim(now)
+
+    def fps(self):
+        """Items per second over the rolling window"""
+        now = time.time()
+        with self.lock:
+            self._trim(now)
+            if len(self.stamps) < 2:
+                return 0.0
+            span = now - self.stamps[0]
+            return len(self.stamps) / span if span > 0 else 0.0
+
+    def _trim(self, now):
+        while self.stamps and now - self.stamps[0] > self.window:
+            self.stamps.popleft()
+
+
+def format_stage_stats(stats):
+    """Build a one-line summary like 'Capture 30.0 fps | Detect 14.8 fps (42 ms)'"""
+    parts = []
+    for stage in stats:
+        text = f"{stage.name} {stage.fps():.1f} fps"
+        if stage.latency:
+            text += f" ({stage.latency * 1000:.0f} ms)"
+        parts.append(text)
+    return " | ".join(parts)
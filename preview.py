@@ -0,0 +1,42 @@
+"""Camera preview rendering for the Focus Monitor tab"""
+import time
+
+import cv2
+import numpy as np
+from PIL import Image, ImageTk
+
+
+class PreviewRenderer:
+    """Draws frames into a single, reused Tk PhotoImage.
+
+    The frame is resized and colour-converted by OpenCV into preallocated
+    buffers. The RGBA buffer is shared with a PIL image (RGBA is one of the
+    modes PIL can wrap without copying), which is pasted into the same
+    PhotoImage every time, so rendering allocates nothing per frame.
+    """
+
+    def __init__(self, label, width, height, max_fps=15):
+        self.label = label
+        self.width = width
+        self.height = height
+        self.max_fps = max_fps
+        self.last_render = 0.0
+
+        self.resized = np.empty((height, width, 3), dtype=np.uint8)
+        self.rgba = np.empty((height, width, 4), dtype=np.uint8)
+        self.image = Image.frombuffer("RGBA", (width, height), self.rgba, "raw", "RGBA", 0, 1)
+        self.photo = ImageTk.PhotoImage("RGBA", (width, height))
+
+        self.label.imgtk = self.photo
+        self.label.config(image=self.photo)
+
+    def due(self):
+        """Whether enough time has passed since the last rendered frame"""
+        return self.max_fps <= 0 or time.time() - self.last_render >= 1.0 / self.max_fps
+
+    def render(self, frame):
+        """Show a BGR frame in the preview"""
+        cv2.resize(frame, (self.width, self.height), dst=self.resized, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self.resized, cv2.COLOR_BGR2RGBA, dst=self.rgba)
+        self.photo.paste(self.image)
+        self.last_render = time.time()
@@ -0,0 +1,250 @@
+"""Watches for distracting apps starting and stopping.
+
+On Linux the process list comes from /proc: each scan lists the PID
+directories and only reads comm/cmdline/stat for PIDs it hasn't seen
+before (plus the start time of the watched apps' processes, to notice a
+reused PID), so the cost follows process churn, not the number of
+processes. Windows
+falls back to tasklist and other systems to ps; both list everything each
+time but are diffed the same way. Events are per app, not per process: a
+browser with thirty helper processes starts once and stops when the last
+one exits. Example:
+
+    python process_watcher.py firefox chrome "discord*" --interval 1
+"""
+import argparse
+import csv
+import fnmatch
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+
+DEFAULT_APPS = ["chrome", "chromium", "firefox", "msedge", "opera", "brave", "iexplore",
+                "discord", "steam", "slack", "spotify", "telegram"]
+
+
+def normalize_name(name):
+    """Executable name as matched: lowercase, without a .exe suffix"""
+    name = name.strip().lower()
+    return name[:-4] if name.endswith(".exe") else name
+
+
+def compile_matcher(apps):
+    """One regex for a list of app names (shell-style wildcards allowed); returns its match function"""
+    patterns = [fnmatch.translate(normalize_name(app)) for app in apps if app.strip()]
+    if not patterns:
+        return lambda name: None
+    return re.compile("|".join(f"(?:{pattern})" for pattern in patterns)).match
+
+
+class ProcScanner:
+    """Linux process list from /proc (or a fake tree laid out the same way).
+
+    A new PID's names are read once, along with its start time. The PIDs
+    passed as verify (the watched apps' processes, usually a handful) have
+    their start time read again on every scan: a different one means the
+    process exited and a new one got its PID between two scans.
+    """
+
+    def __init__(self, proc_root="/proc"):
+        self.proc_root = proc_root
+        self.known = {}  # pid -> candidate names
+        self.start_times = {}  # pid -> start time, in clock ticks since boot
+
+    def scan(self, verify=()):
+        """({pid: names} started, {pid: names} exited) since the last scan"""
+        pids = {int(entry) for entry in os.listdir(self.proc_root) if entry.isdigit()}
+        gone = self.known.keys() - pids
+        gone.update(pid for pid in verify
+                    if pid in self.known and pid not in gone
+                    and self.read_start_time(pid) != self.start_times[pid])
+        exited = {}
+        for pid in gone:
+            exited[pid] = self.known.pop(pid)
+            del self.start_times[pid]
+        started = {}
+        for pid in pids - self.known.keys():
+            start_time = self.read_start_time(pid)
+            names = self.read_names(pid)
+            if names is not None:
+                self.known[pid] = started[pid] = names
+                self.start_times[pid] = start_time
+        return started, exited
+
+    def read_start_time(self, pid):
+        """Field 22 of /proc/<pid>/stat, or None if it can't be read"""
+        try:
+            with open(os.path.join(self.proc_root, str(pid), "stat"), "rb") as f:
+                stat = f.read()
+        except OSError:
+            return None
+        # The command name (field 2) is in parentheses and may contain
+        # spaces or parentheses itself; the fields after it are plain
+        fields = stat.rpartition(b")")[2].split()
+        return int(fields[19]) if len(fields) > 19 and fields[19].isdigit() else None
+
+    def read_names(self, pid):
+        """Names a process goes by: the executable from its command line and its
+        comm (which the kernel cuts to 15 characters); None if it already exited"""
+        directory = os.path.join(self.proc_root, str(pid))
+        try:
+            with open(os.path.join(directory, "comm"), "rb") as f:
+                comm = f.read().decode("utf-8", "replace").strip()
+        except FileNotFoundError:
+            return None
+        except OSError:
+            comm = ""
+        try:
+            with open(os.path.join(directory, "cmdline"), "rb") as f:
+                argv0 = f.read(4096).split(b"\0", 1)[0].decode("utf-8", "replace")
+        except OSError:
+            # Gone, or not ours to read; the comm is usually enough
+            argv0 = ""
+        # Some programs rewrite their command line into one space-separated string
+        executable = os.path.basename(argv0.split(" ", 1)[0]) if argv0 else ""
+        return (executable, comm) if executable and executable != comm else (comm,)
+
+
+class ListingScanner:
+    """Process list from a command that prints every process; diffed against the last one.
+
+    Every process comes with its names each time, so a PID that now goes
+    by other names was reused and counts as an exit and a start.
+    """
+
+    def __init__(self):
+        self.known = {}
+
+    def scan(self, verify=()):
+        current = self.listing()
+        exited = {pid: self.known.pop(pid) for pid, names in list(self.known.items())
+                  if current.get(pid) != names}
+        started = {pid: names for pid, names in current.items() if pid not in self.known}
+        self.known.update(started)
+        return started, exited
+
+    def listing(self):
+        raise NotImplementedError
+
+
+class TasklistScanner(ListingScanner):
+    """Windows process list from tasklist (run directly, without a shell)"""
+
+    def listing(self):
+        output = subprocess.run(["tasklist", "/fo", "csv", "/nh"], capture_output=True, text=True,
+                                check=True, creationflags=getattr(subprocess, "CREATE_NO_WINDOW", 0)).stdout
+        processes = {}
+        for row in csv.reader(output.splitlines()):
+            if len(row) >= 2 and row[1].isdigit():
+                processes[int(row[1])] = (row[0],)
+        return processes
+
+
+class PsScanner(ListingScanner):
+    """Process list from ps, for systems without /proc (e.g. macOS)"""
+
+    def listing(self):
+        output = subprocess.run(["ps", "-axo", "pid=,comm="], capture_output=True, text=True,
+                                check=True).stdout
+        processes = {}
+        for line in output.splitlines():
+            pid, _, command = line.strip().partition(" ")
+            if pid.isdigit():
+                processes[int(pid)] = (os.path.basename(command.strip()),)
+        return processes
+
+
+def default_scanner():
+    if platform.system() == "Windows":
+        return TasklistScanner()
+    if os.path.isdir("/proc/self"):
+        return ProcScanner()
+    return PsScanner()
+
+
+class ProcessWatcher:
+    """Turns process scans into ("start", app) and ("stop", app) events"""
+
+    def __init__(self, apps=DEFAULT_APPS, scanner=None):
+        self.scanner = scanner or default_scanner()
+        self.running = {}  # pid -> app
+        self.counts = {}  # app -> number of its processes running
+        self.set_apps(apps)
+
+    def set_apps(self, apps):
+        """Change the watched apps; the next poll re-checks every known process"""
+        self.apps = list(apps)
+        self.matcher = compile_matcher(self.apps)
+        self.rematch = True
+
+    def match(self, names):
+        """The watched app a process belongs to, or None"""
+        for name in names:
+            name = normalize_name(name)
+            if name and self.matcher(name):
+                return name
+        return None
+
+    def running_apps(self):
+        return sorted(self.counts)
+
+    def poll(self):
+        """Scan once; returns the app start/stop events since the last poll"""
+        started, exited = self.scanner.scan(verify=self.running)
+        before = set(self.counts)
+
+        if self.rematch:
+            self.rematch = False
+            self.running = {}
+            self.counts = {}
+            candidates = self.scanner.known.items()
+        else:
+            for pid in exited:
+                app = self.running.pop(pid, None)
+                if app is not None:
+                    self.counts[app] -= 1
+                    if not self.counts[app]:
+                        del self.counts[app]
+            candidates = started.items()
+
+        for pid, names in candidates:
+            app = self.match(names)
+            if app is not None:
+                self.running[pid] = app
+                self.counts[app] = self.counts.get(app, 0) + 1
+
+        after = set(self.counts)
+        return ([("start", app) for app in sorted(after - before)]
+                + [("stop", app) for app in sorted(before - after)])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Print distracting apps as they start and stop")
+    parser.add_argument("apps", nargs="*", help="executable names or wildcards (default: browsers and chat apps)")
+    parser.add_argument("--interval", type=float, default=2.0, help="seconds between scans")
+    parser.add_argument("--proc-root", help="read this /proc-style tree instead of the system's")
+    args = parser.parse_args(argv)
+
+    scanner = ProcScanner(args.proc_root) if args.proc_root else None
+    watcher = ProcessWatcher(args.apps or DEFAULT_APPS, scanner)
+    try:
+        while True:
+            started = time.perf_counter()
+            events = watcher.poll()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            for kind, app in events:
+                print(f"{time.strftime('%H:%M:%S')} {kind:<5} {app}  (scan {elapsed_ms:.1f} ms)")
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""Database reads and writes for sessions, stats and badges.
+
+Everything here takes the Storage and runs on the persistence worker
+thread, never on the Tk thread.
+"""
+import datetime
+
+# Focus chart ranges: days shown -> (bucket size, number of bars)
+CHART_RANGES = {
+    7: ("day", 7),
+    30: ("day", 30),
+    90: ("week", 13),
+    365: ("month", 12),
+}
+
+
+def save_session(storage, now, duration, focus_score, hardcore, timeline_blob=None):
+    """Insert a finished session and update its day's rollup; returns the session id"""
+    started = now.isoformat()
+    day = started[:10]
+    hardcore = 1 if hardcore else 0
+    with storage.transaction():
+        session_id = storage.execute('''
+        INSERT INTO focus_sessions (start_time, day, duration, focus_score, hardcore_mode, timeline)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ''', (started, day, int(duration), focus_score, hardcore, timeline_blob)).lastrowid
+
+        # Keep the day's totals in step with the new session
+        storage.execute('''
+        INSERT INTO daily_rollup (day, session_count, total_duration, score_sum,
+                                  weighted_score_sum, hardcore_count)
+        VALUES (?, 1, ?, ?, ?, ?)
+        ON CONFLICT(day) DO UPDATE SET
+            session_count = session_count + 1,
+            total_duration = total_duration + excluded.total_duration,
+            score_sum = score_sum + excluded.score_sum,
+            weighted_score_sum = weighted_score_sum + excluded.weighted_score_sum,
+            hardcore_count = hardcore_count + excluded.hardcore_count
+        ''', (day, int(duration), focus_score, focus_score * int(duration), hardcore))
+    return session_id
+
+
+def rebuild_daily_rollup(storage):
+    """Recompute every day's totals from focus_sessions"""
+    storage.execute("DELETE FROM daily_rollup")
+    storage.execute('''
+    INSERT INTO daily_rollup (day, session_count, total_duration, score_sum,
+                              weighted_score_sum, hardcore_count)
+    SELECT day, COUNT(*), SUM(duration), SUM(focus_score),
+           SUM(focus_score * duration), SUM(hardcore_mode)
+    FROM focus_sessions
+    WHERE day IS NOT NULL
+    GROUP BY day
+    ''')
+
+
+def update_journal(storage, session_id, journal_text):
+    """Update a session with journal text"""
+    storage.execute('''
+    UPDATE focus_sessions SET journal_text = ? WHERE id = ?
+    ''', (journal_text, session_id))
+
+
+def session_timeline(storage, session_id):
+    """(start_time, timeline blob) of a session, or None"""
+    return storage.query_one('SELECT start_time, timeline FROM focus_sessions WHERE id = ?', (session_id,))
+
+
+def today_count(storage, day):
+    """Number of sessions on a day"""
+    return storage.scalar('''
+    SELECT session_count FROM daily_rollup
+    WHERE day = ?
+    ''', (day,)) or 0
+
+
+def get_streak(storage, current_date, max_days=100):
+    """Number of consecutive days with sessions, ending at current_date"""
+    rows = storage.query('''
+    SELECT day FROM daily_rollup
+    WHERE day <= ? AND session_count > 0
+    ORDER BY day DESC
+    LIMIT ?
+    ''', (current_date.strftime("%Y-%m-%d"), max_days))
+
+    streak = 0
+    for (day,) in rows:
+        expected = (current_date - datetime.timedelta(days=streak)).strftime("%Y-%m-%d")
+        if day != expected:
+            break
+        streak += 1
+    return streak
+
+
+def chart_data(storage, range_days, today):
+    """Average focus score per bucket for a chart range, as (label, score) pairs"""
+    granularity, count = CHART_RANGES[range_days]
+
+    today_str = today.strftime("%Y-%m-%d")
+    if granularity == "day":
+        first = today - datetime.timedelta(days=count - 1)
+        bucket_sql = "day"
+        buckets = [today - datetime.timedelta(days=i) for i in range(count - 1, -1, -1)]
+        keys = [d.strftime("%Y-%m-%d") for d in buckets]
+        labels = [d.strftime("%a") if count <= 7 else d.strftime("%d") for d in buckets]
+    elif granularity == "week":
+        first = today - datetime.timedelta(days=count * 7 - 1)
+        bucket_sql = "CAST((julianday(:today) - julianday(day)) / 7 AS INTEGER)"
+        keys = list(range(count - 1, -1, -1))
+        labels = [(today - datetime.timedelta(days=i * 7 + 6)).strftime("%m/%d") for i in keys]
+    else:  # month
+        months = [(today.year * 12 + today.month - 1) - i for i in range(count - 1, -1, -1)]
+        first = datetime.date(months[0] // 12, months[0] % 12 + 1, 1)
+        bucket_sql = "substr(day, 1, 7)"
+        keys = [f"{m // 12:04d}-{m % 12 + 1:02d}" for m in months]
+        labels = [datetime.date(m // 12, m % 12 + 1, 1).strftime("%b") for m in months]
+
+    # One grouped query over the daily rollup
+    averages = dict(storage.query(f'''
+    SELECT {bucket_sql} AS bucket, SUM(score_sum) / SUM(session_count)
+    FROM daily_rollup
+    WHERE day BETWEEN :first AND :today AND session_count > 0
+    GROUP BY bucket
+    ''', {"first": first.strftime("%Y-%m-%d"), "today": today_str}))
+
+    data = []
+    for bucket_key, label in zip(keys, labels):
+        avg_score = averages.get(bucket_key)
+        data.append((label, 0 if avg_score is None else round(avg_score)))
+    return data
+
+
+def earned_badges(storage):
+    """(badge_id, earn_date) of every earned badge, newest first"""
+    return storage.query('SELECT badge_id, earn_date FROM earned_badges ORDER BY earn_date DESC')
@@ -0,0 +1,88 @@
+"""Adaptive detection rate for the video pipeline"""
+import time
+
+from focus import FOCUSED, GRACE
+
+
+class DetectionScheduler:
+    """Decides how long the detection stage waits before the next frame.
+
+    Detection runs at fast_hz while the focus vote is undecided or the grace
+    period is counting down, so state changes are confirmed quickly. Once
+    the state has been stable for stable_after seconds the rate halves every
+    stable_after seconds down to slow_hz. The rate is also capped so that
+    detection uses at most cpu_budget of one core.
+
+    Grace semantics take precedence over the budget: the first missed face
+    after a slow interval still counts as focused in the majority vote, so
+    the grace period always starts after the user actually left; any
+    interval is kept below half the grace period, and while the grace
+    period runs the next detection is due no later than when it runs out.
+    """
+
+    def __init__(self, fast_hz=15.0, slow_hz=2.0, alert_hz=5.0, stable_after=5.0,
+                 cpu_budget=0.25, clock=time.time):
+        self.fast_hz = fast_hz
+        self.slow_hz = slow_hz
+        self.alert_hz = alert_hz
+        self.stable_after = stable_after
+        self.cpu_budget = cpu_budget
+        self.clock = clock
+        self.reset()
+
+    def reset(self, now=None):
+        """Start a new session at the fast rate"""
+        if now is None:
+            now = self.clock()
+        self.stable_since = now
+        self.last_state = None
+        self.detect_cost = 0.0
+        self.current_hz = self.fast_hz
+
+    def record(self, tracker, detect_seconds, now=None):
+        """Register one detection and how long it took"""
+        if now is None:
+            now = self.clock()
+
+        votes = sum(tracker.focus_buffer)
+        undecided = 0 < votes < len(tracker.focus_buffer)
+        if undecided or tracker.state != self.last_state:
+            self.stable_since = now
+        self.last_state = tracker.state
+
+        # Smoothed cost of one detection, used for the CPU budget
+        if self.detect_cost == 0.0:
+            self.detect_cost = detect_seconds
+        else:
+            self.detect_cost = self.detect_cost * 0.8 + detect_seconds * 0.2
+
+    def next_interval(self, tracker, now=None):
+        """Seconds to wait before running the next detection"""
+        if now is None:
+            now = self.clock()
+
+        if tracker.state == GRACE or now - self.stable_since < self.stable_after:
+            hz = self.fast_hz
+        elif tracker.state == FOCUSED:
+            # Halve the rate for every further stable_after seconds of stability
+            halvings = int((now - self.stable_since) / self.stable_after)
+            hz = max(self.slow_hz, self.fast_hz / (2 ** halvings))
+        else:
+            # Alerting: check often enough to silence the alert promptly
+            hz = self.alert_hz
+
+        interval = 1.0 / hz
+
+        # Respect the CPU budget
+        if self.cpu_budget > 0:
+            interval = max(interval, self.detect_cost / self.cpu_budget - self.detect_cost)
+
+        # Keep every interval well inside the grace period, budget or not
+        interval = min(interval, tracker.grace_period / 2)
+
+        # Wake up right when the grace period runs out
+        if tracker.state == GRACE:
+            interval = min(interval, max(0.0, tracker.grace_remaining(now)) + 0.01)
+
+        self.current_hz = 1.0 / interval if interval > 0 else self.fast_hz
+        return interval
@@ -0,0 +1,337 @@
+"""Headless multi-stream detection server.
+
+Runs FocusBuddy's detection for several frame sources (e.g. a room of study
+stations) from one machine. Each stream has a capture thread that writes
+frames straight into a shared-memory ring buffer and a driver thread that
+hands the newest slot to a process pool for face detection, so frames are
+never pickled and detection is not limited by the GIL. Focus state is
+tracked per stream with the same majority-vote and grace-period logic as
+the app and emitted as JSON lines. Example:
+
+    python server.py --source camera:0 --source camera:1 --workers 4
+    python server.py --source video:a.mp4 --source video:b.mp4 --duration 60
+"""
+import argparse
+import json
+import multiprocessing
+import sys
+import threading
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from detection import FaceDetector, SENSITIVITY_PRESETS, DETECTION_RESOLUTIONS
+from focus import FocusTracker
+from frame_sources import CameraSource, open_source
+from scheduler import DetectionScheduler
+
+
+class FrameRing:
+    """Latest-frame-wins ring of frame slots in shared memory.
+
+    The producer always writes into a slot that is neither being read nor
+    holding the newest unread frame, so with three slots it never waits on
+    the consumer. The consumer claims the newest frame and releases it once
+    detection is done.
+    """
+
+    def __init__(self, shape, slots=3):
+        self.shape = tuple(shape)
+        self.slots = slots
+        frame_bytes = int(np.prod(self.shape))
+        self.shm = shared_memory.SharedMemory(create=True, size=frame_bytes * slots)
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf)
+        self.latest = None
+        self.latest_time = None
+        self.reading = None
+        self.closed = False
+        self.cond = threading.Condition()
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def write(self, frame, timestamp, block=False):
+        """Copy a frame into a free slot and publish it as the newest.
+
+        With block=True the producer waits until the previous frame has been
+        claimed, which replays recorded sources without dropping frames.
+        """
+        with self.cond:
+            if block:
+                while self.latest is not None and not self.closed:
+                    self.cond.wait(0.5)
+            if self.closed:
+                return False
+            slot = next(i for i in range(self.slots) if i not in (self.latest, self.reading))
+
+        if frame.shape != self.shape:
+            frame = cv2.resize(frame, (self.shape[1], self.shape[0]))
+        np.copyto(self.frames[slot], frame)
+
+        with self.cond:
+            self.latest = slot
+            self.latest_time = timestamp
+            self.cond.notify_all()
+        return True
+
+    def claim(self, timeout=None):
+        """Take the newest frame for reading; returns (slot, timestamp) or None"""
+        with self.cond:
+            if self.latest is None and not self.closed:
+                self.cond.wait(timeout)
+            if self.latest is None:
+                return None
+            self.reading, self.latest = self.latest, None
+            self.cond.notify_all()
+            return self.reading, self.latest_time
+
+    def release(self):
+        """Done reading the claimed slot"""
+        with self.cond:
+            self.reading = None
+            self.cond.notify_all()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def unlink(self):
+        del self.frames
+        self.shm.close()
+        self.shm.unlink()
+
+
+# Per-worker-process state, set up by _init_worker
+_detector = None
+_attached = {}
+
+
+def _init_worker(sensitivity, detect_width):
+    global _detector
+    _detector = FaceDetector(sensitivity, detect_width=detect_width)
+
+
+def _detect_frame(shm_name, shape, slot, hint):
+    """Run detection on one ring slot inside a worker process.
+
+    Any worker may serve any stream, so the stream's tracking and
+    motion-gate state is passed in as a hint and handed back with the
+    result; nothing one stream leaves in the detector can leak into another.
+    """
+    ring = _attached.get(shm_name)
+    if ring is None:
+        shm = shared_memory.SharedMemory(name=shm_name)
+        frames = np.ndarray((int(shm.size // int(np.prod(shape))),) + tuple(shape),
+                            dtype=np.uint8, buffer=shm.buf)
+        ring = _attached[shm_name] = (shm, frames)
+
+    _detector.set_state(hint)
+    faces = _detector.detect(ring[1][slot])
+    return faces, _detector.get_state()
+
+
+class Stream:
+    """One frame source with its ring buffer and focus state"""
+
+    def __init__(self, stream_id, spec, grace_period, adaptive, cpu_budget):
+        self.stream_id = stream_id
+        self.spec = spec
+        self.source = open_source(spec)
+        if not self.source.isOpened():
+            self.source.release()
+            raise RuntimeError(f"cannot open source {spec}")
+
+        # Live cameras run in real time; recorded sources replay on their own clock
+        self.live = isinstance(self.source, CameraSource)
+        self.frame_index = 0
+
+        ret, first = self.source.read()
+        if not ret:
+            self.source.release()
+            raise RuntimeError(f"source {spec} produced no frames")
+        self.ring = FrameRing(first.shape)
+        self.ring.write(first, self.timestamp())
+
+        self.tracker = FocusTracker(grace_period=grace_period)
+        self.tracker.reset(now=self.timestamp())
+        self.scheduler = DetectionScheduler(cpu_budget=cpu_budget) if adaptive else None
+        if self.scheduler is not None:
+            self.scheduler.reset(now=self.timestamp())
+        self.hint = None
+        self.detections = 0
+        self.last_time = self.timestamp()
+        self.finished = False
+        self.capturing = False  # once set, the capture thread releases the source
+
+    def timestamp(self):
+        if self.live:
+            return time.time()
+        return self.frame_index / self.source.fps
+
+    def capture(self, running):
+        """Capture thread: read frames straight into the shared-memory ring"""
+        self.capturing = True
+        while running.is_set():
+            ret, frame = self.source.read()
+            if not ret:
+                break
+            self.frame_index += 1
+            if not self.ring.write(frame, self.timestamp(), block=not self.live):
+                break
+        self.finished = True
+        self.ring.close()
+        self.source.release()
+
+    def drive(self, pool, running, emit):
+        """Driver thread: send the newest frame to the pool and track focus"""
+        while running.is_set():
+            claimed = self.ring.claim(timeout=0.5)
+            if claimed is None:
+                if self.ring.closed:
+                    break
+                continue
+            slot, captured_at = claimed
+
+            started = time.time()
+            try:
+                faces, self.hint = pool.apply(_detect_frame, (self.ring.name, self.ring.shape, slot, self.hint))
+            finally:
+                self.ring.release()
+            self.detections += 1
+            self.last_time = captured_at
+
+            previous = self.tracker.state
+            state = self.tracker.update(len(faces) > 0, now=captured_at)
+            if state != previous:
+                emit(self.event(captured_at))
+
+            if self.scheduler is not None:
+                self.scheduler.record(self.tracker, time.time() - started, now=captured_at)
+                if self.live:
+                    delay = self.scheduler.next_interval(self.tracker) - (time.time() - started)
+                    if delay > 0:
+                        time.sleep(delay)
+
+    def event(self, at):
+        return {
+            "stream": self.stream_id,
+            "source": self.spec,
+            "time": round(at, 3),
+            "state": self.tracker.state,
+            "score": self.tracker.focus_score(now=at),
+            "detections": self.detections,
+        }
+
+
+def run_server(specs, workers, sensitivity="Medium", detect_width=None, grace_period=3,
+               adaptive=False, cpu_budget=0.25, duration=None, report_interval=5.0, emit=None):
+    """Run detection for all sources until they end or duration elapses"""
+    if emit is None:
+        emit = _print_event
+    emit_lock = threading.Lock()
+
+    def locked_emit(event):
+        with emit_lock:
+            emit(event)
+
+    running = threading.Event()
+    running.set()
+
+    # Everything is created inside the try, so that if a source fails to
+    # open or the pool can't start, the frame rings already allocated in
+    # shared memory are still released
+    streams = []
+    pool = None
+    threads = []
+    started = time.time()
+    try:
+        for i, spec in enumerate(specs):
+            streams.append(Stream(i, spec, grace_period, adaptive, cpu_budget))
+
+        # Spawn keeps worker start-up identical on Windows, macOS and Linux
+        context = multiprocessing.get_context("spawn")
+        pool = context.Pool(workers, initializer=_init_worker, initargs=(sensitivity, detect_width))
+
+        started = time.time()
+        for stream in streams:
+            for target, args in ((stream.capture, (running,)), (stream.drive, (pool, running, locked_emit))):
+                thread = threading.Thread(target=target, args=args)
+                thread.daemon = True
+                thread.start()
+                threads.append(thread)
+
+        next_report = started + report_interval
+        while any(thread.is_alive() for thread in threads):
+            if duration is not None and time.time() - started >= duration:
+                break
+            if time.time() >= next_report:
+                for stream in streams:
+                    locked_emit(stream.event(stream.last_time))
+                next_report += report_interval
+            time.sleep(0.1)
+    finally:
+        running.clear()
+        for stream in streams:
+            stream.ring.close()
+        for thread in threads:
+            thread.join(timeout=2)
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+        for stream in streams:
+            if not stream.capturing:
+                stream.source.release()
+            stream.ring.unlink()
+
+    elapsed = time.time() - started
+    total = sum(stream.detections for stream in streams)
+    summary = {
+        "summary": True,
+        "streams": len(streams),
+        "workers": workers,
+        "elapsed_s": round(elapsed, 3),
+        "detections": total,
+        "detections_per_s": round(total / elapsed, 2) if elapsed > 0 else 0.0,
+        "per_stream": [stream.event(stream.last_time) for stream in streams],
+    }
+    locked_emit(summary)
+    return summary
+
+
+def _print_event(event):
+    print(json.dumps(event), flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless multi-stream FocusBuddy detection server")
+    parser.add_argument("--source", action="append", required=True,
+                        help="frame source (repeatable): camera:N, video:PATH, images:DIR or synthetic[:WxH]")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count(),
+                        help="number of detection processes")
+    parser.add_argument("--sensitivity", default="Medium", choices=list(SENSITIVITY_PRESETS))
+    parser.add_argument("--resolution", default="Auto", choices=list(DETECTION_RESOLUTIONS))
+    parser.add_argument("--grace", type=float, default=3, help="grace period in seconds")
+    parser.add_argument("--adaptive", action="store_true", help="use the adaptive detection-rate scheduler")
+    parser.add_argument("--cpu-budget", type=float, default=25, help="per-stream CPU budget in percent")
+    parser.add_argument("--duration", type=float, help="stop after this many seconds")
+    parser.add_argument("--report-interval", type=float, default=5.0,
+                        help="seconds between per-stream status lines")
+    args = parser.parse_args(argv)
+
+    try:
+        run_server(args.source, args.workers, args.sensitivity, DETECTION_RESOLUTIONS[args.resolution],
+                   args.grace, args.adaptive, args.cpu_budget / 100, args.duration, args.report_interval)
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
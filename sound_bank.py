@@ -0,0 +1,145 @@
+"""Alert sounds, rendered once and kept in memory.
+
+Each alert style is a list of escalation levels: the longer an alert goes
+unanswered (the app's warning_count), the higher the level, and the
+louder, faster and more insistent the sound. Tones are synthesized with
+numpy in a single vectorized pass per level, turned into pygame Sound
+objects once and cached; a custom sound file is decoded once as well.
+Alerts play on mixer channels reserved for them, so nothing else in the
+mixer can take their channel and playing costs no disk I/O.
+"""
+import numpy as np
+import pygame
+
+# Per style, the escalation levels: tone frequencies (cycled over the
+# beeps), number of beeps, beep and gap lengths in seconds, volume, and
+# seconds until the next alert
+PROFILES = {
+    "Beep": [
+        {"frequencies": (880,), "beeps": 1, "beep": 0.8, "gap": 0.0, "volume": 0.6, "interval": 3.0},
+        {"frequencies": (880,), "beeps": 2, "beep": 0.3, "gap": 0.1, "volume": 0.8, "interval": 3.0},
+        {"frequencies": (988,), "beeps": 3, "beep": 0.2, "gap": 0.08, "volume": 1.0, "interval": 2.5},
+        {"frequencies": (1175,), "beeps": 4, "beep": 0.12, "gap": 0.06, "volume": 1.0, "interval": 2.0},
+    ],
+    "Chime": [
+        {"frequencies": (523, 784), "beeps": 2, "beep": 0.35, "gap": 0.05, "volume": 0.5, "interval": 3.0},
+        {"frequencies": (659, 988), "beeps": 2, "beep": 0.3, "gap": 0.05, "volume": 0.7, "interval": 3.0},
+        {"frequencies": (784, 1175), "beeps": 4, "beep": 0.2, "gap": 0.05, "volume": 0.9, "interval": 2.5},
+        {"frequencies": (988, 1319), "beeps": 6, "beep": 0.15, "gap": 0.04, "volume": 1.0, "interval": 2.0},
+    ],
+    "Siren": [
+        {"frequencies": (700, 1000), "beeps": 4, "beep": 0.15, "gap": 0.0, "volume": 0.7, "interval": 3.0},
+        {"frequencies": (700, 1000), "beeps": 6, "beep": 0.12, "gap": 0.0, "volume": 0.85, "interval": 2.5},
+        {"frequencies": (800, 1200), "beeps": 10, "beep": 0.1, "gap": 0.0, "volume": 1.0, "interval": 2.0},
+    ],
+}
+
+DEFAULT_PROFILE = "Beep"
+
+FADE_SECONDS = 0.005  # ramps at each beep's edges, so beeps don't click
+
+# Sample type, full-scale amplitude and zero level for the mixer's sample formats
+SAMPLE_FORMATS = {
+    -8: (np.int8, 127, 0),
+    8: (np.uint8, 127, 128),
+    -16: (np.int16, 32000, 0),
+    16: (np.uint16, 32000, 32768),
+    32: (np.float32, 1.0, 0),
+}
+
+
+def synthesize(level, sample_rate=44100):
+    """A level's beeps as a mono float waveform in [-1, 1]"""
+    samples = int(sample_rate * level["beep"])
+    t = np.arange(samples) / sample_rate
+    fade = max(1, int(sample_rate * FADE_SECONDS))
+    ramp = np.minimum(np.arange(samples), np.arange(samples)[::-1])
+    envelope = np.minimum(1.0, ramp / fade)
+
+    # One row per beep, each at its own frequency, then the gaps appended
+    frequencies = np.resize(np.array(level["frequencies"], dtype=np.float64), level["beeps"])
+    beeps = np.sin(2 * np.pi * frequencies[:, None] * t[None, :]) * envelope
+    gap = int(sample_rate * level["gap"])
+    if gap:
+        beeps = np.hstack([beeps, np.zeros((level["beeps"], gap))])
+        # No silence after the last beep
+        return beeps.reshape(-1)[:-gap]
+    return beeps.reshape(-1)
+
+
+def to_samples(wave, mixer_format=-16, channels=2):
+    """Waveform as a sample array pygame.sndarray can take for this mixer setup"""
+    dtype, amplitude, zero = SAMPLE_FORMATS.get(mixer_format, SAMPLE_FORMATS[-16])
+    samples = (wave * amplitude + zero).astype(dtype)
+    if channels > 1:
+        samples = np.ascontiguousarray(np.repeat(samples[:, None], channels, axis=1))
+    return samples
+
+
+class SoundBank:
+    """Cached alert sounds for every escalation level, played on reserved channels"""
+
+    def __init__(self, profile=DEFAULT_PROFILE, reserved_channels=2):
+        self.sample_rate, self.mixer_format, self.mixer_channels = pygame.mixer.get_init()
+        if pygame.mixer.get_num_channels() < reserved_channels:
+            pygame.mixer.set_num_channels(reserved_channels)
+        pygame.mixer.set_reserved(reserved_channels)
+        self.channels = [pygame.mixer.Channel(i) for i in range(reserved_channels)]
+        self.next_channel = 0
+        self.sounds = {}  # (profile, level) -> Sound
+        self.files = {}  # path -> Sound
+        self.custom = None
+        self.profile = profile
+        self.prerender()
+
+    def set_profile(self, profile):
+        """Switch to a built-in alert style (dropping any custom sound)"""
+        self.profile = profile
+        self.custom = None
+        self.prerender()
+
+    def levels(self):
+        return PROFILES[self.profile]
+
+    def level(self, warning_count):
+        """Escalation level for the number of warnings given so far"""
+        return min(max(warning_count, 0), len(self.levels()) - 1)
+
+    def prerender(self):
+        """Build the current style's sounds up front"""
+        for level in range(len(self.levels())):
+            self.sound(level)
+
+    def sound(self, level):
+        key = (self.profile, level)
+        sound = self.sounds.get(key)
+        if sound is None:
+            wave = synthesize(self.levels()[level], self.sample_rate)
+            sound = pygame.sndarray.make_sound(to_samples(wave, self.mixer_format, self.mixer_channels))
+            sound.set_volume(self.levels()[level]["volume"])
+            self.sounds[key] = sound
+        return sound
+
+    def load_file(self, path):
+        """Use a sound file for every level (louder as it escalates); decoded only the first time"""
+        sound = self.files.get(path)
+        if sound is None:
+            sound = pygame.mixer.Sound(path)
+            self.files[path] = sound
+        self.custom = sound
+
+    def play(self, warning_count=0):
+        """Play the sound for this many warnings on the next reserved channel"""
+        level = self.level(warning_count)
+        channel = self.channels[self.next_channel]
+        self.next_channel = (self.next_channel + 1) % len(self.channels)
+        if self.custom is not None:
+            channel.play(self.custom)
+            channel.set_volume(self.levels()[level]["volume"])
+        else:
+            channel.play(self.sound(level))
+            channel.set_volume(1.0)
+
+    def interval(self, warning_count):
+        """Seconds to wait before the next alert"""
+        return self.levels()[self.level(warning_count)]["interval"]
@@ -0,0 +1,93 @@
+"""SQLite storage layer shared by the whole app"""
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class Storage:
+    """Owns one long-lived SQLite connection.
+
+    The connection runs in WAL mode and caches compiled statements, so the
+    data methods reuse prepared statements instead of reconnecting and
+    re-parsing SQL. Statements outside a transaction commit on their own;
+    transaction() groups several calls into a single commit and may be
+    nested, only the outermost block commits. Nested blocks are savepoints,
+    so an inner block that fails only undoes its own changes.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=False,
+                                    isolation_level=None, cached_statements=256)
+        self.lock = threading.RLock()
+        self.depth = 0
+        self.configure()
+
+    def configure(self):
+        """Apply connection pragmas"""
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA temp_store=MEMORY")
+        self.conn.execute("PRAGMA cache_size=-8000")  # 8 MB
+        self.conn.execute("PRAGMA busy_timeout=5000")
+
+    @contextmanager
+    def transaction(self):
+        """Run the enclosed statements in one transaction"""
+        with self.lock:
+            savepoint = f"sp{self.depth}"
+            if self.depth == 0:
+                self.conn.execute("BEGIN")
+            else:
+                self.conn.execute(f"SAVEPOINT {savepoint}")
+            self.depth += 1
+            try:
+                yield self
+            except BaseException:
+                self.depth -= 1
+                if self.depth == 0:
+                    self.conn.rollback()
+                else:
+                    self.conn.execute(f"ROLLBACK TO {savepoint}")
+                    self.conn.execute(f"RELEASE {savepoint}")
+                raise
+            else:
+                self.depth -= 1
+                if self.depth == 0:
+                    self.conn.commit()
+                else:
+                    self.conn.execute(f"RELEASE {savepoint}")
+
+    def execute(self, sql, params=()):
+        """Execute one statement; returns the cursor (e.g. for lastrowid)"""
+        with self.lock:
+            return self.conn.execute(sql, params)
+
+    def executemany(self, sql, rows):
+        with self.lock:
+            return self.conn.executemany(sql, rows)
+
+    def query(self, sql, params=()):
+        """Return all rows of a query"""
+        with self.lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def query_one(self, sql, params=()):
+        """Return the first row of a query, or None"""
+        with self.lock:
+            return self.conn.execute(sql, params).fetchone()
+
+    def scalar(self, sql, params=()):
+        """Return the first column of the first row, or None"""
+        row = self.query_one(sql, params)
+        return row[0] if row is not None else None
+
+    def data_version(self):
+        """Counter that changes whenever this connection modifies data"""
+        with self.lock:
+            return self.conn.total_changes
+
+    def close(self):
+        with self.lock:
+            if self.depth == 0:
+                self.conn.close()
@@ -0,0 +1,171 @@
+import sqlite3
+
+import pytest
+
+import browser_history
+from blocklist import Blocklist
+from browser_history import EPOCH_OFFSETS, BrowserHistoryWatcher, HistoryProfile
+
+NOW = 1700000000
+
+
+class ChromiumHistory:
+    """A Chromium-style History database"""
+
+    def __init__(self, path):
+        self.path = str(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self.connect() as conn:
+            conn.execute("CREATE TABLE urls (id INTEGER PRIMARY KEY, url TEXT)")
+            conn.execute("CREATE TABLE visits (id INTEGER PRIMARY KEY, url INTEGER, visit_time INTEGER)")
+
+    def connect(self):
+        return sqlite3.connect(self.path)
+
+    def visit(self, url, when):
+        with self.connect() as conn:
+            url_id = conn.execute("INSERT INTO urls (url) VALUES (?)", (url,)).lastrowid
+            conn.execute("INSERT INTO visits (url, visit_time) VALUES (?, ?)",
+                         (url_id, (when + EPOCH_OFFSETS["chromium"]) * 1000000))
+
+    def clear(self, keep_after=None):
+        with self.connect() as conn:
+            if keep_after is None:
+                conn.execute("DELETE FROM visits")
+            else:
+                conn.execute("DELETE FROM visits WHERE visit_time <= ?",
+                             ((keep_after + EPOCH_OFFSETS["chromium"]) * 1000000,))
+
+
+@pytest.fixture
+def history(tmp_path):
+    return ChromiumHistory(tmp_path / "Default" / "History")
+
+
+@pytest.fixture
+def profile(history):
+    return HistoryProfile("Chrome", "chromium", history.path)
+
+
+def urls(rows):
+    return [url for _, _, url in rows]
+
+
+def test_only_visits_after_the_cursor(history, profile):
+    history.visit("https://old.example/", NOW - 100)
+    assert profile.read_new() == []
+    history.visit("https://a.example/", NOW)
+    history.visit("https://b.example/", NOW + 1)
+    rows = profile.read_new()
+    assert urls(rows) == ["https://a.example/", "https://b.example/"]
+    assert rows[0][1] == pytest.approx(NOW)
+    assert profile.read_new() == []
+
+
+def test_reads_in_batches(history, profile):
+    profile.read_new()
+    for second in range(5):
+        history.visit(f"https://{second}.example/", NOW + second)
+    assert len(profile.read_new(limit=3)) == 3
+    assert profile.signature is None
+    assert urls(profile.read_new(limit=3)) == ["https://3.example/", "https://4.example/"]
+
+
+def test_cleared_history_does_not_replay(history, profile):
+    profile.read_new()
+    history.visit("https://a.example/", NOW)
+    history.visit("https://b.example/", NOW + 1)
+    assert len(profile.read_new()) == 2
+
+    # Cleared: visit ids start over, and only newer visits are new
+    history.clear()
+    history.visit("https://c.example/", NOW + 2)
+    assert urls(profile.read_new()) == ["https://c.example/"]
+
+
+def test_truncated_history_keeps_the_cursor(history, profile):
+    history.visit("https://old.example/", NOW - 100)
+    profile.read_new()
+    history.visit("https://a.example/", NOW)
+    assert len(profile.read_new()) == 1
+    history.clear(keep_after=NOW - 1)
+    history.visit("https://b.example/", NOW + 1)
+    assert urls(profile.read_new()) == ["https://b.example/"]
+
+
+def test_locked_database_is_still_read(history, profile):
+    profile.read_new()
+    history.visit("https://a.example/", NOW)
+    # What a browser holding its history exclusively looks like
+    browser = history.connect()
+    browser.execute("PRAGMA locking_mode=EXCLUSIVE")
+    browser.execute("BEGIN EXCLUSIVE")
+    try:
+        assert urls(profile.read_new()) == ["https://a.example/"]
+    finally:
+        browser.rollback()
+        browser.close()
+    assert profile.copy_dir is None
+
+
+def test_unopenable_database_is_copied_only_when_changed(history, profile, monkeypatch):
+    connect = sqlite3.connect
+
+    def no_uri_connect(database, *args, uri=False, **kwargs):
+        if uri:
+            raise sqlite3.OperationalError("database is locked")
+        return connect(database, *args, **kwargs)
+
+    copies = []
+    copyfile = browser_history.shutil.copyfile
+
+    def counting_copyfile(source, target):
+        copies.append(source)
+        return copyfile(source, target)
+
+    monkeypatch.setattr(browser_history.sqlite3, "connect", no_uri_connect)
+    monkeypatch.setattr(browser_history.shutil, "copyfile", counting_copyfile)
+
+    profile.read_new()
+    assert profile.read_new() == []
+    assert len(copies) == 1
+    history.visit("https://a.example/", NOW)
+    assert urls(profile.read_new()) == ["https://a.example/"]
+    assert len(copies) == 2
+
+    copy_dir = profile.copy_dir
+    profile.close()
+    assert not browser_history.os.path.exists(copy_dir)
+
+
+def test_watcher_reports_blocked_hosts(tmp_path, history):
+    blocklist = Blocklist()
+    blocklist.add("youtube.com")
+    watcher = BrowserHistoryWatcher(blocklist, roots=[("Chrome", "chromium", str(tmp_path / "*" / "History"))])
+    assert watcher.poll() == []
+    history.visit("https://m.youtube.com/watch?v=1", NOW)
+    history.visit("https://example.com/", NOW + 1)
+    history.visit("chrome://settings/", NOW + 2)
+    assert watcher.poll() == [("Chrome", "m.youtube.com", "https://m.youtube.com/watch?v=1", pytest.approx(NOW))]
+    # Nothing changed on disk: the profile isn't even opened
+    assert not watcher.profiles[history.path].changed()
+    assert watcher.poll() == []
+
+
+def test_watcher_survives_a_broken_database(tmp_path):
+    broken = tmp_path / "Default" / "History"
+    broken.parent.mkdir()
+    broken.write_bytes(b"not a database" * 100)
+    watcher = BrowserHistoryWatcher(Blocklist(), roots=[("Chrome", "chromium", str(tmp_path / "*" / "History"))])
+    assert watcher.poll() == []
+    assert watcher.profiles[str(broken)].signature is None
+
+
+def test_closed_watcher_stops_polling(tmp_path, history):
+    blocklist = Blocklist()
+    blocklist.add("youtube.com")
+    watcher = BrowserHistoryWatcher(blocklist, roots=[("Chrome", "chromium", str(tmp_path / "*" / "History"))])
+    watcher.poll()
+    watcher.close()
+    history.visit("https://youtube.com/", NOW)
+    assert watcher.poll() == []
@@ -0,0 +1,124 @@
+import asyncio
+import struct
+
+from blocklist import Blocklist
+from dns_sinkhole import (CLASS_IN, RCODE_NXDOMAIN, RCODE_SERVFAIL, TYPE_A, DnsSinkhole,
+                          parse_address)
+
+UPSTREAM_ADDRESS = bytes([93, 184, 216, 34])
+
+
+def query(name, query_id=0x1234, qtype=TYPE_A):
+    question = b"".join(bytes([len(label)]) + label.encode() for label in name.split(".")) + b"\0"
+    return struct.pack("!HHHHHH", query_id, 0x0100, 1, 0, 0, 0) + question + struct.pack("!HH", qtype, CLASS_IN)
+
+
+def rcode(response):
+    return struct.unpack_from("!H", response, 2)[0] & 0x000F
+
+
+class Upstream(asyncio.DatagramProtocol):
+    """Resolver stub: answers every A query with one record, unless silent"""
+
+    def __init__(self, silent=False):
+        self.silent = silent
+        self.queries = []
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, packet, addr):
+        self.queries.append(packet)
+        if self.silent:
+            return
+        header = packet[:2] + struct.pack("!HHHHH", 0x8180, 1, 1, 0, 0)
+        record = b"\xc0\x0c" + struct.pack("!HHIH", TYPE_A, CLASS_IN, 300, 4) + UPSTREAM_ADDRESS
+        self.transport.sendto(header + packet[12:] + record, addr)
+
+
+class Client(asyncio.DatagramProtocol):
+    def __init__(self):
+        self.responses = asyncio.Queue()
+
+    def datagram_received(self, packet, addr):
+        self.responses.put_nowait(packet)
+
+
+def run(scenario, silent=False, timeout=2.0):
+    """Run scenario(ask, upstream, sinkhole) against a sinkhole in front of a stub upstream"""
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        upstream_transport, upstream = await loop.create_datagram_endpoint(
+            lambda: Upstream(silent), local_addr=("127.0.0.1", 0))
+        blocklist = Blocklist()
+        blocklist.add("youtube.com")
+        sinkhole = DnsSinkhole(blocklist, upstream_transport.get_extra_info("sockname"), timeout=timeout)
+        await sinkhole.start("127.0.0.1", 0)
+        client_transport, client = await loop.create_datagram_endpoint(
+            Client, remote_addr=sinkhole.transport.get_extra_info("sockname"))
+
+        async def ask(packet):
+            client_transport.sendto(packet)
+            return await asyncio.wait_for(client.responses.get(), 5)
+
+        try:
+            await scenario(ask, upstream, sinkhole)
+        finally:
+            client_transport.close()
+            sinkhole.close()
+            upstream_transport.close()
+
+    asyncio.run(main())
+
+
+def test_blocked_names_get_nxdomain():
+    async def scenario(ask, upstream, sinkhole):
+        for name in ("youtube.com", "m.youtube.com", "WWW.YouTube.com"):
+            response = await ask(query(name, 0x4242))
+            assert response[:2] == b"\x42\x42"
+            assert rcode(response) == RCODE_NXDOMAIN
+        assert upstream.queries == []
+        assert sinkhole.stats["blocked"] == 3
+
+    run(scenario)
+
+
+def test_allowed_names_are_forwarded_and_cached():
+    async def scenario(ask, upstream, sinkhole):
+        first = await ask(query("example.com", 0x0001))
+        assert first[:2] == b"\x00\x01"
+        assert rcode(first) == 0
+        assert first.endswith(UPSTREAM_ADDRESS)
+        assert len(upstream.queries) == 1
+
+        second = await ask(query("example.com", 0x0002))
+        assert second[:2] == b"\x00\x02"
+        assert second[2:] == first[2:]
+        assert len(upstream.queries) == 1
+        assert sinkhole.stats["cached"] == 1
+
+        # notyoutube.com is not a subdomain of youtube.com
+        await ask(query("notyoutube.com"))
+        assert len(upstream.queries) == 2
+
+    run(scenario)
+
+
+def test_upstream_timeout_gets_servfail():
+    async def scenario(ask, upstream, sinkhole):
+        response = await ask(query("example.com", 0x0777))
+        assert response[:2] == b"\x07\x77"
+        assert rcode(response) == RCODE_SERVFAIL
+        assert sinkhole.pending == {}
+        assert sinkhole.cache == {}
+        assert sinkhole.stats["failed"] == 1
+
+    run(scenario, silent=True, timeout=0.1)
+
+
+def test_parse_address():
+    assert parse_address("1.1.1.1") == ("1.1.1.1", 53)
+    assert parse_address("127.0.0.1:5353") == ("127.0.0.1", 5353)
+    assert parse_address("[::1]:5353") == ("::1", 5353)
+    assert parse_address("::1") == ("::1", 53)
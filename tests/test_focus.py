@@ -0,0 +1,34 @@
+import pytest
+
+from focus import FOCUSED, GRACE, UNFOCUSED, FocusTimeline
+
+
+def test_runs_past_the_end_are_cut_off():
+    timeline = FocusTimeline()
+    timeline.record(UNFOCUSED, 0)
+    timeline.record(FOCUSED, 100)
+    timeline.record(UNFOCUSED, 125)
+    assert list(timeline.intervals(120)) == [(0, 100, UNFOCUSED), (100, 120, FOCUSED)]
+    assert timeline.per_minute(120) == [0, 33]
+    assert timeline.totals(120)[FOCUSED] == pytest.approx(20)
+
+
+def test_blob_with_offsets_past_the_end():
+    timeline = FocusTimeline()
+    timeline.record(FOCUSED, 0)
+    timeline.record(GRACE, 130)
+    timeline.record(FOCUSED, 200)
+    loaded, end = FocusTimeline.from_blob(timeline.to_blob(90))
+    assert end == 90
+    assert loaded.per_minute(end) == [100, 100]
+    assert loaded.focus_score(end) == 100
+
+
+def test_blob_round_trip():
+    timeline = FocusTimeline()
+    timeline.record(FOCUSED, 0)
+    timeline.record(GRACE, 30.5)
+    timeline.record(UNFOCUSED, 33.5)
+    loaded, end = FocusTimeline.from_blob(timeline.to_blob(60))
+    assert list(loaded.intervals(end)) == list(timeline.intervals(60))
+    assert loaded.per_minute(end) == [50]
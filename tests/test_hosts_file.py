@@ -0,0 +1,106 @@
+import os
+
+import pytest
+
+import hosts_file
+from hosts_file import END_MARKER, START_MARKER, HostsFile
+
+ORIGINAL = "127.0.0.1 localhost\r\n::1 localhost\r\n# added by hand\r\n10.0.0.5 nas.lan\r\n"
+
+
+@pytest.fixture
+def hosts(tmp_path):
+    path = tmp_path / "hosts"
+    path.write_bytes(ORIGINAL.encode())
+    return HostsFile(str(path))
+
+
+@pytest.fixture
+def replaces(monkeypatch):
+    """Paths os.replace was called with, in hosts_file"""
+    calls = []
+    real_replace = os.replace
+
+    def replace(source, target):
+        calls.append(target)
+        real_replace(source, target)
+
+    monkeypatch.setattr(hosts_file.os, "replace", replace)
+    return calls
+
+
+def read(hosts):
+    with open(hosts.path, "rb") as f:
+        return f.read().decode()
+
+
+def leftovers(hosts):
+    return [name for name in os.listdir(os.path.dirname(hosts.path)) if name != "hosts"]
+
+
+def test_apply_writes_once(hosts, replaces):
+    assert hosts.apply(["youtube.com", "www.reddit.com"])
+    assert replaces == [hosts.path]
+    assert read(hosts) == ORIGINAL + (
+        f"\r\n{START_MARKER}\r\n"
+        "127.0.0.1 youtube.com\r\n127.0.0.1 www.youtube.com\r\n127.0.0.1 www.reddit.com\r\n"
+        f"{END_MARKER}\r\n")
+    assert leftovers(hosts) == []
+
+
+def test_unchanged_section_is_not_written(hosts, replaces):
+    hosts.apply(["youtube.com"])
+    mtime = os.stat(hosts.path).st_mtime_ns
+    assert not hosts.apply(["youtube.com"])
+    assert replaces == [hosts.path]
+    assert os.stat(hosts.path).st_mtime_ns == mtime
+
+
+def test_changed_section_replaced_in_place_of_the_old_one(hosts):
+    with open(hosts.path, "ab") as f:
+        f.write(b"192.168.1.1 router\r\n")
+    hosts.apply(["youtube.com"])
+    hosts.apply(["reddit.com"])
+    text = read(hosts)
+    assert text.count(START_MARKER) == 1
+    assert "youtube.com" not in text
+    assert "127.0.0.1 reddit.com\r\n" in text
+    assert "192.168.1.1 router\r\n" in text
+
+
+def test_clear_restores_foreign_lines(hosts, replaces):
+    assert not hosts.clear()
+    assert replaces == []
+    hosts.apply(["youtube.com"])
+    assert hosts.clear()
+    assert hosts.read_section() is None
+    assert read(hosts) == ORIGINAL + "\r\n"
+    assert not hosts.clear()
+
+
+def test_keeps_line_endings_of_the_file(tmp_path):
+    path = tmp_path / "hosts"
+    path.write_bytes(b"127.0.0.1 localhost\n")
+    hosts = HostsFile(str(path))
+    hosts.apply(["youtube.com"])
+    assert b"\r" not in path.read_bytes()
+
+
+def test_unterminated_section_is_left_alone(hosts):
+    with open(hosts.path, "ab") as f:
+        f.write(f"{START_MARKER}\r\n127.0.0.1 example.com\r\n".encode())
+    assert hosts.read_section() is None
+    assert not hosts.clear()
+
+
+def test_falls_back_to_rewrite_when_replace_fails(hosts, monkeypatch):
+    def replace(source, target):
+        raise OSError(16, "Device or resource busy")
+
+    monkeypatch.setattr(hosts_file.os, "replace", replace)
+    inode = os.stat(hosts.path).st_ino
+    assert hosts.apply(["youtube.com"])
+    assert hosts.read_section() == f"{START_MARKER}\r\n127.0.0.1 youtube.com\r\n127.0.0.1 www.youtube.com\r\n{END_MARKER}\r\n"
+    assert read(hosts).startswith(ORIGINAL)
+    assert os.stat(hosts.path).st_ino == inode
+    assert leftovers(hosts) == []
@@ -0,0 +1,93 @@
+import pytest
+
+import migrations
+from storage import Storage
+
+SESSIONS = [
+    # start_time, duration, focus_score, hardcore_mode, journal_text
+    ("2024-03-01T09:00:00", 1500, 80.0, 0, None),
+    ("2024-03-01T14:00:00", 3000, 60.0, 1, "deep work"),
+    ("2024-03-02T10:00:00", 600, 90.0, 0, None),
+    # Recorded twice; the copy with the journal is the one to keep
+    ("2024-03-03T08:00:00", 1200, 70.0, 0, None),
+    ("2024-03-03T08:00:00", 1200, 70.0, 0, "kept"),
+    # Same start, different length: a different session
+    ("2024-03-03T08:00:00", 900, 50.0, 0, None),
+]
+
+
+@pytest.fixture
+def storage(tmp_path):
+    """A version 0 database laid out like the app's first release, with data"""
+    storage = Storage(str(tmp_path / "focus.db"))
+    storage.execute('''
+    CREATE TABLE focus_sessions (
+        id INTEGER PRIMARY KEY,
+        start_time TEXT,
+        duration INTEGER,
+        focus_score REAL,
+        hardcore_mode INTEGER,
+        journal_text TEXT
+    )
+    ''')
+    storage.execute("CREATE TABLE earned_badges (id INTEGER PRIMARY KEY, badge_id TEXT, earn_date TEXT)")
+    storage.executemany('''
+    INSERT INTO focus_sessions (start_time, duration, focus_score, hardcore_mode, journal_text)
+    VALUES (?, ?, ?, ?, ?)
+    ''', SESSIONS)
+    storage.executemany("INSERT INTO earned_badges (badge_id, earn_date) VALUES (?, ?)", [
+        ("first_session", "2024-03-01"),
+        ("first_session", "2024-03-02"),
+        ("hardcore", "2024-03-01"),
+    ])
+    yield storage
+    storage.close()
+
+
+def test_upgrades_to_current_version(storage):
+    assert migrations.migrate(storage) == migrations.SCHEMA_VERSION
+    assert storage.scalar("PRAGMA user_version") == migrations.SCHEMA_VERSION
+
+
+def test_backfills_rollup(storage):
+    migrations.migrate(storage)
+    rollup = storage.query('''
+    SELECT day, session_count, total_duration, hardcore_count FROM daily_rollup ORDER BY day
+    ''')
+    assert rollup == [
+        ("2024-03-01", 2, 4500, 1),
+        ("2024-03-02", 1, 600, 0),
+        ("2024-03-03", 2, 2100, 0),
+    ]
+    assert storage.scalar("SELECT COUNT(*) FROM focus_sessions WHERE day IS NULL") == 0
+
+
+def test_removes_only_duplicate_sessions(storage, capsys):
+    migrations.migrate(storage)
+    rows = storage.query('''
+    SELECT duration, journal_text FROM focus_sessions
+    WHERE start_time = '2024-03-03T08:00:00' ORDER BY duration
+    ''')
+    assert rows == [(900, None), (1200, "kept")]
+    assert "removed 1 duplicate sessions and 1 duplicate badges" in capsys.readouterr().out
+
+
+def test_removes_duplicate_badges(storage):
+    migrations.migrate(storage)
+    badges = storage.query("SELECT badge_id, earn_date FROM earned_badges ORDER BY badge_id")
+    assert badges == [("first_session", "2024-03-01"), ("hardcore", "2024-03-01")]
+
+
+def test_second_run_is_a_no_op(storage):
+    migrations.migrate(storage)
+    before = storage.data_version()
+    schema = storage.query("SELECT name, sql FROM sqlite_master ORDER BY name")
+    assert migrations.migrate(storage) == migrations.SCHEMA_VERSION
+    assert storage.data_version() == before
+    assert storage.query("SELECT name, sql FROM sqlite_master ORDER BY name") == schema
+
+
+def test_refuses_newer_database(storage):
+    storage.execute(f"PRAGMA user_version = {migrations.SCHEMA_VERSION + 1}")
+    with pytest.raises(RuntimeError):
+        migrations.migrate(storage)
@@ -0,0 +1,167 @@
+import shutil
+
+import pytest
+
+from process_watcher import ListingScanner, ProcessWatcher, ProcScanner, compile_matcher
+
+
+class FakeProc:
+    """A /proc-style tree of processes"""
+
+    def __init__(self, root):
+        self.root = root
+        self.clock = 1000  # clock ticks since boot
+        (root / "self").mkdir()
+        (root / "uptime").write_text("1.0 1.0\n")
+
+    def spawn(self, pid, comm, cmdline=None):
+        """Start a process; an existing one with this PID is replaced (PID reuse)"""
+        directory = self.root / str(pid)
+        directory.mkdir(exist_ok=True)
+        self.clock += 1
+        (directory / "comm").write_bytes(comm.encode() + b"\n")
+        # Fields 3 to 21, then the start time
+        fields = ["S"] + ["0"] * 18 + [str(self.clock)] + ["0"] * 30
+        (directory / "stat").write_bytes(f"{pid} ({comm}) {' '.join(fields)}\n".encode())
+        argv = cmdline if cmdline is not None else [f"/usr/bin/{comm}"]
+        (directory / "cmdline").write_bytes(b"\0".join(arg.encode() for arg in argv) + b"\0")
+
+    def kill(self, pid):
+        shutil.rmtree(self.root / str(pid))
+
+
+@pytest.fixture
+def proc(tmp_path):
+    proc = FakeProc(tmp_path)
+    proc.spawn(1, "systemd", ["/sbin/init", "splash"])
+    proc.spawn(200, "bash")
+    return proc
+
+
+@pytest.fixture
+def watcher(proc):
+    return ProcessWatcher(["firefox", "discord*", "spotify.exe"], ProcScanner(str(proc.root)))
+
+
+def test_already_running_apps_start_on_first_poll(proc, watcher):
+    proc.spawn(300, "firefox")
+    assert watcher.poll() == [("start", "firefox")]
+    assert watcher.poll() == []
+
+
+def test_start_and_stop_per_app(proc, watcher):
+    assert watcher.poll() == []
+    proc.spawn(300, "firefox")
+    proc.spawn(301, "Web Content", ["/usr/lib/firefox/firefox", "-contentproc"])
+    proc.spawn(302, "DiscordCanary")
+    assert watcher.poll() == [("start", "discordcanary"), ("start", "firefox")]
+    assert watcher.running_apps() == ["discordcanary", "firefox"]
+
+    proc.kill(300)
+    assert watcher.poll() == []
+    proc.kill(301)
+    proc.kill(302)
+    assert watcher.poll() == [("stop", "discordcanary"), ("stop", "firefox")]
+    assert watcher.running_apps() == []
+
+
+def test_names_read_once_per_process(proc, watcher):
+    watcher.poll()
+    proc.spawn(300, "firefox")
+    watcher.poll()
+    # A process renaming itself goes unnoticed: its names aren't re-read
+    (proc.root / "300" / "comm").write_text("bash\n")
+    (proc.root / "300" / "cmdline").write_bytes(b"bash\0")
+    assert watcher.poll() == []
+    assert watcher.running_apps() == ["firefox"]
+
+
+def test_reused_pid_between_polls(proc, watcher):
+    proc.spawn(300, "firefox")
+    watcher.poll()
+    # The app exits and another process gets its PID before the next poll
+    proc.spawn(300, "spotify")
+    assert watcher.poll() == [("start", "spotify"), ("stop", "firefox")]
+    proc.spawn(300, "bash")
+    assert watcher.poll() == [("stop", "spotify")]
+    assert watcher.scanner.known[300] == ("bash",)
+
+
+def test_inode_changes_are_not_restarts(proc, watcher):
+    proc.spawn(300, "firefox")
+    watcher.poll()
+    # What the kernel may do when it rebuilds a cached /proc entry
+    staging = proc.root / "staging"
+    shutil.copytree(proc.root / "300", staging)
+    shutil.rmtree(proc.root / "300")
+    staging.rename(proc.root / "300")
+    assert watcher.poll() == []
+    assert watcher.running_apps() == ["firefox"]
+
+
+def test_start_time_with_parentheses_in_the_name(proc):
+    proc.spawn(300, "a) b (c")
+    assert ProcScanner(str(proc.root)).read_start_time(300) == proc.clock
+
+
+def test_reused_pid_by_the_same_app(proc, watcher):
+    proc.spawn(300, "firefox")
+    watcher.poll()
+    proc.spawn(300, "firefox")
+    assert watcher.poll() == []
+    assert watcher.running_apps() == ["firefox"]
+    proc.kill(300)
+    assert watcher.poll() == [("stop", "firefox")]
+
+
+def test_vanished_before_read_is_skipped(proc, watcher, monkeypatch):
+    scanner = watcher.scanner
+    monkeypatch.setattr(scanner, "read_names", lambda pid: None)
+    proc.spawn(300, "firefox")
+    assert watcher.poll() == []
+    assert 300 not in scanner.known
+    monkeypatch.undo()
+    assert watcher.poll() == [("start", "firefox")]
+
+
+def test_set_apps_rematches_known_processes(proc, watcher):
+    proc.spawn(300, "firefox")
+    proc.spawn(301, "slack")
+    watcher.poll()
+
+    watcher.set_apps(["slack"])
+    assert watcher.poll() == [("start", "slack"), ("stop", "firefox")]
+    assert watcher.running_apps() == ["slack"]
+
+    proc.kill(301)
+    assert watcher.poll() == [("stop", "slack")]
+    watcher.set_apps(["firefox", "slack"])
+    assert watcher.poll() == [("start", "firefox")]
+
+
+def test_matcher_normalizes_names():
+    match = compile_matcher(["Firefox", "discord*", "steam.exe", " "])
+    assert match("firefox")
+    assert match("discordptb")
+    assert match("steam")
+    assert not match("firefox-bin")
+    assert not compile_matcher([])("firefox")
+
+
+class FakeListing(ListingScanner):
+    def __init__(self):
+        super().__init__()
+        self.processes = {}
+
+    def listing(self):
+        return dict(self.processes)
+
+
+def test_listing_scanner_notices_reuse_by_name():
+    scanner = FakeListing()
+    watcher = ProcessWatcher(["firefox"], scanner)
+    scanner.processes = {300: ("firefox.exe",), 301: ("explorer.exe",)}
+    assert watcher.poll() == [("start", "firefox")]
+    scanner.processes = {300: ("notepad.exe",), 301: ("explorer.exe",)}
+    assert watcher.poll() == [("stop", "firefox")]
+    assert scanner.known == scanner.processes
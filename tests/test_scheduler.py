@@ -0,0 +1,34 @@
+import pytest
+
+from focus import FOCUSED, GRACE, FocusTracker
+from scheduler import DetectionScheduler
+
+
+def scheduler_and_tracker(detect_seconds, budget=0.25, grace=3.0):
+    tracker = FocusTracker(grace_period=grace, clock=lambda: 0.0)
+    tracker.reset(now=0.0)
+    scheduler = DetectionScheduler(cpu_budget=budget, clock=lambda: 0.0)
+    scheduler.reset(now=0.0)
+    scheduler.record(tracker, detect_seconds, now=0.0)
+    return scheduler, tracker
+
+
+def test_cpu_budget_slows_detection():
+    scheduler, tracker = scheduler_and_tracker(0.1)
+    tracker.state = FOCUSED
+    # 0.1 s per detection at 25% of a core: one every 0.4 s at most
+    assert scheduler.next_interval(tracker, now=1.0) == pytest.approx(0.3)
+
+
+def test_budget_never_outlasts_half_the_grace_period():
+    scheduler, tracker = scheduler_and_tracker(1.0)
+    tracker.state = FOCUSED
+    assert scheduler.next_interval(tracker, now=1.0) == pytest.approx(1.5)
+
+
+def test_budget_wakes_up_when_grace_runs_out():
+    scheduler, tracker = scheduler_and_tracker(1.0)
+    tracker.state = GRACE
+    remaining = tracker.grace_remaining(2.5)
+    assert 0 < remaining < 1.5
+    assert scheduler.next_interval(tracker, now=2.5) == pytest.approx(remaining + 0.01)